@@ -1,26 +1,15 @@
 import json
 import os
 import re
-from PyPDF2 import PdfReader
-import docx
 
 SCOPE_FOLDER = "static/scopes"
 os.makedirs(SCOPE_FOLDER, exist_ok=True)
 
 def extract_scope_text(scope_path):
     """Extract raw text from PDF or DOCX"""
-    text = ""
-    if scope_path.endswith(".pdf"):
-        with open(scope_path, "rb") as f:
-            reader = PdfReader(f)
-            text = "\n".join([page.extract_text() or "" for page in reader.pages])
-    elif scope_path.endswith(".docx"):
-        doc = docx.Document(scope_path)
-        text = "\n".join([p.text for p in doc.paragraphs])
-    else:
-        with open(scope_path, "r", errors="ignore") as f:
-            text = f.read()
-    return text
+    from utils.scope_store import extract_text
+
+    return extract_text(scope_path)
 
 def extract_scope_tasks(scope_text):
     """Split scope text into clean task lines"""
@@ -1,25 +1,118 @@
 import os
+import re
+import hmac
 import json
+import time
 import uuid
-import glob
-from flask import Flask, request, render_template, send_from_directory
+import datetime
+from io import BytesIO
+from flask import Flask, Response, g, request, render_template, send_from_directory, send_file, jsonify, url_for
 from werkzeug.utils import secure_filename
-from utils.pdf_generator import create_daily_log_pdf
-from utils.compare_scope_vs_log import analyze_scope_vs_log
-from PyPDF2 import PdfReader
+from utils import metrics, profiling
+from utils.upload_store import UPLOAD_STORE
+from utils.warmup import warm_up_from_env
+
+# Heavy modules (reportlab, PyPDF2, numpy/scipy, torch) are imported inside the
+# routes that need them so gunicorn and rq workers boot quickly.
 
 app = Flask(__name__)
-UPLOAD_FOLDER = 'static/uploads'
+UPLOAD_FOLDER = UPLOAD_STORE  # the rq job releases and evicts in the same root (UPLOAD_STORE)
 GENERATED_FOLDER = 'static/generated'
 SCOPE_FOLDER = 'static/scope'
+# Keep rendered PDFs in the job result instead of static/generated (small deployments without shared disk)
+PDF_IN_JOB_RESULT = os.getenv("PDF_IN_JOB_RESULT", "0") == "1"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # enables the /admin routes
+GENERATED_MAX_AGE = 365 * 24 * 3600  # browser cache lifetime of content-keyed PDFs
 
 for folder in [UPLOAD_FOLDER, GENERATED_FOLDER, SCOPE_FOLDER]:
     os.makedirs(folder, exist_ok=True)
 
-# Optional: clean uploaded files from last session
-def clear_folder(folder_path):
-    for f in glob.glob(f"{folder_path}/*"):
-        os.remove(f)
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+@app.before_request
+def start_request():
+    # Honour an upstream X-Request-ID (proxy, client) so logs line up end to end
+    incoming = request.headers.get("X-Request-ID", "")
+    g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    g.request_id_token = metrics.request_id.set(g.request_id)
+    g.request_start = time.perf_counter()
+    g.profile = False
+    if not request.path.startswith(("/admin/", "/metrics")):
+        g.profile = profiling.should_profile(request.headers.get("X-Profile-Signature"), request.path)
+        if g.profile:
+            g.profile_session = profiling.start("request", f"{request.method} {request.path}")
+
+@app.after_request
+def finish_request(response):
+    response.headers["X-Request-ID"] = g.request_id
+    session = g.pop("profile_session", None)
+    if session is not None:
+        response.headers["X-Profile-Id"] = session.stop(status=response.status_code)["id"]
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    if route != "/metrics":
+        metrics.observe("http_request_seconds", time.perf_counter() - g.request_start,
+                        route=route, method=request.method, status=response.status_code)
+        from task_queue import conn
+
+        metrics.maybe_flush(conn)
+    return response
+
+@app.teardown_request
+def end_request(exc):
+    # A request that raised past after_request still holds the process's profiler
+    session = g.pop("profile_session", None)
+    if session is not None:
+        try:
+            session.stop(status=500, error=str(exc) if exc else None)
+        except Exception as e:
+            metrics.log("profile_stop_failed", level="warning", error=str(e))
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        metrics.request_id.reset(token)
+
+def _admin_allowed():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.route('/admin/profiles')
+def admin_profiles():
+    if not _admin_allowed():
+        return jsonify({"error": "not found"}), 404
+    return jsonify({"armed": profiling.armed_state(), "sample_rate": profiling.PROFILE_SAMPLE_RATE,
+                    "profiles": profiling.list_profiles(request.args.get("limit", 100, type=int))})
+
+@app.route('/admin/profiles/<name>')
+def admin_profile_file(name):
+    if not _admin_allowed():
+        return jsonify({"error": "not found"}), 404
+    return send_from_directory(profiling.PROFILE_DIR, secure_filename(name), as_attachment=name.endswith(".prof"))
+
+@app.route('/admin/profiling', methods=['POST', 'DELETE'])
+def admin_profiling():
+    if not _admin_allowed():
+        return jsonify({"error": "not found"}), 404
+    if request.method == 'DELETE':
+        profiling.disarm()
+        return jsonify({"armed": None})
+    body = request.get_json(silent=True) or {}
+    try:
+        sample_rate = float(body.get("sample_rate", 1.0))
+        minutes = float(body.get("minutes", 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "sample_rate and minutes must be numbers"}), 400
+    if not 0 < sample_rate <= 1 or not 0 < minutes <= 24 * 60:
+        return jsonify({"error": "sample_rate must be in (0, 1] and minutes in (0, 1440]"}), 400
+    state = profiling.arm(sample_rate, minutes)
+    return jsonify({"armed": state})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "metrics disabled"}), 404
+    from task_queue import conn
+
+    # Totals of every web and rq worker process, shared through Redis
+    return Response(metrics.render(conn), mimetype="text/plain; version=0.0.4")
 
 @app.route('/')
 def home():
@@ -29,80 +122,261 @@ def home():
 def form():
     return render_template('form.html')
 
+def long_scope_line(line):
+    return len(line.split()) >= 5
+
+def scope_lines(text):
+    return [line.strip() for line in text.splitlines() if long_scope_line(line.strip())]
+
 def extract_scope_from_pdf(path):
-    reader = PdfReader(path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    lines = [line.strip() for line in text.splitlines() if len(line.strip().split()) >= 5]
-    return lines
+    from utils.scope_store import extract_text
+
+    return scope_lines(extract_text(path))
 
 @app.route('/generate_form', methods=['POST'])
 def generate_form():
+    from utils.scope_index import build_scope_index, index_dir_for
+    from task_queue import queue, JOB_TIMEOUT, RESULT_TTL
+    from tasks import generate_pdf_task, _load_done_items
+    from utils.upload_store import store_upload, release_job
+    from utils.scope_store import ingest_upload, publish_items, read_items, items_path_for
+    from utils.scope_xlsx import scope_lines as item_scope_lines
+    from utils.scope_normalize import normalize_scope
+    from utils.data_storage import project_key, log_date_for
+    from utils.render_cache import render_key, filename_for
+
     data = dict(request.form)
-    project_id = data.get("project_name", "default_project").strip().replace(" ", "_").lower()
+    project_id = project_key(data.get("project_name", "default_project"))
 
-    # Clear folders from last session
-    clear_folder(UPLOAD_FOLDER)
+    # Uploads go to the content-addressed store and are referenced by this request until its job finishes
+    upload_ref = uuid.uuid4().hex
 
-    # Save Scope of Work PDF if uploaded (only once per project)
+    # Scope of Work: parsed once per distinct document (utils/scope_store.py);
+    # a revised upload replaces the project's scope, the same file again is free
     scope_file = request.files.get("scope_doc")
     scope_path = f"{SCOPE_FOLDER}/{project_id}_scope.json"
-    if scope_file and not os.path.exists(scope_path):
-        scope_pdf_path = os.path.join(SCOPE_FOLDER, secure_filename(scope_file.filename))
-        scope_file.save(scope_pdf_path)
-        extracted_scope = extract_scope_from_pdf(scope_pdf_path)
-        with open(scope_path, "w") as f:
-            json.dump(extracted_scope, f, indent=2)
-
-    # Load saved scope for this project
-    try:
-        with open(scope_path, "r") as f:
-            saved_scope = json.load(f)
-    except:
-        saved_scope = []
-
-    # Get Daily Log inputs
-    work_done = data.get("work_done", "")
-    safety_notes = data.get("safety_notes", "")
-    crew_notes = data.get("crew_notes", "")
-
-    # AI Analysis
-    raw_analysis = analyze_scope_vs_log(saved_scope, work_done, crew_notes, safety_notes)
-    comparison_result = {
-        "completion": raw_analysis.get("progress", 0),
-        "matched": raw_analysis.get("matched_items", []),
-        "unmatched": raw_analysis.get("pending_items", []),
-        "out_of_scope": raw_analysis.get("extra_items", []),
-        "change_order_suggestions": []
-    }
-
-    # Handle uploaded job photos
+    if scope_file and scope_file.filename:
+        with metrics.stage("scope_extraction"):
+            scope_digest, scope_text = ingest_upload(scope_file, os.path.join(SCOPE_FOLDER, "sources"))
+            # Spreadsheet scopes keep their rows (cost code, quantity, unit, ...) beside the lines;
+            # the job shows those fields next to each item, and header-mapped rows skip the word count
+            items_file = publish_items(scope_digest, items_path_for(scope_path))
+            if items_file:
+                lines = list(dict.fromkeys(item_scope_lines(read_items(items_file), long_scope_line)))
+            else:
+                lines = scope_lines(scope_text)
+            # Generic items dropped and near-duplicates collapsed (utils/scope_normalize.py)
+            normalized = normalize_scope(lines)
+            extracted_scope = normalized["checklist"]
+        try:
+            with open(scope_path, "r") as f:
+                unchanged = json.load(f) == extracted_scope
+        except (OSError, ValueError):
+            unchanged = False
+        if not unchanged:
+            metrics.log("scope_normalized", project_id=project_id, **normalized["report"])
+            with open(scope_path, "w") as f:
+                json.dump(extracted_scope, f, indent=2)
+            with open(f"{SCOPE_FOLDER}/{project_id}_scope_sources.json", "w") as f:
+                json.dump(normalized["sources"], f, indent=2)
+            with metrics.stage("scope_index_build"):
+                build_scope_index(extracted_scope, index_dir_for(scope_path))
+
+    # Handle uploaded job photos and logo
     image_paths = []
-    if 'images' in request.files:
-        for img in request.files.getlist('images'):
-            if img.filename:
-                filename = secure_filename(img.filename)
-                path = os.path.join(UPLOAD_FOLDER, filename)
-                img.save(path)
-                image_paths.append(path)
-
-    # Handle logo upload
     logo_path = None
-    if 'logo' in request.files:
-        logo = request.files['logo']
-        if logo and logo.filename:
-            logo_filename = secure_filename(logo.filename)
-            logo_path = os.path.join(UPLOAD_FOLDER, logo_filename)
-            logo.save(logo_path)
+    with metrics.stage("upload_save"):
+        if 'images' in request.files:
+            for img in request.files.getlist('images'):
+                if img.filename:
+                    image_paths.append(store_upload(img, upload_ref, UPLOAD_FOLDER))
+
+        if 'logo' in request.files:
+            logo = request.files['logo']
+            if logo and logo.filename:
+                logo_path = store_upload(logo, upload_ref, UPLOAD_FOLDER)
+    metrics.count("photos", len(image_paths), stage="upload_save")
+    metrics.count("upload_bytes", sum(os.path.getsize(path) for path in image_paths), kind="photo")
+    if logo_path:
+        metrics.count("upload_bytes", os.path.getsize(logo_path), kind="logo")
+
+    # The same log, scope, ledger state and photos give the same job id and PDF
+    # (utils/render_cache.py): a retried submission gets the finished PDF or the job in flight
+    log_date = log_date_for(data)
+    job_id = render_key(data, log_date, scope_path, image_paths, logo_path, _load_done_items(project_id, log_date))
+    # Scope analysis and PDF rendering run in the background job
+    return _render_once(
+        job_id, filename_for(job_id),
+        lambda save_path: queue.enqueue(generate_pdf_task, data, scope_path, image_paths, logo_path,
+                                        save_path, upload_ref, profile=g.profile,
+                                        job_id=job_id, job_timeout=JOB_TIMEOUT, result_ttl=RESULT_TTL,
+                                        failure_ttl=RESULT_TTL),
+        on_reuse=lambda: release_job(upload_ref, UPLOAD_FOLDER),
+        kind="daily_log", project_id=project_id, photos=len(image_paths))
+
+def _render_once(job_id, filename, enqueue, on_reuse=None, kind="daily_log", **log_fields):
+    """
+    Answer a render request keyed by `job_id`: the PDF already in GENERATED_FOLDER
+    (200), the job still rendering it, or a new job from enqueue(save_path) (202).
+    `on_reuse` runs when nothing new is enqueued.
+    """
+    from utils.render_cache import cached_pdf
 
-    # Save final PDF
-    filename = f"daily_log_{uuid.uuid4().hex[:8]}.pdf"
-    save_path = os.path.join(GENERATED_FOLDER, filename)
-    create_daily_log_pdf(data, image_paths, logo_path, True, comparison_result, save_path)
+    if not PDF_IN_JOB_RESULT and cached_pdf(filename, GENERATED_FOLDER):
+        if on_reuse:
+            on_reuse()
+        metrics.count("pdf_renders", outcome="cached", kind=kind)
+        metrics.log("render_cached", job_id=job_id, **log_fields)
+        return jsonify({
+            "job_id": job_id,
+            "status": "finished",
+            "cached": True,
+            "filename": filename,
+            "status_url": url_for('job_status', job_id=job_id),
+            "pdf_url": url_for('serve_pdf', filename=filename),
+        }), 200
 
-    return f"Generated: <a href='/generated/{filename}'>{filename}</a>"
+    existing = _fetch_job(job_id)
+    if existing is not None and _reusable(existing):
+        if on_reuse:
+            on_reuse()
+        metrics.count("pdf_renders", outcome="joined", kind=kind)
+        metrics.log("render_joined", job_id=job_id, **log_fields)
+    else:
+        enqueue(None if PDF_IN_JOB_RESULT else os.path.join(GENERATED_FOLDER, filename))
+        metrics.count("pdf_renders", outcome="rendered", kind=kind)
+        metrics.log("job_enqueued", job_id=job_id, **log_fields)
+
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for('job_status', job_id=job_id),
+        "pdf_url": url_for('job_pdf', job_id=job_id),
+    }), 202
+
+def _fetch_job(job_id):
+    from rq.job import Job
+    from rq.exceptions import NoSuchJobError
+    from task_queue import conn
+
+    try:
+        return Job.fetch(job_id, connection=conn)
+    except NoSuchJobError:
+        return None
+
+def _reusable(job):
+    """A job an identical submission can wait on instead of rendering again."""
+    if job.is_failed or job.is_stopped or job.is_canceled:
+        return False
+    # A finished job's file may have been evicted; its in-memory PDF lives as long as the job
+    return not job.is_finished or PDF_IN_JOB_RESULT
+
+def _cached_filename(job_id):
+    # Job results expire after RESULT_TTL; the PDF rendered for the job id may outlive them
+    from utils.render_cache import find_cached
+
+    return find_cached(job_id, GENERATED_FOLDER)
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = _fetch_job(job_id)
+    if job is None:
+        filename = _cached_filename(job_id)
+        if filename:
+            return jsonify({"job_id": job_id, "status": "finished", "filename": filename,
+                            "pdf_url": url_for('job_pdf', job_id=job_id)})
+        return jsonify({"job_id": job_id, "status": "not_found"}), 404
+
+    status = job.get_status()
+    body = {"job_id": job_id, "status": str(getattr(status, "value", status))}
+    if job.is_finished:
+        body.update({k: v for k, v in (job.result or {}).items() if k != "pdf"})
+        body["pdf_url"] = url_for('job_pdf', job_id=job_id)
+    elif job.is_failed:
+        exc_info = (job.exc_info or "").strip().splitlines()
+        body["error"] = exc_info[-1] if exc_info else "Job failed"
+    return jsonify(body)
+
+@app.route('/jobs/<job_id>/pdf')
+def job_pdf(job_id):
+    job = _fetch_job(job_id)
+    if job is None:
+        filename = _cached_filename(job_id)
+        if filename:
+            return _send_generated(filename)
+        return jsonify({"job_id": job_id, "status": "not_found"}), 404
+    if not job.is_finished:
+        status = job.get_status()
+        return jsonify({"job_id": job_id, "status": str(getattr(status, "value", status))}), 409
+    if "pdf" in job.result:
+        # Built in memory by the job; stream it without touching disk
+        return send_file(BytesIO(job.result["pdf"]), mimetype="application/pdf",
+                         download_name=job.result.get("download_name", f"daily_log_{job_id}.pdf"), etag=job_id)
+    return _send_generated(job.result["filename"])
+
+@app.route('/projects/<project_id>/reports', methods=['POST'])
+def project_report(project_id):
+    # Weekly or monthly roll-up PDF from the stored daily logs, rendered once per version of them
+    from task_queue import queue, JOB_TIMEOUT, RESULT_TTL
+    from tasks import generate_rollup_task
+    from utils.data_storage import project_key, daily_logs_version
+    from utils.rollup_report import period_range
+    from utils.render_cache import rollup_key, filename_for
+
+    body = request.get_json(silent=True) or request.form
+    project_id = project_key(project_id)
+    try:
+        if body.get("start") and body.get("end"):
+            start = datetime.date.fromisoformat(body["start"]).isoformat()
+            end = datetime.date.fromisoformat(body["end"]).isoformat()
+        else:
+            start, end = period_range(body.get("period", "week"), body.get("date") or None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    logs_version = daily_logs_version(project_id, start, end)
+    if not logs_version[0]:
+        return jsonify({"project_id": project_id, "start": start, "end": end, "status": "no_logs"}), 404
+
+    job_id = rollup_key(project_id, start, end, logs_version)
+    return _render_once(
+        job_id, filename_for(job_id, "rollup"),
+        lambda save_path: queue.enqueue(generate_rollup_task, project_id, start, end, save_path,
+                                        profile=g.profile, job_id=job_id, job_timeout=JOB_TIMEOUT,
+                                        result_ttl=RESULT_TTL, failure_ttl=RESULT_TTL),
+        kind="rollup", project_id=project_id, start=start, end=end)
+
+@app.route('/projects/<project_id>/progress')
+def project_progress(project_id):
+    # Cumulative progress straight from the ledger the jobs maintain; nothing is re-scored
+    from utils.data_storage import project_key, progress_summary
+
+    project_id = project_key(project_id)
+    try:
+        with open(f"{SCOPE_FOLDER}/{project_id}_scope.json", "r") as f:
+            scope_items = json.load(f)
+    except (OSError, ValueError):
+        return jsonify({"project_id": project_id, "status": "not_found"}), 404
+    summary = progress_summary(project_id, scope_items)
+    if request.args.get("items") == "0":
+        summary.pop("items")
+    return jsonify(summary)
+
+def _send_generated(filename):
+    # A keyed PDF never changes under its name: its render key is a strong ETag and it
+    # may be cached for good. send_file answers If-None-Match with 304 and Range with 206.
+    from utils.render_cache import key_for
+
+    key = key_for(filename)
+    response = send_from_directory(GENERATED_FOLDER, filename, etag=key or True,
+                                   max_age=GENERATED_MAX_AGE if key else None)
+    if key and response.status_code in (200, 206):
+        response.cache_control.immutable = True
+    return response
 
 @app.route('/generated/<path:filename>')
 def serve_pdf(filename):
-    return send_from_directory(GENERATED_FOLDER, filename)
+    if os.path.dirname(filename):
+        return jsonify({"error": "not found"}), 404  # renders in progress live in tmp/
+    return _send_generated(filename)
+
+warm_up_from_env()
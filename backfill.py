@@ -0,0 +1,63 @@
+# Score a backlog of historical daily logs against one scope.
+#
+#   python backfill.py static/scope/{project}_scope.json old_logs.jsonl > results.jsonl
+#
+# Each input line is a JSON object with the form fields work_done, crew_notes and
+# safety_notes (anything else, e.g. date, is passed through). Each output line is
+# the analyze_scope_vs_log result for that log, plus its 1-based `log` number.
+# Results stream out as chunks are scored, so memory does not grow with the input.
+
+import sys
+import json
+import argparse
+from collections import deque
+
+from utils import metrics
+from utils.compare_scope_vs_log import analyze_logs_batch
+from utils.scope_index import index_dir_for
+
+PASSTHROUGH_FIELDS = ("date", "project_name")
+
+
+def read_logs(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            yield number, json.loads(line)
+
+
+def backfill(scope_path, logs_stream, out_stream, chunk_size=None):
+    with open(scope_path, "r") as f:
+        scope_items = json.load(f)
+
+    forms = deque()  # only the chunk in flight: analyze_logs_batch pulls logs lazily
+
+    def triples():
+        for number, form in read_logs(logs_stream):
+            forms.append((number, form))
+            yield form.get("work_done", ""), form.get("crew_notes", ""), form.get("safety_notes", "")
+
+    count = 0
+    for result in analyze_logs_batch(scope_items, triples(), index_dir_for(scope_path), chunk_size):
+        number, form = forms.popleft()
+        record = {"log": number, **{k: form[k] for k in PASSTHROUGH_FIELDS if k in form}, **result}
+        out_stream.write(json.dumps(record) + "\n")
+        count += 1
+    out_stream.flush()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score historical daily logs against a project scope")
+    parser.add_argument("scope", help="scope JSON, e.g. static/scope/{project}_scope.json")
+    parser.add_argument("logs", nargs="?", default="-", help="JSON lines of daily log forms (default: stdin)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="logs scored per sparse product")
+    args = parser.parse_args()
+
+    logs_stream = sys.stdin if args.logs == "-" else open(args.logs, "r", encoding="utf-8")
+    try:
+        total = backfill(args.scope, logs_stream, sys.stdout, args.chunk_size)
+    finally:
+        if logs_stream is not sys.stdin:
+            logs_stream.close()
+    metrics.log("backfill_done", scope=args.scope, logs=total)
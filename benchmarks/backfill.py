@@ -0,0 +1,40 @@
+# benchmarks/backfill.py
+# Historical log backfill: one analyze_scope_vs_log call per log vs. analyze_logs_batch.
+#
+#   python -m benchmarks.backfill [--items 1000] [--logs 1000 10000] [--check 300]
+
+import time
+import argparse
+
+from benchmarks.synthetic import scope_items, daily_log
+from utils.scope_index import build_scope_index
+from utils.compare_scope_vs_log import analyze_scope_vs_log, analyze_logs_batch
+
+
+def run(n_items, log_counts, check):
+    scope = scope_items(n_items)
+    build_scope_index(scope)
+    for count in log_counts:
+        logs = [(daily_log(scope, seed=i), "", "") for i in range(count)]
+
+        start = time.perf_counter()
+        batch = list(analyze_logs_batch(scope, logs))
+        batch_s = time.perf_counter() - start
+
+        sample = logs[:check]
+        start = time.perf_counter()
+        single = [analyze_scope_vs_log(scope, *log) for log in sample]
+        single_s = (time.perf_counter() - start) * count / max(1, len(sample))
+
+        print(f"{count:>6} logs x {n_items} items | per-log {single_s:8.1f} s (est.) "
+              f"| batch {batch_s:6.1f} s | {single_s / batch_s:5.1f}x "
+              f"| same result: {single == batch[:len(sample)]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill benchmark")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--logs", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--check", type=int, default=300, help="logs also scored one by one")
+    args = parser.parse_args()
+    run(args.items, args.logs, args.check)
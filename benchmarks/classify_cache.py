@@ -0,0 +1,71 @@
+# benchmarks/classify_cache.py
+# Photo classification with and without the content-hash cache, as crews resubmit photos.
+#
+#   python -m benchmarks.classify_cache [--photos 16] [--overlap 0 0.5 0.9 1.0]
+#
+# Each round classifies a fresh set of `photos` of which `overlap` were already
+# classified (same content, new file name). "process cold" clears the in-memory
+# LRU first, as a freshly started worker sharing the SQLite file would see it.
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from benchmarks.run import use_stand_in_model
+from benchmarks.synthetic import photo_set
+from utils import classification_cache
+from utils.classification_cache import classify_cached
+from utils.image_analyzer import classify_images
+
+MODEL_VERSION = "bench/stand-in"
+
+
+def copies(paths, directory, tag):
+    # Same bytes under new names: the cache must key on content, not path
+    os.makedirs(directory, exist_ok=True)
+    out = []
+    for path in paths:
+        target = os.path.join(directory, f"{tag}_{os.path.basename(path)}")
+        shutil.copyfile(path, target)
+        out.append(target)
+    return out
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(n_photos, overlaps):
+    workdir = tempfile.mkdtemp(prefix="nn_classify_")
+    db_path = os.path.join(workdir, "classifications.db")
+    try:
+        use_stand_in_model()
+        pool = photo_set(os.path.join(workdir, "pool"), n_photos * (len(overlaps) + 1), size=(1600, 1200))
+        seen, fresh = pool[:n_photos], iter(pool[n_photos:])
+        classify_cached(seen, classify_images, MODEL_VERSION, db_path)
+        baseline = timed(lambda: classify_images(seen))
+        print(f"{n_photos} photos | no cache {baseline * 1000:8.1f} ms")
+        for round_no, overlap in enumerate(overlaps):
+            reused = int(overlap * n_photos)
+            batch = copies(seen[:reused], os.path.join(workdir, f"round{round_no}"), "again")
+            batch += [next(fresh) for _ in range(n_photos - reused)]
+            classification_cache.clear_memory()
+            cold = timed(lambda: classify_cached(batch, classify_images, MODEL_VERSION, db_path))
+            warm = timed(lambda: classify_cached(batch, classify_images, MODEL_VERSION, db_path))
+            print(f"  {overlap:4.0%} seen before | process cold {cold * 1000:8.1f} ms "
+                  f"| repeat in process {warm * 1000:7.2f} ms")
+            seen = batch
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classification cache benchmark")
+    parser.add_argument("--photos", type=int, default=16)
+    parser.add_argument("--overlap", type=float, nargs="+", default=[0, 0.5, 0.9, 1.0])
+    args = parser.parse_args()
+    run(args.photos, args.overlap)
@@ -0,0 +1,89 @@
+# benchmarks/inference.py
+# Photo classifier backends on CPU: latency, throughput and top-1 agreement with fp32 eager.
+#
+#   python -m benchmarks.inference [--images DIR] [--weights random|pretrained] [--backends ...]
+#
+# Without --images a synthetic photo set is generated. --weights random (the default)
+# needs no download; agreement then compares near-uniform logits and is a worst
+# case. For int8_static the first half of the images calibrates and every image is
+# scored, so use a real site photo set with --weights pretrained to pick a backend.
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+import torch
+from torchvision import models
+
+from benchmarks.synthetic import photo_set
+from utils import image_analyzer
+from utils.image_analyzer import BACKENDS, build_backend, weights_fingerprint, _load_tensor, _predict
+
+
+def median_s(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(image_dir, weights, backends, batch_size, repeat):
+    workdir = tempfile.mkdtemp(prefix="nn_inference_")
+    try:
+        paths = image_analyzer.calibration_paths(image_dir, limit=10 ** 6) if image_dir else \
+            photo_set(os.path.join(workdir, "photos"), 32, size=(1600, 1200))
+        tensors = [_load_tensor(path) for path in paths]
+        with open(os.path.join(os.path.dirname(image_analyzer.__file__), "imagenet_classes.txt")) as f:
+            classes = [line.strip() for line in f]
+
+        fp32 = (models.mobilenet_v2(pretrained=True) if weights == "pretrained" else models.mobilenet_v2()).eval()
+        fingerprint = weights_fingerprint(fp32)
+        reference = [label for label, _ in _predict(fp32, classes, tensors, backend="eager")]
+        calibration = paths[:max(1, len(paths) // 2)]
+        batch = tensors[:batch_size]
+        print(f"{len(paths)} images | {torch.get_num_threads()} threads | batch {batch_size} "
+              f"| quantized engine {torch.backends.quantized.engine}")
+
+        for backend in backends:
+            cache_dir = os.path.join(workdir, "models")
+            start = time.perf_counter()
+            model = build_backend(_copy(fp32), backend,
+                                  calibration, fingerprint, cache_dir)
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            build_backend(_copy(fp32), backend, calibration, fingerprint, cache_dir)
+            load = time.perf_counter() - start
+
+            labels = [label for label, _ in _predict(model, classes, tensors, backend=backend)]
+            agreement = sum(a == b for a, b in zip(labels, reference)) / len(reference)
+            _predict(model, classes, batch, backend=backend)  # warm-up (TorchScript profiles its first runs)
+            single = median_s(lambda: _predict(model, classes, tensors[:1], backend=backend), repeat)
+            batched = median_s(lambda: _predict(model, classes, batch, backend=backend), repeat)
+            print(f"{backend:<14} | build {build:6.2f} s, cached load {load * 1000:7.1f} ms "
+                  f"| 1 image {single * 1000:7.2f} ms | {len(batch) / batched:7.1f} img/s "
+                  f"| top-1 agreement {agreement:6.1%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _copy(model):
+    # Backends may convert in place (channels_last); every one starts from the same fp32 weights
+    clone = models.mobilenet_v2()
+    clone.load_state_dict(model.state_dict())
+    return clone.eval()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Photo classifier backend benchmark")
+    parser.add_argument("--images", help="directory of local photos (default: synthetic set)")
+    parser.add_argument("--weights", choices=["random", "pretrained"], default="random")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    run(args.images, args.weights, args.backends, args.batch_size, args.repeat)
@@ -0,0 +1,62 @@
+# benchmarks/jpeg_quality.py
+# compress_and_rotate_image: legacy linear quality loop vs. seeded binary search.
+#
+#   python -m benchmarks.jpeg_quality [--photos 6] [--target-kb 250 400 800]
+
+import os
+import time
+import argparse
+import tempfile
+
+from PIL import Image, ImageOps
+
+from utils import image_compression as ic
+from benchmarks.synthetic import photo_set
+
+
+def legacy_compress(path, target_size):
+    """The old loop: quality 85, 80, ... 30 until the encode fits. Returns (quality, encodes)."""
+    img = ImageOps.exif_transpose(Image.open(path))
+    if max(img.size) > ic.MAX_DIMENSION:
+        img.thumbnail((ic.MAX_DIMENSION, ic.MAX_DIMENSION))
+    img = img.convert("RGB")
+    quality, encodes = ic.INITIAL_QUALITY, 0
+    while quality >= ic.MIN_QUALITY:
+        encodes += 1
+        if ic._encode(img, quality).tell() <= target_size:
+            return quality, encodes
+        quality -= 5
+    return ic.MIN_QUALITY, encodes
+
+
+def run(count, targets_kb):
+    with tempfile.TemporaryDirectory() as tmp:
+        photos = photo_set(os.path.join(tmp, "photos"), count, size=(4032, 3024))
+        for target_kb in targets_kb:
+            target = target_kb * 1024
+
+            start = time.perf_counter()
+            legacy = [legacy_compress(p, target) for p in photos]
+            legacy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            searched = [ic.compress_image(p, os.path.join(tmp, "out.jpg"), target) for p in photos]
+            search_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            batch = ic.compress_images(photos, os.path.join(tmp, "batch"), target)
+            batch_time = time.perf_counter() - start
+
+            print(f"target {target_kb:>5} KB | legacy {sum(e for _, e in legacy):3d} encodes "
+                  f"{legacy_time:6.2f} s (Q {[q for q, _ in legacy]}) | search "
+                  f"{sum(r['encodes'] for r in searched):3d} encodes {search_time:6.2f} s "
+                  f"(Q {[r['quality'] for r in searched]}) | batch {batch_time:6.2f} s, "
+                  f"per image {[r['seconds'] for r in batch]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JPEG quality search benchmark")
+    parser.add_argument("--photos", type=int, default=6)
+    parser.add_argument("--target-kb", type=int, nargs="+", default=[250, 400, 800])
+    args = parser.parse_args()
+    run(args.photos, args.target_kb)
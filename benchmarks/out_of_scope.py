@@ -0,0 +1,80 @@
+# benchmarks/out_of_scope.py
+# Out-of-scope detection: exhaustive SequenceMatcher scan vs. n-gram candidate index.
+#
+#   python -m benchmarks.out_of_scope [--sizes 100 1000 10000] [--lines 12] [--trials 15]
+#
+# Besides the synthetic logs (truncated scope items), each size runs `trials` logs
+# of harder lines: scope items with shuffled words and short fragments, the lines
+# whose best match can fall outside the n-gram shortlist. Results must agree with
+# the exhaustive scan on every line.
+
+import time
+import random
+import argparse
+
+from utils.compare_scope_vs_log import similar, find_out_of_scope, OUT_OF_SCOPE_THRESHOLD
+from utils.scope_index import build_scope_index
+from benchmarks.synthetic import scope_items, daily_log
+
+
+def legacy_out_of_scope(lines, scope):
+    return [line.strip() for line in lines
+            if not any(similar(line, s) > OUT_OF_SCOPE_THRESHOLD for s in scope)]
+
+
+def hard_lines(scope, n_lines, seed):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n_lines):
+        words = rng.choice(scope).split()
+        if rng.random() < 0.5:
+            rng.shuffle(words)
+        else:
+            start = rng.randrange(len(words))
+            words = words[start:start + rng.randint(2, 4)]
+        lines.append(" ".join(words))
+    return lines
+
+
+def run(sizes, n_lines, trials):
+    for size in sizes:
+        scope = scope_items(size)
+        lines = daily_log(scope, n_lines).split("\n")
+
+        start = time.perf_counter()
+        index = build_scope_index(scope)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = find_out_of_scope(lines, scope, index)
+        fast_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        slow = legacy_out_of_scope(lines, scope)
+        slow_time = time.perf_counter() - start
+
+        hard_fast = hard_slow = 0.0
+        disagreements = 0
+        for trial in range(trials):
+            hard = hard_lines(scope, n_lines, trial)
+            start = time.perf_counter()
+            got = find_out_of_scope(hard, scope, index)
+            hard_fast += time.perf_counter() - start
+            start = time.perf_counter()
+            want = legacy_out_of_scope(hard, scope)
+            hard_slow += time.perf_counter() - start
+            disagreements += got != want
+
+        print(f"{size:>6} items | legacy {slow_time * 1000:9.1f} ms | indexed {fast_time * 1000:7.1f} ms "
+              f"(+{build_time * 1000:.0f} ms one-off build) | speedup {slow_time / max(fast_time, 1e-9):6.1f}x "
+              f"| same result: {fast == slow} | hard lines: {hard_slow / hard_fast:5.1f}x, "
+              f"{trials - disagreements}/{trials} logs agree")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-scope detection benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--lines", type=int, default=12)
+    parser.add_argument("--trials", type=int, default=15, help="logs of harder lines checked per size")
+    args = parser.parse_args()
+    run(args.sizes, args.lines, args.trials)
@@ -0,0 +1,78 @@
+# benchmarks/pdf_footer.py
+# Daily log PDF build: legacy build + PyPDF2 footer pass vs. single-pass NumberedCanvas.
+#
+#   python -m benchmarks.pdf_footer [--photos 0 10 30] [--repeat 3]
+
+import os
+import time
+import argparse
+import tempfile
+from io import BytesIO
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from PyPDF2 import PdfReader, PdfWriter
+
+from utils import pdf_generator
+from utils.pdf_generator import create_daily_log_pdf, FOOTER_TEXT
+from benchmarks.synthetic import photo_set, log_form, scope_items
+from utils.compare_scope_vs_log import analyze_scope_vs_log
+
+
+def legacy_build(form, photos, analysis, save_path):
+    """Old path: plain build, then re-read the file and stamp a footer on every page."""
+    original = pdf_generator.NumberedCanvas
+    pdf_generator.NumberedCanvas = canvas.Canvas
+    try:
+        create_daily_log_pdf(form, photos, None, analysis, None, save_path)
+    finally:
+        pdf_generator.NumberedCanvas = original
+
+    with open(save_path, "rb") as f:
+        reader = PdfReader(f)
+        writer = PdfWriter()
+        for i, page in enumerate(reader.pages):
+            overlay = BytesIO()
+            c = canvas.Canvas(overlay, pagesize=A4)
+            c.setFont("Helvetica", 8)
+            c.drawString(40, 20, f"{FOOTER_TEXT} | Page {i + 1}")
+            c.save()
+            page.merge_page(PdfReader(overlay).pages[0])
+            writer.add_page(page)
+        with open(save_path, "wb") as f_out:
+            writer.write(f_out)
+
+
+def best_of(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(photo_counts, repeat):
+    scope = scope_items(200)
+    form = log_form(scope=scope)
+    analysis = analyze_scope_vs_log(scope, form["work_done"], form["crew_notes"], form["safety_notes"])
+    with tempfile.TemporaryDirectory() as tmp:
+        all_photos = photo_set(os.path.join(tmp, "photos"), max(photo_counts), size=(1600, 1200))
+        for count in photo_counts:
+            photos = all_photos[:count]
+            old_path = os.path.join(tmp, "old.pdf")
+            new_path = os.path.join(tmp, "new.pdf")
+            old = best_of(repeat, legacy_build, form, photos, analysis, old_path)
+            new = best_of(repeat, create_daily_log_pdf, form, photos, None, analysis, None, new_path)
+            mem = best_of(repeat, pdf_generator.render_daily_log_pdf, form, photos, None, analysis)
+            print(f"{count:>3} photos | two-pass {old * 1000:8.1f} ms | single-pass {new * 1000:8.1f} ms "
+                  f"| in-memory {mem * 1000:8.1f} ms | {old / new:4.1f}x "
+                  f"| {os.path.getsize(old_path) / 1e6:.1f} MB -> {os.path.getsize(new_path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily log PDF footer benchmark")
+    parser.add_argument("--photos", type=int, nargs="+", default=[0, 10, 30])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.photos, args.repeat)
@@ -0,0 +1,44 @@
+# benchmarks/pdf_photos.py
+# Daily log PDF with full-resolution photos vs. photos resampled to the placed size.
+#
+#   python -m benchmarks.pdf_photos [--photos 10] [--dpi 150] [--size 4032 3024]
+
+import os
+import time
+import argparse
+import tempfile
+
+from utils import pdf_images
+from utils.pdf_generator import create_daily_log_pdf
+from benchmarks.synthetic import photo_set, log_form
+
+
+def timed_build(form, photos, save_path, **kwargs):
+    start = time.perf_counter()
+    create_daily_log_pdf(form, photos, None, None, None, save_path, **kwargs)
+    return time.perf_counter() - start, os.path.getsize(save_path) / 1e6
+
+
+def run(count, dpi, size):
+    form = log_form()
+    with tempfile.TemporaryDirectory() as tmp:
+        photos = photo_set(os.path.join(tmp, "photos"), count, size=tuple(size))
+        out = os.path.join(tmp, "log.pdf")
+        cache_dir = os.path.join(tmp, "cache")
+        full_time, full_mb = timed_build(form, photos, out, photo_dpi=None)
+        print(f"full resolution      {full_time * 1000:9.1f} ms  {full_mb:7.2f} MB")
+
+        pdf_images.PDF_PHOTO_CACHE = cache_dir  # keep the benchmark out of static/cache
+        cold_time, cold_mb = timed_build(form, photos, out, photo_dpi=dpi)
+        warm_time, warm_mb = timed_build(form, photos, out, photo_dpi=dpi)
+        print(f"{dpi} dpi, cold cache   {cold_time * 1000:9.1f} ms  {cold_mb:7.2f} MB")
+        print(f"{dpi} dpi, warm cache   {warm_time * 1000:9.1f} ms  {warm_mb:7.2f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF photo downsampling benchmark")
+    parser.add_argument("--photos", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--size", type=int, nargs=2, default=[4032, 3024])
+    args = parser.parse_args()
+    run(args.photos, args.dpi, args.size)
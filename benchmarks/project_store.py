@@ -0,0 +1,73 @@
+# benchmarks/project_store.py
+# Project data store: legacy whole-file project_data.json vs. SQLite rows.
+#
+#   python -m benchmarks.project_store [--projects 10 1000 100000] [--ops 50]
+
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from utils import data_storage
+from benchmarks.synthetic import log_form
+
+
+def legacy_load(path, project_name):
+    with open(path, "r") as f:
+        return json.load(f).get(project_name)
+
+
+def legacy_save(path, project_name, form_data):
+    with open(path, "r") as f:
+        data = json.load(f)
+    data[project_name] = form_data
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def median_ms(fn, names):
+    times = []
+    for name in names:
+        start = time.perf_counter()
+        fn(name)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def run(project_counts, ops):
+    form = log_form()
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in project_counts:
+            names = [f"project_{i}" for i in range(count)]
+            probe = names[:: max(1, count // ops)][:ops]
+
+            json_path = os.path.join(tmp, f"projects_{count}.json")
+            with open(json_path, "w") as f:
+                json.dump({name: form for name in names}, f, indent=2)
+
+            db_path = os.path.join(tmp, f"projects_{count}.db")
+            conn = data_storage.connect(db_path)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO projects (project_id, form_data, updated_at) VALUES (?, ?, 0)",
+                    ((name, json.dumps(form)) for name in names),
+                )
+
+            old_save = median_ms(lambda n: legacy_save(json_path, n, form), probe[:5])
+            old_load = median_ms(lambda n: legacy_load(json_path, n), probe[:5])
+            new_save = median_ms(lambda n: data_storage.save_project_data(n, form, db_path), probe)
+            new_load = median_ms(lambda n: data_storage.load_last_project_data(n, db_path), probe)
+            log_save = median_ms(lambda n: data_storage.save_daily_log(n, form, {"completion": 50},
+                                                                       db_path=db_path), probe)
+            print(f"{count:>7} projects | json save {old_save:9.2f} ms, load {old_load:9.2f} ms "
+                  f"| sqlite save {new_save:6.3f} ms, load {new_load:6.3f} ms, daily log {log_save:6.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Project data store benchmark")
+    parser.add_argument("--projects", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--ops", type=int, default=50)
+    args = parser.parse_args()
+    run(args.projects, args.ops)
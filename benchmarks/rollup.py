@@ -0,0 +1,98 @@
+# benchmarks/rollup.py
+# Roll-up report vs. the daily PDFs it replaces, for a project with photos reused across days.
+#
+#   python -m benchmarks.rollup [--days 7 30] [--photos-per-day 8] [--distinct 40]
+#
+# Each day uses `photos-per-day` photos drawn from a pool of `distinct` (progress
+# shots of the same spots, the logo on every page). Reports render time, file size,
+# image objects in the PDF and peak traced memory.
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import datetime
+import tracemalloc
+
+from PIL import Image as PILImage
+
+from benchmarks.synthetic import scope_items, photo_set, log_form
+from utils import data_storage
+from utils.rollup_report import create_rollup_pdf
+from utils.pdf_generator import create_daily_log_pdf
+
+
+def image_objects(path):
+    with open(path, "rb") as f:
+        return f.read().count(b"/Subtype /Image")
+
+
+def seed_logs(db_path, days, per_day, pool, logo):
+    rng = random.Random(0)
+    scope = scope_items(200)
+    first = datetime.date(2025, 9, 1)
+    for i in range(days):
+        form = log_form(scope=scope, seed=i)
+        form["date"] = (first + datetime.timedelta(days=i)).isoformat()
+        analysis = {"completion": min(100, 3 * i), "matched": rng.sample(scope, 3)}
+        data_storage.save_daily_log("bench", form, analysis, photos=rng.sample(pool, per_day), logo=logo,
+                                    db_path=db_path)
+    return first.isoformat(), (first + datetime.timedelta(days=days - 1)).isoformat()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def peak_of(fn):
+    # A separate run: tracing every allocation slows reportlab down several times
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run(day_counts, per_day, distinct):
+    workdir = tempfile.mkdtemp(prefix="nn_rollup_")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # prepared photo cache lands in the throwaway directory
+    try:
+        pool = photo_set(os.path.join(workdir, "photos"), distinct, size=(1600, 1200))
+        logo = os.path.join(workdir, "logo.png")
+        PILImage.new("RGB", (400, 160), (200, 40, 40)).save(logo)
+        for days in day_counts:
+            db_path = os.path.join(workdir, f"logs_{days}.db")
+            start, end = seed_logs(db_path, days, per_day, pool, logo)
+            out = os.path.join(workdir, f"rollup_{days}.pdf")
+            create_rollup_pdf("bench", start, end, out, db_path=db_path)  # warm the prepared photo cache
+            render = lambda: create_rollup_pdf("bench", start, end, out, db_path=db_path)
+            seconds, peak = timed(render), peak_of(render)
+
+            daily_bytes, daily_images, daily_seconds = 0, 0, 0.0
+            for log in data_storage.iter_daily_logs("bench", start, end, db_path):
+                path = os.path.join(workdir, "daily.pdf")
+                daily_seconds += timed(lambda: create_daily_log_pdf(log["form_data"], log["photos"], log["logo"],
+                                                                    log["analysis"], None, path))
+                daily_bytes += os.path.getsize(path)
+                daily_images += image_objects(path)
+            print(f"{days:>3} days x {per_day} photos ({distinct} distinct) | roll-up {seconds * 1000:8.1f} ms, "
+                  f"{os.path.getsize(out) / 1e6:6.2f} MB, {image_objects(out):4d} images, "
+                  f"peak {peak / 1e6:6.1f} MB | daily PDFs {daily_seconds * 1000:8.1f} ms, "
+                  f"{daily_bytes / 1e6:6.2f} MB, {daily_images:4d} images")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll-up report benchmark")
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30])
+    parser.add_argument("--photos-per-day", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=40)
+    args = parser.parse_args()
+    run(args.days, args.photos_per_day, args.distinct)
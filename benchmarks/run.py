@@ -0,0 +1,265 @@
+# benchmarks/run.py
+# One benchmark suite over the daily-log hot paths, with saved results and regression checks.
+#
+#   python -m benchmarks.run --out bench.json                 # quick sizes
+#   python -m benchmarks.run --full --out bench.json          # scopes up to 10,000 items
+#   python -m benchmarks.run --baseline bench.json            # run, then flag regressions
+#   python -m benchmarks.run --compare old.json new.json      # compare two saved runs
+#   python -m benchmarks.run --only analyze_scope_vs_log pdf  # cases whose name contains a filter
+#
+# Everything runs offline on CPU in a throwaway working directory. The image
+# classifier is a randomly initialised MobileNetV2: same architecture and cost as
+# the real one, no weight download. Each case reports the first call separately
+# (cold caches) and the median of the repeats after it (steady state).
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUICK = {"scope_items": [100, 1000], "log_lines": [5, 40], "photo_sizes": [(1600, 1200), (4032, 3024)],
+         "photo_counts": [5], "pdf_photos": [0, 5], "repeat": 3}
+FULL = {"scope_items": [100, 1000, 10000], "log_lines": [5, 40, 200], "photo_sizes": [(1600, 1200), (4032, 3024)],
+        "photo_counts": [5, 20], "pdf_photos": [0, 10, 30], "repeat": 5}
+PROGRESS_MAX_ITEMS = 1000  # scope_utils.analyze_scope_progress is quadratic in log length
+PROGRESS_MAX_LINES = 40
+
+
+# ---------- TIMING ----------
+def measure(fn, repeat):
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"first_s": first, "median_s": statistics.median(times) if times else first,
+            "min_s": min(times) if times else first, "runs": len(times) + 1}
+
+
+def use_stand_in_model():
+    """Random-weight MobileNetV2 in place of the pretrained download."""
+    from torchvision import models
+    from utils import image_analyzer
+
+    with open(os.path.join(REPO_ROOT, "utils", "imagenet_classes.txt")) as f:
+        image_analyzer._classes = [line.strip() for line in f]
+    image_analyzer._model = models.mobilenet_v2().eval()
+
+
+# ---------- CASES ----------
+def cases(sizes, workdir):
+    """Yield (name, fn, repeat); data for each case is generated before it is yielded."""
+    from benchmarks.synthetic import scope_items, daily_log, photo_set, log_form
+    from benchmarks.scope_pdf import scope_pdf
+
+    repeat = sizes["repeat"]
+    scopes = {n: scope_items(n) for n in sizes["scope_items"]}
+
+    from utils.compare_scope_vs_log import analyze_scope_vs_log
+    for n, scope in scopes.items():
+        for lines in sizes["log_lines"]:
+            log = daily_log(scope, n_lines=lines)
+            yield f"analyze_scope_vs_log/items={n}/lines={lines}", \
+                lambda scope=scope, log=log: analyze_scope_vs_log(scope, log, "", ""), repeat
+
+    from utils.scope_utils import analyze_scope_progress
+    for n, scope in scopes.items():
+        if n > PROGRESS_MAX_ITEMS:
+            continue
+        for lines in sizes["log_lines"]:
+            if lines > PROGRESS_MAX_LINES:
+                continue
+            text, log = "\n".join(scope), daily_log(scope, n_lines=lines)
+            yield f"analyze_scope_progress/items={n}/lines={lines}", \
+                lambda text=text, log=log: analyze_scope_progress(text, log), max(1, repeat // 2)
+
+    from utils import scope_store
+    from utils.scope_parser import parse_scope_file
+
+    def parse_cold(path):
+        scope_store._cache.clear()
+        shutil.rmtree(scope_store.SCOPE_STORE, ignore_errors=True)
+        parse_scope_file(path, "bench")
+
+    for pages in (10, 100):
+        path = os.path.join(workdir, f"scope_{pages}p.pdf")
+        scope_pdf(path, pages)
+        yield f"parse_scope_file/pdf/pages={pages}/cold", lambda path=path: parse_cold(path), repeat
+        yield f"parse_scope_file/pdf/pages={pages}/cached", lambda path=path: parse_scope_file(path, "bench"), repeat
+    try:
+        import docx
+    except ImportError:
+        pass
+    else:
+        document = docx.Document()
+        for item in scopes[sizes["scope_items"][-1]]:
+            document.add_paragraph(item)
+        path = os.path.join(workdir, "scope.docx")
+        document.save(path)
+        yield "parse_scope_file/docx/cold", lambda: parse_cold(path), repeat
+
+    from utils.image_compression import compress_and_rotate_image
+    from utils.image_utils import preprocess_images
+    photos = {}
+    for width, height in sizes["photo_sizes"]:
+        photos[(width, height)] = photo_set(os.path.join(workdir, f"photos_{width}x{height}"),
+                                            max(sizes["photo_counts"]), size=(width, height))
+        src = photos[(width, height)][0]
+        out = os.path.join(workdir, "compressed.jpg")
+        yield f"compress_and_rotate_image/{width}x{height}", \
+            lambda src=src, out=out: compress_and_rotate_image(src, out), repeat
+
+    large = photos[sizes["photo_sizes"][-1]]
+    for count in sizes["photo_counts"]:
+        yield f"preprocess_images/{count}x{sizes['photo_sizes'][-1][0]}", \
+            lambda count=count: preprocess_images(large[:count]), repeat
+
+    from utils.image_analyzer import classify_image, classify_images
+    use_stand_in_model()
+    yield "classify_image/stand-in", lambda: classify_image(large[0]), repeat
+    yield f"classify_images/stand-in/{len(large)}", lambda: classify_images(large), max(1, repeat // 2)
+
+    from utils.pdf_generator import create_daily_log_pdf
+    small = photo_set(os.path.join(workdir, "pdf_photos"), max(sizes["pdf_photos"]), size=sizes["photo_sizes"][0])
+    pdf_scope = scopes[sizes["scope_items"][0]]
+    form = log_form(scope=pdf_scope)
+    analysis = analyze_scope_vs_log(pdf_scope, form["work_done"], form["crew_notes"], form["safety_notes"])
+    for count in sizes["pdf_photos"]:
+        out = os.path.join(workdir, "daily_log.pdf")
+        yield f"create_daily_log_pdf/photos={count}", \
+            lambda count=count, out=out: create_daily_log_pdf(form, small[:count], None, analysis, None, out), repeat
+
+    client = _flask_client()
+    scope_path = os.path.join(workdir, "scope_10p.pdf")
+    submissions = iter(range(1 << 30))
+    for count in sizes["pdf_photos"]:
+        # A fresh equipment note per call defeats the render cache; the /repeat case hits it
+        yield f"generate_form/photos={count}", \
+            lambda count=count: _generate_form(client, dict(form, equipment_used=f"Lift #{next(submissions)}"),
+                                               scope_path, small[:count]), repeat
+        yield f"generate_form/photos={count}/repeat", \
+            lambda count=count: _generate_form(client, form, scope_path, small[:count]), repeat
+
+
+def _flask_client():
+    from app import app
+
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def _generate_form(client, form, scope_path, photo_paths):
+    """POST the daily log form with a scope PDF and photos; the inline queue renders before returning.
+    An identical earlier submission answers 200 with the PDF it already rendered."""
+    files = [open(path, "rb") for path in [scope_path, *photo_paths]]
+    try:
+        data = dict(form)
+        data["scope_doc"] = (files[0], os.path.basename(scope_path))
+        data["images"] = [(f, os.path.basename(f.name)) for f in files[1:]]
+        response = client.post("/generate_form", data=data, content_type="multipart/form-data")
+        assert response.status_code in (200, 202), response.status_code
+        # /jobs/<id>/pdf serves from the app's root, not the throwaway directory
+        status = client.get(response.get_json()["status_url"]).get_json()
+        assert status["status"] == "finished", status
+        assert os.path.exists(os.path.join("static", "generated", status["filename"]))
+    finally:
+        for f in files:
+            f.close()
+
+
+# ---------- RESULTS ----------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(sizes, only=None):
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="nn_bench_")
+    cwd = os.getcwd()
+    # Relative static/ paths (uploads, caches, project db) land in the throwaway directory
+    os.environ.setdefault("QUEUE_BACKEND", "inline")
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+    try:
+        for name, fn, repeat in cases(sizes, workdir):
+            if only and not any(f in name for f in only):
+                continue
+            result = measure(fn, repeat)
+            results[name] = result
+            print(f"{name:<55} median {result['median_s'] * 1000:10.2f} ms "
+                  f"| first {result['first_s'] * 1000:10.2f} ms", flush=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+
+def compare(old, new, threshold, min_delta_ms):
+    """Print per-case change; returns the names that got slower by more than `threshold`."""
+    regressions = []
+    print(f"{'case':<55} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        if name not in old["results"] or name not in new["results"]:
+            print(f"{name:<55} {'only in ' + ('new' if name in new['results'] else 'old'):>30}")
+            continue
+        before = old["results"][name]["median_s"]
+        after = new["results"][name]["median_s"]
+        change = after / before - 1 if before else 0.0
+        slower = change > threshold and (after - before) * 1000 > min_delta_ms
+        if slower:
+            regressions.append(name)
+        print(f"{name:<55} {before * 1000:10.2f} {after * 1000:10.2f} {change:+8.1%}"
+              f"{'  ⚠️ REGRESSION' if slower else ''}")
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily log hot-path benchmark suite")
+    parser.add_argument("--full", action="store_true", help="larger scopes, logs and photo sets")
+    parser.add_argument("--only", nargs="+", help="run only cases whose name contains one of these")
+    parser.add_argument("--out", help="save results as JSON")
+    parser.add_argument("--baseline", help="compare this run against a saved JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved runs and exit")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown flagged as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load(args.compare[0]), load(args.compare[1]), args.threshold, args.min_delta_ms)
+        sys.exit(1 if regressions else 0)
+
+    report = run(FULL if args.full else QUICK, args.only)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Saved {len(report['results'])} results to {args.out}")
+    if args.baseline:
+        regressions = compare(load(args.baseline), report, args.threshold, args.min_delta_ms)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,77 @@
+# benchmarks/scope_normalize.py
+# Scope normalization: ignore-phrase filtering and near-duplicate collapse, and what it saves downstream.
+#
+#   python -m benchmarks.scope_normalize [--items 1000 10000] [--duplicates 0.3]
+#
+# A share of the synthetic scope is repeated as spec-section variants ("Contractor
+# shall ... per spec"), and as many items again get a more specific sibling ("...
+# east wing bay 7") that is different work and must be kept. Reports the old
+# per-phrase filter vs. the compiled pattern, the collapse time, how much the scope
+# shrank, how many siblings survived and the per-log analysis time before and after.
+
+import time
+import random
+import argparse
+
+from benchmarks.synthetic import scope_items, daily_log
+from utils.scope_normalize import IGNORE_PHRASES, collapse_duplicates, ignore_pattern, normalize_scope
+from utils.compare_scope_vs_log import analyze_scope_vs_log
+
+GENERIC = ["Project management and coordination", "Superintendent on site daily", "Final cleanup of work areas"]
+
+
+def spec_scope(n, duplicate_share, seed=0):
+    """(shuffled scope, the specific siblings in it that are not duplicates)"""
+    rng = random.Random(seed)
+    items = scope_items(n, seed)
+    variants = [f"Contractor shall {item[0].lower()}{item[1:]} per spec"
+                for item in rng.sample(items, int(n * duplicate_share))]
+    siblings = [f"{item} east wing bay {rng.randint(1, 9)}"
+                for item in rng.sample(items, int(n * duplicate_share))]
+    generic = [f"{rng.choice(GENERIC)} (phase {i})" for i in range(n // 50)]
+    scope = items + variants + siblings + generic
+    rng.shuffle(scope)
+    return scope, siblings
+
+
+def legacy_filter(items):
+    return [item for item in items if not any(x.lower() in item.lower() for x in IGNORE_PHRASES)]
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(item_counts, duplicate_share, repeat):
+    pattern = ignore_pattern(IGNORE_PHRASES)
+    for n in item_counts:
+        scope, siblings = spec_scope(n, duplicate_share)
+        old_filter = best_of(repeat, legacy_filter, scope)
+        new_filter = best_of(repeat, lambda: [item for item in scope if not pattern.search(item.lower())])
+        kept = legacy_filter(scope)
+        collapse = best_of(repeat, collapse_duplicates, kept)
+        result = normalize_scope(scope)
+        report = result["report"]
+        kept_siblings = len(set(siblings) & set(result["checklist"]))
+
+        logs = [daily_log(scope, seed=i) for i in range(20)]
+        before = best_of(repeat, lambda: [analyze_scope_vs_log(kept, log, "", "") for log in logs]) / len(logs)
+        after = best_of(repeat, lambda: [analyze_scope_vs_log(result["checklist"], log, "", "")
+                                         for log in logs]) / len(logs)
+        print(f"{len(scope):>6} items | filter {old_filter * 1000:7.2f} -> {new_filter * 1000:6.2f} ms "
+              f"| collapse {collapse * 1000:7.1f} ms | {report['ignored']} ignored, {report['duplicates']} "
+              f"duplicates, {report['shrink_pct']}% smaller, {kept_siblings}/{len(siblings)} siblings kept | per log {before * 1000:6.2f} -> {after * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scope normalization benchmark")
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--duplicates", type=float, default=0.3, help="share of items repeated as variants")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.items, args.duplicates, args.repeat)
@@ -0,0 +1,81 @@
+# benchmarks/scope_pdf.py
+# Scope PDF extraction: legacy serial text concatenation vs. streamed page ranges.
+#
+#   python -m benchmarks.scope_pdf [--pages 50 300 1000] [--workers 1 4] [--repeat 3]
+
+import os
+import time
+import argparse
+import tempfile
+
+from reportlab.pdfgen import canvas
+
+from benchmarks.synthetic import scope_items
+from utils import scope_stream
+from utils.scope_parser import clean_text
+
+LINES_PER_PAGE = 40
+
+
+def scope_pdf(path, pages, seed=0):
+    items = scope_items(pages * LINES_PER_PAGE, seed)
+    c = canvas.Canvas(path)
+    for page in range(pages):
+        for i in range(LINES_PER_PAGE):
+            c.drawString(40, 800 - 19 * i, items[page * LINES_PER_PAGE + i])
+        c.showPage()
+    c.save()
+
+
+def legacy_extract(path):
+    """Old path: concatenate every page's text, then split and clean once."""
+    text = ""
+    if scope_stream._backend() == "pymupdf":
+        import fitz
+
+        with fitz.open(path) as doc:
+            for page in doc:
+                text += page.get_text()
+    else:
+        from PyPDF2 import PdfReader
+
+        for page in PdfReader(path).pages:
+            text += page.extract_text() or ""
+    return clean_text(text)
+
+
+def streamed_extract(path, workers):
+    return list(dict.fromkeys(scope_stream.extract_scope_stream(path, max_workers=workers)))
+
+
+def best_of(repeat, fn, *args):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run(page_counts, worker_counts, repeat):
+    print(f"backend: {scope_stream._backend()} | cpus: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"scope_{pages}.pdf")
+            scope_pdf(path, pages)
+            old, expected = best_of(repeat, legacy_extract, path)
+            line = f"{pages:>5} pages | serial {old * 1000:8.1f} ms"
+            for workers in worker_counts:
+                new, lines = best_of(repeat, streamed_extract, path, workers)
+                assert lines == expected, "streamed extraction differs from serial"
+                line += f" | {workers} workers {new * 1000:8.1f} ms ({old / new:4.1f}x)"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scope PDF extraction benchmark")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 300, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.pages, args.workers, args.repeat)
@@ -0,0 +1,51 @@
+# benchmarks/scope_progress.py
+# Daily log scoring late in a project: full scope vs. only the items the ledger has open.
+#
+#   python -m benchmarks.scope_progress [--items 5000] [--done 0 0.5 0.9 0.99] [--repeat 20]
+
+import time
+import random
+import argparse
+
+from benchmarks.synthetic import scope_items, daily_log
+from utils.scope_index import build_scope_index
+from utils.compare_scope_vs_log import analyze_scope_vs_log
+
+
+def best_of(repeat, fn, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def score_open(index, log, rows):
+    return index.score(log, rows)
+
+
+def run(n_items, done_ratios, repeat):
+    scope = scope_items(n_items)
+    index = build_scope_index(scope)
+    log = daily_log(scope, n_lines=12)
+    rng = random.Random(0)
+    full_score = best_of(repeat, index.score, log)
+    print(f"{n_items} items | full score {full_score * 1000:.3f} ms")
+    for ratio in done_ratios:
+        done = set(rng.sample(scope, int(ratio * n_items)))
+        rows = [row for row, item in enumerate(scope) if item not in done]
+        subset = best_of(repeat, score_open, index, log, rows)
+        full = best_of(repeat, analyze_scope_vs_log, scope, log, "", "")
+        incremental = best_of(repeat, analyze_scope_vs_log, scope, log, "", "", done_items=done)
+        print(f"  {ratio:5.0%} done | score open rows {subset * 1000:7.3f} ms "
+              f"| analysis full {full * 1000:7.2f} ms, with done items {incremental * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental scope progress benchmark")
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--done", type=float, nargs="+", default=[0, 0.5, 0.9, 0.99])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.items, args.done, args.repeat)
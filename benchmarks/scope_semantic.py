@@ -0,0 +1,93 @@
+# benchmarks/scope_semantic.py
+# Semantic scope matching: per-log latency against TF-IDF at growing scope sizes.
+#
+#   python -m benchmarks.scope_semantic [--model DIR] [--items 1000 10000] [--logs 50]
+#
+# Without --model a randomly initialized encoder shaped like all-MiniLM-L6-v2
+# (6 layers, 384 wide) is saved to a temp directory: the same compute, no download,
+# meaningless matches. Reports the one-off scope embedding, the memory-mapped reload
+# a fresh worker pays, and the median time to score one log.
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+from benchmarks.synthetic import scope_items, daily_log, TRADES, VERBS, OBJECTS, PLACES
+from utils import scope_embeddings
+from utils.compare_scope_vs_log import analyze_scope_vs_log
+from utils.scope_index import build_scope_index, scope_hash
+
+
+def random_encoder(directory):
+    """A MiniLM-L6-shaped BERT with random weights and a word-level vocabulary."""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    words = {w.lower() for phrase in TRADES + VERBS + OBJECTS + PLACES for w in phrase.split()}
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(words) + [str(d) for d in range(10)]
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "vocab.txt"), "w") as f:
+        f.write("\n".join(vocab) + "\n")
+    BertTokenizerFast(os.path.join(directory, "vocab.txt")).save_pretrained(directory)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=384, num_hidden_layers=6, num_attention_heads=12,
+                        intermediate_size=1536, max_position_embeddings=512)
+    BertModel(config).eval().save_pretrained(directory)
+    return directory
+
+
+def median_s(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(model_dir, item_counts, n_logs):
+    workdir = tempfile.mkdtemp(prefix="nn_semantic_")
+    try:
+        model_dir = model_dir or random_encoder(os.path.join(workdir, "encoder"))
+        start = time.perf_counter()
+        encoder = scope_embeddings.load_encoder(model_dir)
+        print(f"encoder {model_dir} | loaded in {time.perf_counter() - start:.2f} s | dim {encoder.dim}")
+        scope_embeddings.EMBEDDING_MODEL = model_dir
+
+        for n in item_counts:
+            scope = scope_items(n)
+            logs = [daily_log(scope, seed=i) for i in range(n_logs)]
+            index_dir = os.path.join(workdir, f"scope_{n}.index")
+            build_scope_index(scope, index_dir)
+
+            start = time.perf_counter()
+            scope_embeddings.scope_matrix(scope, encoder, index_dir)
+            embed = time.perf_counter() - start
+            path = scope_embeddings.embeddings_path(index_dir, scope_hash(scope), encoder.fingerprint)
+            scope_embeddings.clear_memory()  # what a fresh worker sees
+            start = time.perf_counter()
+            scope_embeddings.scope_matrix(scope, encoder, index_dir)
+            reload = time.perf_counter() - start
+
+            logs_iter = iter(logs * 2)
+            tfidf = median_s(lambda: analyze_scope_vs_log(scope, next(logs_iter), "", "", index_dir,
+                                                          matching="tfidf"), n_logs)
+            logs_iter = iter(logs * 2)
+            semantic = median_s(lambda: analyze_scope_vs_log(scope, next(logs_iter), "", "", index_dir,
+                                                             matching="semantic"), n_logs)
+            scope_embeddings.clear_memory()
+            print(f"{n:>6} items | embed scope {embed:7.2f} s, {os.path.getsize(path) / 1e6:5.1f} MB float16, "
+                  f"mmap reload {reload * 1000:6.2f} ms | per log: tfidf {tfidf * 1000:7.2f} ms, "
+                  f"semantic {semantic * 1000:7.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic scope matching benchmark")
+    parser.add_argument("--model", help="local encoder directory (default: random MiniLM-shaped weights)")
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--logs", type=int, default=50, help="logs timed per scope size")
+    args = parser.parse_args()
+    run(args.model, args.items, args.logs)
@@ -0,0 +1,103 @@
+# benchmarks/scope_xlsx.py
+# Estimate workbooks: full openpyxl load (the old reader) vs. streamed scope items.
+#
+#   python -m benchmarks.scope_xlsx [--rows 1000 10000 50000]
+#
+# Each reader runs in a fresh process so its peak RSS is its own; the figure
+# reported is the growth over the process after imports.
+
+import os
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import scope_items
+
+UNITS = ["CY", "SF", "LF", "EA", "LS", "TON"]
+
+
+def estimate_workbook(path, n_rows, seed=0):
+    """Title rows, a header and `n_rows` line items with codes, quantities and costs."""
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Estimate")
+    sheet.append(["Benchmark Project: Scope of Work"])
+    sheet.append([])
+    header = []
+    for name in ["Cost Code", "Description", "Qty", "Unit", "Unit Price", "Total"]:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    for item in scope_items(n_rows, seed):
+        qty, price = rng.randint(1, 500), round(rng.uniform(5, 400), 2)
+        cost = WriteOnlyCell(sheet, value=round(qty * price, 2))
+        cost.number_format = "#,##0.00"
+        sheet.append([f"{rng.randint(1, 33):02d}-{rng.randint(100, 999)}", item, qty, rng.choice(UNITS), price, cost])
+    workbook.save(path)
+
+
+def legacy_read(path):
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path)
+    cells = []
+    for sheet in wb.worksheets:
+        for row in sheet.iter_rows(values_only=True):
+            for cell in row:
+                if cell and isinstance(cell, str) and len(cell.strip()) > 3:
+                    cells.append(str(cell))
+    return len("\n".join(cells).splitlines())
+
+
+def streamed_read(path):
+    from utils.scope_xlsx import iter_scope_items
+
+    return sum(1 for _ in iter_scope_items(path))
+
+
+def _measure(reader, path):
+    import openpyxl  # noqa: F401  imports are not part of the reader's growth
+    import utils.scope_xlsx  # noqa: F401
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    count = {"legacy": legacy_read, "streamed": streamed_read}[reader](path)
+    seconds = time.perf_counter() - start
+    growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    return count, seconds, growth_kb
+
+
+def measure(reader, path):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_measure, reader, path).result()
+
+
+def run(row_counts):
+    workdir = tempfile.mkdtemp(prefix="nn_xlsx_")
+    try:
+        for n in row_counts:
+            path = os.path.join(workdir, f"estimate_{n}.xlsx")
+            estimate_workbook(path, n)
+            lines, old_s, old_kb = measure("legacy", path)
+            items, new_s, new_kb = measure("streamed", path)
+            print(f"{n:>7} rows ({os.path.getsize(path) / 1e6:5.1f} MB) | full load {old_s * 1000:8.1f} ms, "
+                  f"+{old_kb / 1024:7.1f} MB, {lines} flat lines | streamed {new_s * 1000:8.1f} ms, "
+                  f"+{new_kb / 1024:6.1f} MB, {items} items")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XLSX scope ingestion benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,66 @@
+# benchmarks/startup.py
+# Cold-start import time per module, each measured in a fresh interpreter.
+#
+#   python -m benchmarks.startup [--modules app worker ...] [--top 8] [--json out.json]
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = [
+    "app",
+    "utils.compare_scope_vs_log",
+    "utils.pdf_generator",
+    "utils.scope_parser",
+    "utils.image_analyzer",
+]
+
+
+def measure(module, top):
+    """Run `python -X importtime -c 'import module'` and parse its report."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "WARMUP_ON_START": ""},
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  <self us> | <cumulative us> | <indented module name>"
+        # Nesting is encoded as extra indentation of the name
+        _, cumulative_us, name = line.split("|")
+        depth = len(name) - len(name.lstrip())
+        rows.append((name.strip(), depth, int(cumulative_us)))
+
+    own = next((r for r in rows if r[0] == module), None)
+    direct = [r for r in rows if own and r[1] > own[1] and r[1] == min(d for _, d, _ in rows if d > own[1])]
+    heaviest = sorted(direct, key=lambda r: -r[2])[:top]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "total_ms": round(own[2] / 1000, 1) if own else None,
+        "direct_imports_ms": {name: round(cum / 1000, 1) for name, _, cum in heaviest},
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = [measure(module, args.top) for module in args.modules]
+    for r in results:
+        status = f"{r['total_ms']:8.1f} ms" if r["ok"] else f"FAILED ({r['error']})"
+        print(f"{r['module']:<30} {status}")
+        for name, ms in r["direct_imports_ms"].items():
+            print(f"    {name:<26} {ms:8.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,75 @@
+# benchmarks/synthetic.py
+# Deterministic synthetic scopes and daily logs for the benchmarks.
+
+import random
+from typing import List
+
+TRADES = ["concrete", "framing", "drywall", "roofing", "electrical", "plumbing", "grading",
+          "excavation", "landscaping", "paving", "masonry", "painting", "insulation", "HVAC"]
+VERBS = ["Install", "Remove", "Pour", "Compact", "Grade", "Frame", "Inspect", "Trench",
+         "Backfill", "Patch", "Seal", "Prime", "Anchor", "Level", "Demolish"]
+OBJECTS = ["slab", "footing", "retaining wall", "downspout", "side yard", "driveway",
+           "construction entrance", "rebar", "forms", "trench", "fence", "joists", "roof deck",
+           "window headers", "sheathing", "conduit", "drain line", "subfloor", "gravel base"]
+PLACES = ["at north elevation", "along back fence", "near tree area", "at garage",
+          "per detail A-3", "at grid line 4", "from front downspout to back fence",
+          "on level 2", "at east property line", "per structural drawings"]
+
+
+def scope_items(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        items.append(f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(PLACES)} "
+                     f"({rng.choice(TRADES)}, item {i + 1})")
+    return items
+
+
+def daily_log(scope: List[str], n_lines: int = 12, in_scope_ratio: float = 0.6, seed: int = 1) -> str:
+    """Mix of paraphrased scope items and unrelated notes, one per line."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n_lines):
+        if scope and rng.random() < in_scope_ratio:
+            words = rng.choice(scope).split()
+            lines.append(" ".join(words[:max(3, len(words) - rng.randint(0, 3))]))
+        else:
+            lines.append(f"Crew met with {rng.choice(['owner', 'inspector', 'architect'])} about "
+                         f"{rng.choice(['delivery schedule', 'parking', 'site access', 'change order'])}")
+    return "\n".join(lines)
+
+
+def photo_set(directory: str, count: int, size=(4032, 3024), seed: int = 2) -> List[str]:
+    """Write `count` phone-sized JPEGs (gradient plus noise, so they compress like photos)."""
+    import os
+    import numpy as np
+    from PIL import Image
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    paths = []
+    for i in range(count):
+        channels = [(x + y * 0.5 + 40 * i) % 256, (y + x * 0 + 20 * i) % 256, (x * 0.3 + y * 0.7) % 256]
+        base = np.stack(channels, axis=-1)
+        noise = rng.normal(0, 18, size=(height, width, 3)).astype(np.float32)
+        pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+        path = os.path.join(directory, f"photo_{i:03d}_{width}x{height}.jpg")
+        Image.fromarray(pixels).save(path, format="JPEG", quality=92)
+        paths.append(path)
+    return paths
+
+
+def log_form(project_name: str = "Benchmark Project", scope=None, seed: int = 1) -> dict:
+    return {
+        "project_name": project_name,
+        "location": "98 Upper Oaks, San Rafael, CA",
+        "date": "2025-10-22",
+        "supervisor": "Site Supervisor",
+        "weather": "Sunny, 68F",
+        "work_done": daily_log(scope or scope_items(50), seed=seed),
+        "crew_notes": "Crew of 6 on site from 7am to 3:30pm.",
+        "safety_notes": "Tailgate meeting held. No incidents.",
+    }
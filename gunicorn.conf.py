@@ -0,0 +1,6 @@
+# gunicorn.conf.py — picked up automatically from the working directory.
+import os
+
+# GUNICORN_PRELOAD=1 imports the app (and runs WARMUP_ON_START) once in the master,
+# so forked workers share the loaded modules and model weights copy-on-write.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
@@ -2,8 +2,28 @@ import os
 import redis
 from rq import Queue
 
-redis_url = os.getenv("UPSTASH_REDIS_REST_URL")
+# QUEUE_BACKEND selects where jobs go:
+#   redis     - a real Redis (REDIS_URL, or the Upstash URL/token)
+#   fakeredis - in-memory Redis stand-in; jobs wait for run_pending_jobs()
+#   inline    - in-memory Redis stand-in; jobs run synchronously when enqueued
+# Without a Redis URL it defaults to inline so the app works offline.
+redis_url = os.getenv("REDIS_URL") or os.getenv("UPSTASH_REDIS_REST_URL")
 redis_token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "redis" if redis_url else "inline")
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "600"))        # seconds a render may take
+RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "86400"))    # keep job status for a day
 
-conn = redis.Redis.from_url(redis_url, password=redis_token)
-queue = Queue(connection=conn)
+if QUEUE_BACKEND == "redis":
+    conn = redis.Redis.from_url(redis_url, password=redis_token)
+else:
+    import fakeredis
+    conn = fakeredis.FakeStrictRedis()
+
+queue = Queue(connection=conn, is_async=(QUEUE_BACKEND != "inline"))
+
+
+def run_pending_jobs():
+    """Drain the queue in this process (fakeredis backend, tests, one-off scripts)."""
+    from rq import SimpleWorker
+
+    SimpleWorker([queue], connection=conn).work(burst=True)
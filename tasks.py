@@ -1,6 +1,200 @@
 import os
-from generate_pdf import generate_daily_log_pdf
+import json
 
-def generate_pdf_task(form_data, image_paths, output_path):
-    # Call your existing PDF function
-    return generate_daily_log_pdf(form_data, image_paths, output_path)
\ No newline at end of file
+from utils import metrics, profiling
+
+def generate_pdf_task(form_data, scope_path, image_paths, logo_path, output_path=None, upload_job_id=None,
+                      profile=False):
+    """
+    Background job behind /generate_form: scope analysis plus PDF rendering.
+    Returns a small summary that /jobs/<job_id> reports once the job finishes.
+    With no output_path the PDF is built in memory and returned in the result.
+    Uploads referenced by `upload_job_id` are released once the job is done.
+    `profile` (set when the request was profiled) runs the job under the profiler.
+    """
+    from rq import get_current_job
+
+    # Logs of the job carry its id, which /generate_form logged as job_enqueued
+    job = get_current_job()
+    job_id = job.id if job is not None else upload_job_id
+    token = metrics.request_id.set(job_id or metrics.request_id.get())
+    try:
+        with profiling.profiled("job", job_id or "pdf", profile or profiling.should_profile()), \
+                metrics.stage("pdf_job"):
+            result = _generate_pdf(form_data, scope_path, image_paths, logo_path, output_path)
+        metrics.log("job_finished", completion=result.get("completion"), photos=len(image_paths))
+        return result
+    except Exception as e:
+        metrics.log("job_failed", level="error", error=str(e))
+        raise
+    finally:
+        if upload_job_id:
+            from utils.upload_store import release_job, maybe_evict
+
+            release_job(upload_job_id)
+            maybe_evict()
+        if output_path:
+            from utils import pdf_images, render_cache
+
+            render_cache.maybe_evict(os.path.dirname(output_path))
+            pdf_images.maybe_evict()
+        _flush_metrics()
+        metrics.request_id.reset(token)
+
+
+def _flush_metrics():
+    """Hand the job's stage timings and counters to /metrics, which the rq worker does not serve."""
+    from task_queue import conn
+
+    metrics.flush(conn)
+
+
+def _load_done_items(project_id, log_date):
+    """Scope items finished before `log_date`; None (score everything) if unavailable."""
+    from utils.data_storage import load_done_items
+
+    try:
+        # Items finished on this day or later are scored again, so re-submitting or
+        # back-filling a log reports the same matches it did the first time
+        return load_done_items(project_id, before=log_date)
+    except Exception as e:
+        metrics.log("scope_progress_unavailable", level="warning", project_id=project_id, error=str(e))
+        return None
+
+
+def _record_log(project_id, log_date, form_data, comparison_result, image_paths=(), logo_path=None):
+    # History is a side record: a storage hiccup must not cost the user their PDF
+    from utils.data_storage import save_project_data, save_daily_log, record_progress
+
+    try:
+        save_project_data(project_id, form_data)
+        save_daily_log(project_id, form_data, comparison_result, log_date, photos=image_paths, logo=logo_path)
+        record_progress(project_id, log_date, comparison_result.get("matched", []),
+                        comparison_result.get("in_progress", []))
+    except Exception as e:
+        metrics.log("log_history_save_failed", level="warning", project_id=project_id, error=str(e))
+
+
+def _attach_item_details(scope_path, comparison_result):
+    """Cost code, quantity and unit of spreadsheet scope items, for the lists in the PDF."""
+    from utils.scope_store import items_path_for, read_items
+    from utils.scope_xlsx import item_details
+
+    path = items_path_for(scope_path)
+    if not os.path.exists(path):
+        return
+    lines = [item for key in ("matched", "in_progress", "unmatched") for item in comparison_result.get(key, [])]
+    try:
+        details = item_details(read_items(path), lines)
+    except (OSError, ValueError) as e:
+        metrics.log("scope_items_unreadable", level="warning", file=path, error=str(e))
+        return
+    if details:
+        comparison_result["item_details"] = details
+
+
+def _generate_pdf(form_data, scope_path, image_paths, logo_path, output_path):
+    from utils.compare_scope_vs_log import analyze_scope_vs_log
+    from utils.pdf_generator import create_daily_log_pdf, render_daily_log_pdf
+    from utils.scope_index import index_dir_for
+    from utils.data_storage import project_key, log_date_for
+    from utils.render_cache import tmp_path_for
+
+    try:
+        with open(scope_path, "r") as f:
+            saved_scope = json.load(f)
+    except (OSError, ValueError):
+        saved_scope = []
+
+    project_id = project_key(form_data.get("project_name"))
+    log_date = log_date_for(form_data)
+
+    done_items = _load_done_items(project_id, log_date)
+    with metrics.stage("scope_analysis"):
+        comparison_result = analyze_scope_vs_log(
+            saved_scope,
+            form_data.get("work_done", ""),
+            form_data.get("crew_notes", ""),
+            form_data.get("safety_notes", ""),
+            index_dir=index_dir_for(scope_path),
+            done_items=done_items,
+        )
+    _attach_item_details(scope_path, comparison_result)
+
+    with metrics.stage("history_save"):
+        _record_log(project_id, log_date, form_data, comparison_result, image_paths, logo_path)
+
+    if output_path is None:
+        with metrics.stage("pdf_build"):
+            pdf = render_daily_log_pdf(form_data, image_paths, logo_path, comparison_result)
+        metrics.count("pdf_bytes", len(pdf), kind="daily_log")
+        return {
+            "pdf": pdf,
+            "completion": comparison_result.get("completion", 0),
+        }
+
+    # Rendered beside the target and moved into place: output_path is keyed by the
+    # inputs (utils/render_cache.py), so it must only ever appear complete
+    tmp_path = tmp_path_for(output_path)
+    try:
+        with metrics.stage("pdf_build"):
+            create_daily_log_pdf(form_data, image_paths, logo_path, comparison_result, None, tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    metrics.count("pdf_bytes", os.path.getsize(output_path), kind="daily_log")
+
+    return {
+        "filename": os.path.basename(output_path),
+        "completion": comparison_result.get("completion", 0),
+    }
+
+
+def generate_rollup_task(project_id, start, end, output_path=None, profile=False):
+    """
+    Background job behind /projects/<project_id>/reports: one PDF of the project's
+    daily logs from `start` to `end`. With no output_path the PDF is built in
+    memory and returned in the result.
+    """
+    from io import BytesIO
+    from rq import get_current_job
+    from utils.rollup_report import create_rollup_pdf
+    from utils.render_cache import tmp_path_for, maybe_evict
+
+    job = get_current_job()
+    token = metrics.request_id.set(job.id if job is not None else metrics.request_id.get())
+    try:
+        with profiling.profiled("job", f"rollup {project_id}", profile or profiling.should_profile()), \
+                metrics.stage("rollup_job"):
+            if output_path is None:
+                buffer = BytesIO()
+                counts = create_rollup_pdf(project_id, start, end, buffer)
+                metrics.count("pdf_bytes", buffer.tell(), kind="rollup")
+                result = {"pdf": buffer.getvalue(), "download_name": f"rollup_{project_id}_{start}_{end}.pdf",
+                          **counts}
+            else:
+                tmp_path = tmp_path_for(output_path)
+                try:
+                    counts = create_rollup_pdf(project_id, start, end, tmp_path)
+                    os.replace(tmp_path, output_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                metrics.count("pdf_bytes", os.path.getsize(output_path), kind="rollup")
+                result = {"filename": os.path.basename(output_path), **counts}
+        metrics.log("job_finished", project_id=project_id, start=start, end=end, **counts)
+        return result
+    except Exception as e:
+        metrics.log("job_failed", level="error", error=str(e))
+        raise
+    finally:
+        if output_path:
+            from utils import pdf_images
+
+            maybe_evict(os.path.dirname(output_path))
+            pdf_images.maybe_evict()
+        _flush_metrics()
+        metrics.request_id.reset(token)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Jobs stay queued until run_pending_jobs(), as they would for a separate rq worker
+    monkeypatch.setenv("QUEUE_BACKEND", "fakeredis")
+    monkeypatch.chdir(tmp_path)
+    for module in ("app", "tasks", "task_queue"):
+        sys.modules.pop(module, None)
+    from app import app
+
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def test_job_stage_reaches_metrics(client):
+    import task_queue
+    from utils import metrics
+    from utils.data_storage import save_daily_log
+
+    save_daily_log("tower", {"project_name": "tower", "supervisor_name": "Ana"}, log_date="2025-10-20")
+    response = client.post("/projects/tower/reports", json={"start": "2025-10-20", "end": "2025-10-20"})
+    assert response.status_code == 202, response.get_json()
+    assert 'stage="rollup_job"' not in client.get("/metrics").get_data(as_text=True)
+
+    task_queue.run_pending_jobs()
+    # The job flushed its numbers to Redis: nothing is left in this process's dicts
+    assert not any(name == "stage_seconds" and ("stage", "rollup_job") in labels
+                   for name, labels in metrics._histograms)
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'nailsnotes_stage_seconds_count{stage="rollup_job"} 1' in text
+    assert 'nailsnotes_pdf_bytes_total{kind="rollup"}' in text
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from utils import classification_cache, compare_scope_vs_log, pdf_images
+from utils.render_cache import render_key
+
+
+def _key(scope_path):
+    return render_key({"project_name": "tower", "work_done": "Poured slab"}, "2025-10-20", scope_path, [], None)
+
+
+@pytest.mark.parametrize("module, name, value", [
+    (pdf_images, "PDF_PHOTO_DPI", 300),
+    (compare_scope_vs_log, "SCOPE_MATCHING", "semantic"),
+    (classification_cache, "CLASSIFY_BACKEND", "int8_dynamic"),
+])
+def test_settings_change_the_key(tmp_path, monkeypatch, module, name, value):
+    monkeypatch.setattr(classification_cache, "CLASSIFY_CACHE_DB", str(tmp_path / "classifications.db"))
+    scope_path = tmp_path / "scope.txt"
+    scope_path.write_text("Pour slab at garage level 2\n")
+    before = _key(str(scope_path))
+    assert _key(str(scope_path)) == before
+    monkeypatch.setattr(module, name, value)
+    assert _key(str(scope_path)) != before
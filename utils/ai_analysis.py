@@ -1,22 +1,15 @@
 # utils/ai_analysis.py
 
-from .image_analyzer import classify_image
+def analyze_images_with_mobilenet(photo_paths, batch_size=None):
+    # Photos classified before (same content, same model) come from the cache;
+    # torch/torchvision are only imported once a photo actually needs the model
+    from .classification_cache import classify_cached, model_version_in_use
 
-def analyze_images_with_mobilenet(photo_paths):
-    results = []
-    for path in photo_paths:
-        try:
-            label, confidence = classify_image(path)
-            results.append({
-                "image_path": path,
-                "label": label,
-                "confidence": confidence
-            })
-        except Exception as e:
-            results.append({
-                "image_path": path,
-                "label": "Error",
-                "confidence": 0.0,
-                "error": str(e)
-            })
-    return results
+    def classify(paths):
+        from .image_analyzer import classify_images, BATCH_SIZE
+
+        # One forward pass per batch; unreadable photos come back with label "Error"
+        return classify_images(paths, batch_size=batch_size or BATCH_SIZE)
+
+    # Keyed by the backend that actually runs, not the one CLASSIFY_BACKEND asked for
+    return classify_cached(photo_paths, classify, model_version=model_version_in_use)
@@ -0,0 +1,230 @@
+# utils/classification_cache.py
+# Photo classifications cached by image content hash and model version.
+#
+#   in-process LRU (CLASSIFY_CACHE_LRU entries)
+#     -> SQLite table shared by gunicorn and rq worker processes (WAL mode)
+#       -> the model, for misses only
+#
+# The same photo resubmitted on another day or for a sister project is classified
+# once per model version. Rows are ~100 bytes, so the file stays small. Each
+# row keeps the per-photo inference time of the batch that produced it, so time
+# saved by a hit is measured, not guessed.
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from . import metrics
+from .hashing import sha256_file
+from .upload_store import digest_of
+
+# ---------- CONFIG ----------
+CLASSIFY_CACHE_DB = os.getenv("CLASSIFY_CACHE_DB", "static/cache/classifications.db")
+CLASSIFY_CACHE_LRU = int(os.getenv("CLASSIFY_CACHE_LRU", "4096"))
+CLASSIFY_CACHE_ENABLED = os.getenv("CLASSIFY_CACHE_ENABLED", "1") == "1"
+# Bump when the weights, labels or preprocessing change. The inference backend that
+# actually loaded is part of the version (int8 models may label differently); a
+# backend that fails to build runs as eager, so see model_version_in_use().
+MODEL_BASE = "mobilenet_v2/imagenet1k_v1/224"
+CLASSIFY_BACKEND = os.getenv("CLASSIFY_BACKEND", "eager")  # read here so a lookup does not import torch
+MODEL_VERSION = f"{MODEL_BASE}/{CLASSIFY_BACKEND}"  # as configured
+BUSY_TIMEOUT_MS = 5000
+SQL_BATCH = 500  # digests per SELECT ... IN (...)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    digest     TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    label      TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    seconds    REAL NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (digest, model)
+);
+CREATE TABLE IF NOT EXISTS backends (
+    requested  TEXT PRIMARY KEY,
+    resolved   TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+_lru = OrderedDict()  # (digest, model) -> (label, confidence, seconds)
+_lru_lock = threading.Lock()
+
+
+def connect(db_path=None):
+    """Per-thread connection to the cache database, created on first use."""
+    db_path = db_path or CLASSIFY_CACHE_DB
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.executescript(SCHEMA)
+        conns[db_path] = conn
+    return conn
+
+
+# ---------- MODEL VERSION ----------
+def model_version(backend):
+    return f"{MODEL_BASE}/{backend}"
+
+
+def record_backend(requested, resolved, db_path=None):
+    """Remember which backend a CLASSIFY_BACKEND setting loaded as, for processes without the model."""
+    conn = connect(db_path)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO backends (requested, resolved, updated_at) VALUES (?, ?, ?)",
+                     (requested, resolved, time.time()))
+
+
+def model_version_in_use(db_path=None):
+    """
+    Version of the model that classifies photos here: the backend this process
+    loaded, else the one the last process to load CLASSIFY_BACKEND got, else
+    CLASSIFY_BACKEND itself. Never imports torch.
+    """
+    analyzer = sys.modules.get(f"{__package__}.image_analyzer")
+    backend = analyzer.loaded_backend() if analyzer is not None else None
+    if backend is None:
+        try:
+            row = connect(db_path).execute("SELECT resolved FROM backends WHERE requested = ?",
+                                           (CLASSIFY_BACKEND,)).fetchone()
+        except sqlite3.Error:
+            row = None
+        backend = row[0] if row else CLASSIFY_BACKEND
+    return model_version(backend)
+
+
+# ---------- LOOKUP ----------
+def _remember(key, value):
+    with _lru_lock:
+        _lru[key] = value
+        _lru.move_to_end(key)
+        while len(_lru) > CLASSIFY_CACHE_LRU:
+            _lru.popitem(last=False)
+
+
+def get_many(digests, model_version=MODEL_VERSION, db_path=None):
+    """{digest: (label, confidence, seconds)} for the digests already classified."""
+    found, missing = {}, []
+    with _lru_lock:
+        for digest in digests:
+            value = _lru.get((digest, model_version))
+            if value is None:
+                missing.append(digest)
+            else:
+                _lru.move_to_end((digest, model_version))
+                found[digest] = value
+    conn = connect(db_path)
+    for start in range(0, len(missing), SQL_BATCH):
+        chunk = missing[start:start + SQL_BATCH]
+        rows = conn.execute(
+            f"SELECT digest, label, confidence, seconds FROM classifications "
+            f"WHERE model = ? AND digest IN ({','.join('?' * len(chunk))})",
+            (model_version, *chunk),
+        )
+        for digest, label, confidence, seconds in rows:
+            found[digest] = (label, confidence, seconds)
+            _remember((digest, model_version), found[digest])
+    return found
+
+
+def put_many(entries, model_version=MODEL_VERSION, db_path=None):
+    """Store {digest: (label, confidence, seconds)}."""
+    if not entries:
+        return
+    now = time.time()
+    conn = connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO classifications (digest, model, label, confidence, seconds, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((digest, model_version, label, confidence, seconds, now)
+             for digest, (label, confidence, seconds) in entries.items()),
+        )
+    for digest, value in entries.items():
+        _remember((digest, model_version), value)
+
+
+def clear_memory():
+    with _lru_lock:
+        _lru.clear()
+
+
+# ---------- CLASSIFY ----------
+def _digest(path):
+    # Upload store objects are named by their SHA-256; anything else is hashed
+    try:
+        return digest_of(path) or sha256_file(path)
+    except OSError:
+        return None
+
+
+def classify_cached(image_paths, classify, model_version=MODEL_VERSION, db_path=None):
+    """
+    Results of classify(paths) for `image_paths`, in input order, calling it only
+    for photos whose content has no cached result for `model_version`. Repeated
+    content within one call is classified once. Errors are returned, not cached.
+    `model_version` may be a callable; it is asked again after classify() runs,
+    so new results are stored under the model that actually produced them.
+    """
+    if not CLASSIFY_CACHE_ENABLED:
+        return classify(list(image_paths))
+
+    version_of = model_version if callable(model_version) else (lambda: model_version)
+    digests = [_digest(path) for path in image_paths]
+    try:
+        cached = get_many(sorted({d for d in digests if d}), version_of(), db_path)
+    except sqlite3.Error as e:
+        metrics.log("classify_cache_unavailable", level="warning", error=str(e))
+        return classify(list(image_paths))
+
+    # One model input per distinct uncached content; unreadable files go through as-is
+    pending = {}
+    for path, digest in zip(image_paths, digests):
+        if digest not in cached:
+            pending.setdefault(digest or path, path)
+    fresh = {}
+    seconds = 0.0
+    if pending:
+        start = time.perf_counter()
+        outputs = classify(list(pending.values()))
+        seconds = time.perf_counter() - start
+        per_photo = seconds / len(pending)
+        fresh = dict(zip(pending, outputs))
+        known = set(digests)
+        try:
+            put_many({digest: (out["label"], out["confidence"], per_photo)
+                      for digest, out in fresh.items() if "error" not in out and digest in known},
+                     version_of(), db_path)
+        except sqlite3.Error as e:
+            metrics.log("classify_cache_unavailable", level="warning", error=str(e))
+
+    results, hits, saved = [], 0, 0.0
+    for path, digest in zip(image_paths, digests):
+        if digest in cached:
+            label, confidence, cost = cached[digest]
+            results.append({"image_path": path, "label": label, "confidence": confidence})
+            hits += 1
+            saved += cost
+        else:
+            results.append(dict(fresh[digest or path], image_path=path))
+
+    metrics.count("classify_cache", hits, outcome="hit")
+    metrics.count("classify_cache", len(image_paths) - hits, outcome="miss")
+    metrics.count("classify_saved_seconds", saved)
+    metrics.log("classify_cache", photos=len(image_paths), hits=hits, classified=len(pending),
+                hit_rate=round(hits / len(image_paths), 3) if image_paths else None,
+                saved_ms=round(saved * 1000, 1), model_ms=round(seconds * 1000, 1))
+    return results
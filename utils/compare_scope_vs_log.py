@@ -3,14 +3,22 @@
 import os
 import json
 from difflib import SequenceMatcher
-from typing import List, Dict
+from itertools import islice
+from typing import List, Dict, Optional, Set, Iterable, Iterator, Sequence
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+
+from .scope_index import get_scope_index
 
 # ---------- CONFIG ----------
 SCOPE_CACHE_FOLDER = "scope_cache"
 SIMILARITY_THRESHOLD = 0.5  # Cosine similarity threshold
+IN_PROGRESS_THRESHOLD = 0.3  # Cosine similarity that marks an item as started
+OUT_OF_SCOPE_THRESHOLD = 0.5  # SequenceMatcher ratio a log line needs against some scope item
+OUT_OF_SCOPE_TOP_K = 25  # Scope items fuzzy-matched per log line, shortlisted by n-gram overlap
+BATCH_CELLS = int(os.getenv("SCOPE_BATCH_CELLS", str(1 << 22)))  # log x item similarities held per batch chunk
+BATCH_VERDICTS = 200_000  # distinct log lines whose out-of-scope verdict a batch remembers
+SCOPE_MATCHING = os.getenv("SCOPE_MATCHING", "tfidf")  # or "semantic" (see utils/scope_embeddings.py)
 
 # ---------- HELPERS ----------
 def similar(a: str, b: str) -> float:
@@ -29,49 +37,212 @@ def save_scope_for_project(project_id: str, scope_items: List[str]):
     with open(path, "w") as f:
         json.dump(scope_items, f, indent=2)
 
+def _char_masks(text: str) -> Dict[str, int]:
+    masks = {}
+    for i, ch in enumerate(text):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+def lcs_length(a: str, a_masks: Dict[str, int], b: str) -> int:
+    """
+    Length of the longest common subsequence of `a` and `b`, bit-parallel over `a`
+    (a_masks = _char_masks(a)). SequenceMatcher's matching blocks form a common
+    subsequence, so 2 * lcs / (len(a) + len(b)) bounds ratio() from above.
+    """
+    full = (1 << len(a)) - 1
+    row = full
+    for ch in b:
+        matches = row & a_masks.get(ch, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(a) - bin(row).count("1")
+
+def find_out_of_scope(lines: List[str], scope_items: List[str], index, top_k: int = OUT_OF_SCOPE_TOP_K,
+                      verdicts: Optional[Dict[str, bool]] = None) -> List[str]:
+    """
+    Log lines with no scope item above OUT_OF_SCOPE_THRESHOLD, exactly as an
+    exhaustive scan would find them. Each line is first compared against its top-k
+    n-gram candidates from the scope index; lines none of them matches go on to
+    the other rows, skipping those whose character counts or longest common
+    subsequence rule out a ratio above the threshold. `verdicts` memoizes line -> in scope across calls against the
+    same scope.
+    """
+    in_scope = {}
+    unresolved = []
+    for line in lines:
+        if line in in_scope or (verdicts is not None and line in verdicts):
+            continue
+        matcher = SequenceMatcher(None, line.lower())
+        shortlist = index.candidates(line, top_k, OUT_OF_SCOPE_THRESHOLD)
+        in_scope[line] = False
+        for row in shortlist:
+            matcher.set_seq2(scope_items[row].lower())
+            if matcher.quick_ratio() > OUT_OF_SCOPE_THRESHOLD and matcher.ratio() > OUT_OF_SCOPE_THRESHOLD:
+                in_scope[line] = True
+                break
+        else:
+            unresolved.append((line, shortlist))
+    if unresolved:
+        _scan_remaining(unresolved, scope_items, index, in_scope)
+
+    out_of_scope = []
+    for line in lines:
+        if verdicts is not None:
+            found = verdicts.setdefault(line, in_scope.get(line))
+        else:
+            found = in_scope[line]
+        if not found:
+            out_of_scope.append(line.strip())
+    return out_of_scope
+
+def _scan_remaining(unresolved, scope_items: List[str], index, in_scope: Dict[str, bool]):
+    """
+    Compare lines their shortlist did not match against every other row that could
+    still match. The loop runs row by row so each scope item's SequenceMatcher
+    tables are built once for all the lines, not once per pair.
+    """
+    candidates = np.zeros((len(unresolved), len(scope_items)), dtype=bool)
+    for i, (line, shortlist) in enumerate(unresolved):
+        # Character counts first (vectorized), then the tighter LCS bound on what is left
+        plausible = index.ratio_bounds(line, scope_items, np.arange(len(scope_items))) > OUT_OF_SCOPE_THRESHOLD
+        plausible[shortlist] = False
+        a = line.lower()
+        a_masks = _char_masks(a)
+        for row in np.flatnonzero(plausible).tolist():
+            b = scope_items[row].lower()
+            if 2.0 * lcs_length(a, a_masks, b) <= OUT_OF_SCOPE_THRESHOLD * (len(a) + len(b)):
+                plausible[row] = False
+        candidates[i] = plausible
+    open_lines = set(range(len(unresolved)))
+    # Rows that could match the most lines first: in-scope lines resolve early
+    rows = np.flatnonzero(candidates.any(axis=0))
+    rows = rows[np.argsort(-candidates[:, rows].sum(axis=0), kind="stable")]
+    for row in rows.tolist():
+        matcher = SequenceMatcher(None, "", scope_items[row].lower())
+        for i in [i for i in open_lines if candidates[i, row]]:
+            matcher.set_seq1(unresolved[i][0].lower())
+            if matcher.quick_ratio() > OUT_OF_SCOPE_THRESHOLD and matcher.ratio() > OUT_OF_SCOPE_THRESHOLD:
+                in_scope[unresolved[i][0]] = True
+                open_lines.discard(i)
+        if not open_lines:
+            break
+
 def extract_scope_items(raw_text: str) -> List[str]:
     lines = [line.strip() for line in raw_text.split("\n") if len(line.strip()) > 15]
     return lines
 
 # ---------- MAIN COMPARISON ----------
-def analyze_scope_vs_log(scope_items: List[str], work_done: str, crew_notes: str, safety_notes: str) -> Dict:
-    full_log = "\n".join([work_done, crew_notes, safety_notes]).strip()
-    if not scope_items or not full_log:
-        return {
-            "completion": 0,
-            "matched": [],
-            "unmatched": scope_items,
-            "out_of_scope": [],
-            "change_order_suggestions": ["Scope or daily log is empty. No valid comparison made."]
-        }
-
-    vectorizer = TfidfVectorizer().fit(scope_items + [full_log])
-    scope_vecs = vectorizer.transform(scope_items)
-    log_vec = vectorizer.transform([full_log])
+def _empty_result(scope_items: List[str], open_rows, done_before: int) -> Dict:
+    return {
+        "completion": round(100 * done_before / max(1, len(scope_items))),
+        "matched": [],
+        "in_progress": [],
+        "unmatched": [scope_items[row] for row in open_rows],
+        "out_of_scope": [],
+        "change_order_suggestions": ["Scope or daily log is empty. No valid comparison made."]
+    }
 
+def _comparison_result(scope_items: List[str], open_rows, done_before: int, scores, out_of_scope: List[str],
+                       matched_at: float = SIMILARITY_THRESHOLD, started_at: float = IN_PROGRESS_THRESHOLD) -> Dict:
     matched = []
+    in_progress = []
     unmatched = []
 
-    for i, scope in enumerate(scope_items):
-        score = cosine_similarity(scope_vecs[i], log_vec)[0][0]
-        if score >= SIMILARITY_THRESHOLD:
+    for row, score in zip(open_rows, scores):
+        scope = scope_items[row]
+        if score >= matched_at:
             matched.append(scope)
         else:
             unmatched.append(scope)
+            if score >= started_at:
+                in_progress.append(scope)
 
-    out_of_scope = []
-    for line in full_log.split("\n"):
-        if not any(similar(line, s) > 0.5 for s in scope_items):
-            out_of_scope.append(line.strip())
-
-    completion = round(100 * len(matched) / max(1, len(scope_items)))
+    completion = round(100 * (done_before + len(matched)) / max(1, len(scope_items)))
 
     return {
         "completion": completion,
         "matched": matched,
+        "in_progress": in_progress,
         "unmatched": unmatched,
         "out_of_scope": out_of_scope[:10],
         "change_order_suggestions": [
             f"Suggest review of {len(out_of_scope)} possible out-of-scope items."
         ] if out_of_scope else []
     }
+
+def _semantic_result(scope_items: List[str], full_log: str, open_rows, done_before: int,
+                     index_dir: Optional[str]) -> Optional[Dict]:
+    from . import scope_embeddings
+
+    encoder = scope_embeddings.load_encoder()
+    if encoder is None:
+        return None
+    lines = [line.strip() for line in full_log.split("\n") if line.strip()]
+    scores, line_scores = scope_embeddings.match(scope_items, lines, encoder,
+                                                 open_rows if done_before else None, index_dir)
+    out_of_scope = [line for line, score in zip(lines, line_scores)
+                    if score < scope_embeddings.OUT_OF_SCOPE_THRESHOLD]
+    return _comparison_result(scope_items, open_rows, done_before, scores, out_of_scope,
+                              scope_embeddings.MATCH_THRESHOLD, scope_embeddings.IN_PROGRESS_THRESHOLD)
+
+def analyze_scope_vs_log(scope_items: List[str], work_done: str, crew_notes: str, safety_notes: str,
+                         index_dir: Optional[str] = None, done_items: Optional[Set[str]] = None,
+                         matching: Optional[str] = None) -> Dict:
+    """
+    Score a daily log against the scope. Items in `done_items` (finished by earlier
+    logs, see data_storage.load_done_items) are not scored again: `matched` lists
+    the items this log finishes, `in_progress` the ones it starts, and completion
+    counts both. Without `done_items` completion covers this log alone.
+
+    `matching` is "tfidf" or "semantic" (default SCOPE_MATCHING). Semantic matching
+    falls back to TF-IDF when no local encoder can be loaded.
+    """
+    full_log = "\n".join([work_done, crew_notes, safety_notes]).strip()
+    if done_items:
+        open_rows = [row for row, item in enumerate(scope_items) if item not in done_items]
+    else:
+        open_rows = range(len(scope_items))
+    done_before = len(scope_items) - len(open_rows)
+    if not scope_items or not full_log:
+        return _empty_result(scope_items, open_rows, done_before)
+
+    if (matching or SCOPE_MATCHING) == "semantic":
+        result = _semantic_result(scope_items, full_log, open_rows, done_before, index_dir)
+        if result is not None:
+            return result
+
+    # Compiled once per scope version (see utils/scope_index.py)
+    index = get_scope_index(scope_items, index_dir)
+    scores = index.score(full_log, open_rows if done_before else None)
+    out_of_scope = find_out_of_scope(full_log.split("\n"), scope_items, index)
+    return _comparison_result(scope_items, open_rows, done_before, scores, out_of_scope)
+
+def analyze_logs_batch(scope_items: List[str], logs: Iterable[Sequence[str]], index_dir: Optional[str] = None,
+                       chunk_size: Optional[int] = None) -> Iterator[Dict]:
+    """
+    analyze_scope_vs_log for many logs of one scope, yielded in input order. Each
+    log is a (work_done, crew_notes, safety_notes) triple. Logs are vectorized a
+    chunk at a time and scored with one sparse product per chunk, holding at most
+    BATCH_CELLS similarities; log lines seen before reuse their out-of-scope verdict.
+    """
+    index = get_scope_index(scope_items, index_dir) if scope_items else None
+    rows = range(len(scope_items))
+    chunk_size = chunk_size or max(1, BATCH_CELLS // max(1, len(scope_items)))
+    verdicts = {}
+
+    logs = iter(logs)
+    while True:
+        chunk = ["\n".join(parts).strip() for parts in islice(logs, chunk_size)]
+        if not chunk:
+            return
+        if len(verdicts) > BATCH_VERDICTS:
+            verdicts.clear()
+        scored = [text for text in chunk if text] if index else []
+        scores = index.score_many(scored) if scored else None
+        column = 0
+        for full_log in chunk:
+            if not index or not full_log:
+                yield _empty_result(scope_items, rows, 0)
+                continue
+            out_of_scope = find_out_of_scope(full_log.split("\n"), scope_items, index, verdicts=verdicts)
+            yield _comparison_result(scope_items, rows, 0, scores[:, column], out_of_scope)
+            column += 1
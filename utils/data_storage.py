@@ -1,20 +1,312 @@
-import json, os
-
-DATA_FILE = "project_data.json"
-
-def load_last_project_data(project_name):
-    if not os.path.exists(DATA_FILE):
-        return None
-    with open(DATA_FILE, "r") as f:
-        data = json.load(f)
-    return data.get(project_name)
-
-def save_project_data(project_name, form_data):
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-    else:
-        data = {}
-    data[project_name] = form_data
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+# utils/data_storage.py
+# Per-project form data, daily log history and scope progress in SQLite.
+#
+# One row per project (last submitted form, for autofill), one row per project
+# per day (the log and its scope analysis) and one ledger row per scope item that
+# has been started or finished, derived from the items each day's log matched.
+# WAL mode lets gunicorn and rq workers
+# read while another process writes, and every save is a single-row upsert, so
+# its cost does not grow with the number of projects. The old project_data.json
+# is imported once, the first time the database is opened.
+
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+
+from . import metrics
+
+# ---------- CONFIG ----------
+DATA_DB = os.getenv("PROJECT_DB", "static/data/projects.db")
+LEGACY_DATA_FILE = "project_data.json"
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    project_id TEXT PRIMARY KEY,
+    form_data  TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_logs (
+    project_id TEXT NOT NULL,
+    log_date   TEXT NOT NULL,
+    form_data  TEXT NOT NULL,
+    analysis   TEXT,
+    completion REAL,
+    photos     TEXT,
+    logo       TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (project_id, log_date)
+);
+CREATE TABLE IF NOT EXISTS scope_progress (
+    project_id TEXT NOT NULL,
+    item       TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    started_on TEXT NOT NULL,
+    done_on    TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (project_id, item)
+);
+CREATE TABLE IF NOT EXISTS scope_progress_days (
+    project_id TEXT NOT NULL,
+    log_date   TEXT NOT NULL,
+    item       TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    PRIMARY KEY (project_id, log_date, item)
+);
+CREATE INDEX IF NOT EXISTS scope_progress_days_item ON scope_progress_days (project_id, item);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+# Columns added after the first release; connect() adds them to older databases
+ADDED_COLUMNS = {"daily_logs": {"photos": "TEXT", "logo": "TEXT"}}
+
+_local = threading.local()
+
+
+def project_key(project_name):
+    """Normalized project id shared by routes, jobs and storage."""
+    return (project_name or "").strip().replace(" ", "_").lower() or "default_project"
+
+
+def connect(db_path=None):
+    """Per-thread connection to the project database, created and migrated on first use."""
+    db_path = db_path or DATA_DB
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe in WAL mode
+        with conn:
+            conn.executescript(SCHEMA)
+            _add_columns(conn)
+        migrate_json(conn)
+        _migrate_progress_days(conn)
+        conns[db_path] = conn
+    return conn
+
+
+def _add_columns(conn):
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, kind in columns.items():
+            if name not in existing:
+                try:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+
+
+def migrate_json(conn, json_path=LEGACY_DATA_FILE):
+    """Import the legacy project_data.json once. Returns the number of projects imported."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # one process migrates, the others wait and see the marker
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                legacy = json.load(f)
+        except FileNotFoundError:
+            legacy = {}
+        except ValueError as e:
+            metrics.log("project_data_migration_failed", level="warning", path=json_path, error=str(e))
+            legacy = {}
+        now = time.time()
+        conn.executemany(
+            "INSERT OR IGNORE INTO projects (project_id, form_data, updated_at) VALUES (?, ?, ?)",
+            ((name, json.dumps(form), now) for name, form in legacy.items()),
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(now),))
+    if legacy:
+        metrics.log("project_data_migrated", path=json_path, projects=len(legacy))
+    return len(legacy)
+
+
+def _migrate_progress_days(conn):
+    """Give ledger rows written before scope_progress_days the day rows they imply."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'progress_days_migrated'").fetchone():
+            return
+        conn.execute(
+            "INSERT OR IGNORE INTO scope_progress_days (project_id, log_date, item, status) "
+            "SELECT project_id, started_on, item, 'in-progress' FROM scope_progress")
+        conn.execute(
+            "INSERT OR REPLACE INTO scope_progress_days (project_id, log_date, item, status) "
+            "SELECT project_id, done_on, item, 'done' FROM scope_progress WHERE done_on IS NOT NULL")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('progress_days_migrated', ?)", (str(time.time()),))
+
+
+def load_last_project_data(project_name, db_path=None):
+    row = connect(db_path).execute(
+        "SELECT form_data FROM projects WHERE project_id = ?", (project_name,)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_project_data(project_name, form_data, db_path=None):
+    conn = connect(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO projects (project_id, form_data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(project_id) DO UPDATE SET form_data = excluded.form_data, "
+            "updated_at = excluded.updated_at",
+            (project_name, json.dumps(form_data), time.time()),
+        )
+
+
+def log_date_for(form_data):
+    """ISO date of a daily log: the form's `date` field, or today if missing or invalid."""
+    try:
+        return datetime.date.fromisoformat((form_data.get("date") or "").strip()).isoformat()
+    except ValueError:
+        return datetime.date.today().isoformat()
+
+
+def save_daily_log(project_name, form_data, analysis=None, log_date=None, photos=None, logo=None, db_path=None):
+    """
+    Record one day's log; submitting the same project and day again replaces it.
+    `photos` and `logo` are upload store paths, kept for roll-up reports.
+    """
+    log_date = log_date or log_date_for(form_data)
+    completion = (analysis or {}).get("completion")
+    conn = connect(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO daily_logs (project_id, log_date, form_data, analysis, completion, photos, logo, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(project_id, log_date) DO UPDATE SET form_data = excluded.form_data, "
+            "analysis = excluded.analysis, completion = excluded.completion, "
+            "photos = excluded.photos, logo = excluded.logo, updated_at = excluded.updated_at",
+            (project_name, log_date, json.dumps(form_data),
+             json.dumps(analysis) if analysis is not None else None, completion,
+             json.dumps(list(photos or [])), logo, time.time()),
+        )
+    return log_date
+
+
+def iter_daily_logs(project_name, start=None, end=None, db_path=None):
+    """Daily logs of a project between two ISO dates (inclusive), oldest first, one row at a time."""
+    rows = connect(db_path).execute(
+        "SELECT log_date, form_data, analysis, completion, photos, logo FROM daily_logs "
+        "WHERE project_id = ? AND log_date >= ? AND log_date <= ? ORDER BY log_date",
+        (project_name, start or "0000-00-00", end or "9999-99-99"),
+    )
+    for log_date, form, analysis, completion, photos, logo in rows:
+        yield {"date": log_date, "form_data": json.loads(form),
+               "analysis": json.loads(analysis) if analysis else None, "completion": completion,
+               "photos": json.loads(photos) if photos else [], "logo": logo}
+
+
+def load_daily_logs(project_name, start=None, end=None, db_path=None):
+    """Daily logs of a project between two ISO dates (inclusive), oldest first."""
+    return list(iter_daily_logs(project_name, start, end, db_path))
+
+
+def daily_logs_version(project_name, start=None, end=None, db_path=None):
+    """(count, last update) of the logs in a date range; changes whenever one of them does."""
+    count, updated_at = connect(db_path).execute(
+        "SELECT COUNT(*), MAX(updated_at) FROM daily_logs "
+        "WHERE project_id = ? AND log_date >= ? AND log_date <= ?",
+        (project_name, start or "0000-00-00", end or "9999-99-99"),
+    ).fetchone()
+    return count, updated_at
+
+
+
+def latest_logo(project_name, start=None, end=None, db_path=None):
+    """Newest logo stored with the logs in a date range that is still on disk, or None."""
+    rows = connect(db_path).execute(
+        "SELECT logo FROM daily_logs WHERE project_id = ? AND log_date >= ? AND log_date <= ? "
+        "AND logo IS NOT NULL ORDER BY log_date DESC",
+        (project_name, start or "0000-00-00", end or "9999-99-99"),
+    )
+    return next((logo for (logo,) in rows if os.path.exists(logo)), None)
+
+# ---------- SCOPE PROGRESS LEDGER ----------
+# Keyed by item text, so a revised scope keeps the progress of unchanged items.
+# scope_progress_days holds what each day's log matched; a ledger row is rebuilt
+# from the days of its item: done if any day finished it, dates from the earliest
+# such day. Replacing a day's log replaces its day rows, so a corrected log
+# un-marks what the old version finished.
+PROGRESS_REBUILD = """
+INSERT INTO scope_progress (project_id, item, status, started_on, done_on, updated_at)
+SELECT project_id, item,
+       CASE WHEN MAX(status = 'done') THEN 'done' ELSE 'in-progress' END,
+       MIN(log_date), MIN(CASE WHEN status = 'done' THEN log_date END), ?
+FROM scope_progress_days WHERE project_id = ? AND item = ?
+GROUP BY project_id, item
+"""
+
+
+def load_progress(project_name, db_path=None):
+    """Ledger of a project: {item: {"status", "started_on", "done_on"}}; absent items are pending."""
+    rows = connect(db_path).execute(
+        "SELECT item, status, started_on, done_on FROM scope_progress WHERE project_id = ?",
+        (project_name,),
+    )
+    return {item: {"status": status, "started_on": started_on, "done_on": done_on}
+            for item, status, started_on, done_on in rows}
+
+
+def load_done_items(project_name, before=None, db_path=None):
+    """Scope items of a project finished by a log dated before `before` (all if None)."""
+    rows = connect(db_path).execute(
+        "SELECT item FROM scope_progress WHERE project_id = ? AND status = 'done' AND done_on < ?",
+        (project_name, before or "9999-99-99"),
+    )
+    return {item for (item,) in rows}
+
+
+def record_progress(project_name, log_date, done=(), in_progress=(), db_path=None):
+    """
+    Set the scope items finished or started by the log of `log_date`, replacing
+    what an earlier version of that day's log recorded.
+    """
+    days = {item: "in-progress" for item in in_progress}
+    days.update((item, "done") for item in done)
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        previous = [item for (item,) in conn.execute(
+            "SELECT item FROM scope_progress_days WHERE project_id = ? AND log_date = ?",
+            (project_name, log_date))]
+        conn.execute("DELETE FROM scope_progress_days WHERE project_id = ? AND log_date = ?",
+                     (project_name, log_date))
+        conn.executemany("INSERT INTO scope_progress_days (project_id, log_date, item, status) VALUES (?, ?, ?, ?)",
+                         ((project_name, log_date, item, status) for item, status in days.items()))
+        affected = set(previous) | set(days)
+        conn.executemany("DELETE FROM scope_progress WHERE project_id = ? AND item = ?",
+                         ((project_name, item) for item in affected))
+        now = time.time()
+        conn.executemany(PROGRESS_REBUILD, ((now, project_name, item) for item in affected))
+
+
+def progress_summary(project_name, scope_items, db_path=None):
+    """Cumulative progress of a project's current scope, read from the ledger only."""
+    ledger = load_progress(project_name, db_path)
+    items = []
+    counts = {"done": 0, "in-progress": 0, "pending": 0}
+    for item in scope_items:
+        entry = ledger.get(item) or {"status": "pending", "started_on": None, "done_on": None}
+        counts[entry["status"]] += 1
+        items.append({"item": item, **entry})
+    total = len(scope_items)
+    return {
+        "project_id": project_name,
+        "completion": round(100 * counts["done"] / max(1, total)),
+        "total": total,
+        "done": counts["done"],
+        "in_progress": counts["in-progress"],
+        "pending": counts["pending"],
+        "items": items,
+    }
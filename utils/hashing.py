@@ -0,0 +1,13 @@
+# utils/hashing.py
+
+import hashlib
+
+CHUNK_SIZE = 1 << 20  # 1 MB
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    """Hex SHA-256 of a file, read in chunks so large photos and PDFs stay out of memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,17 +1,44 @@
 # utils/image_analyzer.py
+#
+# CLASSIFY_BACKEND selects how MobileNetV2 runs on CPU:
+#   eager          fp32 PyTorch modules under no_grad (the reference)
+#   channels_last  fp32, NHWC weights and inputs under inference_mode
+#   torchscript    traced, frozen and optimized for inference
+#   int8_dynamic   int8 weights for the Linear classifier, activations quantized on the fly
+#   int8_static    int8 convolutions, calibrated on the photos in CLASSIFY_CALIBRATION_DIR
+# TorchScript and int8 models are built once and cached in CLASSIFY_MODEL_CACHE;
+# later processes load the artifact. A backend that cannot be built falls back to eager.
+# `python -m benchmarks.inference` compares latency, throughput and top-1 agreement.
+
+import os
+import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
 from torchvision import models, transforms
 from PIL import Image
-import os
 
-# Load the ImageNet labels
-with open(os.path.join(os.path.dirname(__file__), "imagenet_classes.txt")) as f:
-    classes = [line.strip() for line in f.readlines()]
+from . import metrics
+
+# ---------- CONFIG ----------
+BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", "16"))
+DECODE_WORKERS = int(os.getenv("CLASSIFY_DECODE_WORKERS", "4"))
+TORCH_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))  # 0 = torch default
+BACKENDS = ("eager", "channels_last", "torchscript", "int8_dynamic", "int8_static")
+INFERENCE_BACKEND = os.getenv("CLASSIFY_BACKEND", "eager")
+MODEL_CACHE_DIR = os.getenv("CLASSIFY_MODEL_CACHE", "static/cache/models")
+CALIBRATION_DIR = os.getenv("CLASSIFY_CALIBRATION_DIR", "")
+CALIBRATION_IMAGES = 64
+PRETRAINED_FINGERPRINT = "mobilenet_v2/imagenet1k_v1"
+ARTIFACT_BACKENDS = ("torchscript", "int8_dynamic", "int8_static")
 
-# Load the pre-trained model once
-model = models.mobilenet_v2(pretrained=True)
-model.eval()
+# Model and labels are loaded on first use (or by preload_model() before forking)
+_model = None
+_classes = None
+_backend = "eager"
+_load_lock = threading.Lock()
 
 # Define transform
 preprocess = transforms.Compose([
@@ -22,15 +49,189 @@ preprocess = transforms.Compose([
                          std=[0.229, 0.224, 0.225])
 ])
 
+def set_num_threads(num_threads):
+    if num_threads and num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+def get_model():
+    """Load the ImageNet labels and the pre-trained model once per process."""
+    global _model, _classes, _backend
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                with open(os.path.join(os.path.dirname(__file__), "imagenet_classes.txt")) as f:
+                    _classes = [line.strip() for line in f.readlines()]
+                set_num_threads(TORCH_THREADS)
+                _model, _backend = _load_backend(INFERENCE_BACKEND)
+                _record_backend(_backend)
+    return _model, _classes
+
+def loaded_backend():
+    """The backend the loaded model runs on (eager after a fallback), or None before get_model()."""
+    return _backend if _model is not None else None
+
+def _record_backend(resolved):
+    # Classification cache lookups in processes without the model key by this
+    from .classification_cache import record_backend
+
+    try:
+        record_backend(INFERENCE_BACKEND, resolved)
+    except Exception as e:
+        metrics.log("classify_backend_unrecorded", level="warning", backend=resolved, error=str(e))
+
+def _load_backend(backend):
+    """The pre-trained model for `backend`, from the artifact cache when it was built before."""
+    if backend in ARTIFACT_BACKENDS:
+        path = artifact_path(backend, _artifact_key(backend, PRETRAINED_FINGERPRINT, calibration_paths()))
+        if os.path.exists(path):
+            return load_artifact(path, backend), backend
+    model = models.mobilenet_v2(pretrained=True)
+    model.eval()
+    try:
+        return build_backend(model, backend, calibration_paths(), PRETRAINED_FINGERPRINT), backend
+    except Exception as e:
+        metrics.log("classify_backend_failed", level="warning", backend=backend, error=str(e))
+        return model, "eager"
+
+# ---------- BACKENDS ----------
+def calibration_paths(directory=None, limit=CALIBRATION_IMAGES):
+    directory = directory if directory is not None else CALIBRATION_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+    return [os.path.join(directory, name) for name in names[:limit]]
+
+def weights_fingerprint(model):
+    """Content hash of a model's weights, for models other than the pre-trained download."""
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        digest.update(name.encode("utf-8"))
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def _artifact_key(backend, fingerprint, calibration=()):
+    parts = [backend, fingerprint, torch.__version__, torch.backends.quantized.engine]
+    if backend == "int8_static":
+        # Calibration photos change the quantization ranges
+        parts += [f"{os.path.basename(p)}:{os.path.getsize(p)}" for p in calibration]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def artifact_path(backend, key, cache_dir=None):
+    return os.path.join(cache_dir or MODEL_CACHE_DIR, f"mobilenet_v2_{backend}_{key}.pt")
+
+def load_artifact(path, backend):
+    model = torch.jit.load(path, map_location="cpu")
+    model.eval()
+    if backend == "torchscript":
+        # oneDNN-specific rewrites do not serialize, so they are applied after loading
+        model = torch.jit.optimize_for_inference(model)
+    return model
+
+def build_backend(model, backend, calibration=(), fingerprint=None, cache_dir=None):
+    """
+    Inference model for `backend` from the fp32 `model`. TorchScript and int8 builds
+    are saved under `cache_dir` and loaded from there next time; `fingerprint`
+    identifies the weights (weights_fingerprint() if None).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+    if backend == "eager":
+        return model
+    if backend == "channels_last":
+        return model.to(memory_format=torch.channels_last)
+
+    key = _artifact_key(backend, fingerprint or weights_fingerprint(model), calibration)
+    path = artifact_path(backend, key, cache_dir)
+    if os.path.exists(path):
+        return load_artifact(path, backend)
+
+    example = torch.zeros(1, 3, 224, 224)
+    with metrics.stage("classify_backend_build", backend=backend), torch.no_grad():
+        if backend == "int8_dynamic":
+            quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            built = torch.jit.freeze(torch.jit.trace(quantized, example).eval())
+        elif backend == "int8_static":
+            built = torch.jit.freeze(torch.jit.trace(_quantize_static(model, calibration), example).eval())
+        else:
+            built = torch.jit.freeze(torch.jit.trace(model, example).eval())
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    torch.jit.save(built, tmp_path)
+    os.replace(tmp_path, path)
+    metrics.log("classify_backend_built", backend=backend, artifact=path)
+    return load_artifact(path, backend)
+
+def _quantize_static(model, calibration):
+    from torchvision.models.quantization import mobilenet_v2 as quantizable_mobilenet_v2
+
+    if not calibration:
+        raise ValueError("int8_static needs calibration photos (CLASSIFY_CALIBRATION_DIR)")
+    qmodel = quantizable_mobilenet_v2(weights=None, quantize=False)
+    qmodel.load_state_dict(model.state_dict())
+    qmodel.eval()
+    qmodel.fuse_model(is_qat=False)
+    qmodel.qconfig = torch.ao.quantization.get_default_qconfig(torch.backends.quantized.engine)
+    torch.ao.quantization.prepare(qmodel, inplace=True)
+    for start in range(0, len(calibration), BATCH_SIZE):
+        qmodel(torch.stack([_load_tensor(path) for path in calibration[start:start + BATCH_SIZE]]))
+    return torch.ao.quantization.convert(qmodel, inplace=True)
+
+def preload_model():
+    """
+    Load the model eagerly, e.g. in the gunicorn master with preload_app so every
+    forked worker shares the weights copy-on-write instead of loading its own.
+    """
+    get_model()
+
+def _load_tensor(image_path):
+    with Image.open(image_path) as image:
+        return preprocess(image.convert("RGB"))
+
+@metrics.timed("image_classify")
+def classify_images(image_paths, batch_size=BATCH_SIZE, num_threads=None):
+    """
+    Classify many photos with one forward pass per batch. Decoding and preprocessing
+    run in a thread pool. Returns one dict per path, in input order, with `label`
+    and `confidence`, or `error` if the photo could not be read.
+    """
+    model, classes = get_model()
+    set_num_threads(num_threads)
+    metrics.count("photos", len(image_paths), stage="image_classify")
+    results = [None] * len(image_paths)
+
+    with ThreadPoolExecutor(max_workers=DECODE_WORKERS) as pool:
+        for start in range(0, len(image_paths), batch_size):
+            chunk = list(range(start, min(start + batch_size, len(image_paths))))
+            futures = [pool.submit(_load_tensor, image_paths[i]) for i in chunk]
+
+            tensors, positions = [], []
+            for i, future in zip(chunk, futures):
+                try:
+                    tensors.append(future.result())
+                    positions.append(i)
+                except Exception as e:
+                    results[i] = {"image_path": image_paths[i], "label": "Error",
+                                  "confidence": 0.0, "error": str(e)}
+            if not tensors:
+                continue
+
+            for i, (label, confidence) in zip(positions, _predict(model, classes, tensors)):
+                results[i] = {"image_path": image_paths[i], "label": label, "confidence": confidence}
+    return results
+
+def _predict(model, classes, tensors, backend=None):
+    backend = backend or _backend
+    batch = torch.stack(tensors)
+    if backend == "channels_last":
+        batch = batch.contiguous(memory_format=torch.channels_last)
+    # eager keeps no_grad as the fp32 reference; the tuned backends skip autograd bookkeeping entirely
+    with torch.no_grad() if backend == "eager" else torch.inference_mode():
+        output = model(batch)
+        probabilities = torch.nn.functional.softmax(output, dim=1)
+        confidences, top_classes = probabilities.max(dim=1)
+    return [(classes[c], float(p)) for c, p in zip(top_classes.tolist(), confidences.tolist())]
+
 def classify_image(image_path):
-    image = Image.open(image_path).convert("RGB")
-    input_tensor = preprocess(image).unsqueeze(0)
-
-    with torch.no_grad():
-        output = model(input_tensor)
-        probabilities = torch.nn.functional.softmax(output[0], dim=0)
-        top_class = probabilities.argmax().item()
-        label = classes[top_class]
-        confidence = float(probabilities[top_class])
-    
-    return label, confidence
+    model, classes = get_model()
+    return _predict(model, classes, [_load_tensor(image_path)])[0]
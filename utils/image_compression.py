@@ -1,7 +1,11 @@
 import os
 import io
+import time
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageOps
 
+from . import metrics
+
 # ===============================
 # Compression Configuration
 # ===============================
@@ -11,15 +15,102 @@ INITIAL_QUALITY = 85
 MIN_QUALITY = 30
 MAX_DIMENSION = 1920                 # resize large images before saving
 
+TRIAL_TILE = 128                     # trial encode: a TRIAL_GRID x TRIAL_GRID mosaic of
+TRIAL_GRID = 4                       # full-resolution tiles seeds the quality search
+COMPRESS_WORKERS = int(os.getenv("COMPRESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 # ===============================
-# Main Compression Function
+# Quality Search
 # ===============================
-def compress_and_rotate_image(input_path, output_path=None, target_size=TARGET_SIZE_BYTES):
+def _encode(img, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", optimize=True, quality=quality)
+    return buffer
+
+
+def _trial_mosaic(img):
+    """Full-resolution tiles sampled across the image, pasted into one small trial image."""
+    grid = TRIAL_GRID
+    tile = min(TRIAL_TILE, img.width // grid, img.height // grid)
+    if tile < 16:
+        return img
+    mosaic = Image.new("RGB", (tile * grid, tile * grid))
+    for gy in range(grid):
+        for gx in range(grid):
+            x = int((img.width - tile) * (gx + 0.5) / grid)
+            y = int((img.height - tile) * (gy + 0.5) / grid)
+            mosaic.paste(img.crop((x, y, x + tile, y + tile)), (gx * tile, gy * tile))
+    return mosaic
+
+
+def _estimate_quality(img, target_size, full_size):
     """
-    Compress and auto‑rotate image based on EXIF.
-    Ensures final file size < ~10 MB while maintaining reasonable quality.
+    Highest quality whose size, extrapolated from a small trial encode, fits.
+    The trial is calibrated against the full encode at INITIAL_QUALITY (`full_size`).
     """
+    trial = _trial_mosaic(img)
+    scale = full_size / max(1, _encode(trial, INITIAL_QUALITY).tell())
+    lo, hi, best = MIN_QUALITY, INITIAL_QUALITY - 1, MIN_QUALITY
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if _encode(trial, mid).tell() * scale <= target_size:
+            best, lo = mid, mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+def _search_quality(img, target_size):
+    """
+    Find the highest JPEG quality in [MIN_QUALITY, INITIAL_QUALITY] that fits
+    `target_size`. Returns (buffer, quality, full_encodes); if nothing fits,
+    the buffer is the MIN_QUALITY encode.
+
+    The first probe is INITIAL_QUALITY, the second the trial estimate. From there
+    the search gallops away from the estimate (1, 2, 4... steps) until the answer
+    is bracketed, then bisects, so a good estimate costs three full encodes.
+    """
+    buffer = _encode(img, INITIAL_QUALITY)
+    if buffer.tell() <= target_size:
+        return buffer, INITIAL_QUALITY, 1
+
+    encodes = 1
+    lo, hi = MIN_QUALITY, INITIAL_QUALITY - 1   # the answer lies in [lo, hi] (or nothing fits)
+    best = None
+    quality = _estimate_quality(img, target_size, buffer.tell())
+    step = 1
+    seen_fit = seen_fail = False
+    while lo <= hi:
+        quality = min(hi, max(lo, quality))
+        buffer = _encode(img, quality)
+        encodes += 1
+        if buffer.tell() <= target_size:
+            best, lo, seen_fit = (buffer, quality), quality + 1, True
+            next_quality = quality + step
+        else:
+            hi, seen_fail = quality - 1, True
+            next_quality = quality - step
+        if seen_fit and seen_fail:
+            quality = (lo + hi) // 2  # bracketed: bisect
+        else:
+            quality, step = next_quality, step * 2
+    if best is None:
+        return buffer, MIN_QUALITY, encodes  # the last probe was MIN_QUALITY
+    return best[0], best[1], encodes
+
 
+# ===============================
+# Main Compression Function
+# ===============================
+def compress_image(input_path, output_path=None, target_size=TARGET_SIZE_BYTES):
+    """
+    Compress and auto‑rotate one image. Returns a dict with `input`, `output`,
+    `size`, `quality`, `encodes`, `seconds` and `error` (None on success).
+    """
+    start = time.perf_counter()
+    result = {"input": input_path, "output": input_path, "size": None, "quality": None,
+              "encodes": 0, "seconds": 0.0, "error": None}
+    name = os.path.basename(input_path)
     try:
         img = Image.open(input_path)
 
@@ -41,31 +132,57 @@ def compress_and_rotate_image(input_path, output_path=None, target_size=TARGET_S
             if not output_path.lower().endswith(".jpg"):
                 output_path = os.path.splitext(output_path)[0] + "_compressed.jpg"
 
-        # Iterative compression loop
-        quality = INITIAL_QUALITY
-        while quality >= MIN_QUALITY:
-            buffer = io.BytesIO()
-            img.save(buffer, format="JPEG", optimize=True, quality=quality)
-            size = buffer.tell()
+        # Binary search on quality, seeded from a downscaled trial encode
+        buffer, quality, encodes = _search_quality(img, target_size)
+        with open(output_path, "wb") as f:
+            f.write(buffer.getvalue())
+        size = buffer.tell()
 
-            if size <= target_size:
-                with open(output_path, "wb") as f:
-                    f.write(buffer.getvalue())
-                print(f"[Image Compression] ✅ {os.path.basename(input_path)} → {round(size/1024/1024, 2)} MB @ Q={quality}")
-                break
-            quality -= 5
+        if size <= target_size:
+            metrics.log("image_compressed", file=name, bytes=size, quality=quality, encodes=encodes)
+        else:
+            metrics.log("image_over_target", level="warning", file=name, bytes=size,
+                        target_bytes=target_size, quality=quality)
+        result.update(output=output_path, size=size, quality=quality, encodes=encodes)
+        metrics.count("image_bytes", size, stage="image_compress")
+
+    except Exception as e:
+        metrics.log("image_compress_failed", level="error", file=input_path, error=str(e))
+        result["error"] = str(e)
 
-        # Save even if over target size
-        if quality < MIN_QUALITY:
-            with open(output_path, "wb") as f:
-                f.write(buffer.getvalue())
-            print(f"[Image Compression] ⚠️ {os.path.basename(input_path)} still >10 MB @ min Q={MIN_QUALITY}")
+    elapsed = time.perf_counter() - start
+    metrics.observe("stage_seconds", elapsed, stage="image_compress")
+    metrics.count("photos", stage="image_compress")
+    result["seconds"] = round(elapsed, 4)
+    return result
 
-        return output_path
 
-    except Exception as e:
-        print(f"[Image Compression] ❌ Error processing {input_path}: {e}")
-        return input_path
+def compress_and_rotate_image(input_path, output_path=None, target_size=TARGET_SIZE_BYTES):
+    """
+    Compress and auto‑rotate image based on EXIF.
+    Ensures final file size < ~10 MB while maintaining reasonable quality.
+    """
+    return compress_image(input_path, output_path, target_size)["output"]
+
+
+def compress_images(input_paths, output_dir=None, target_size=TARGET_SIZE_BYTES, max_workers=COMPRESS_WORKERS):
+    """
+    Compress many images in parallel (Pillow encodes release the GIL).
+    Returns compress_image() results in input order, including time spent per image.
+    """
+    def run(path):
+        output_path = None
+        if output_dir:
+            base = os.path.splitext(os.path.basename(path))[0]
+            output_path = os.path.join(output_dir, f"{base}_compressed.jpg")
+        return compress_image(path, output_path, target_size)
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if not input_paths:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(input_paths)))) as pool:
+        return list(pool.map(metrics.propagate(run), input_paths))
 
 
 # ===============================
@@ -83,8 +200,5 @@ def clean_temp_images(directory="static/uploads"):
                 os.remove(os.path.join(directory, filename))
                 deleted += 1
             except Exception as e:
-                print(f"[Image Compression] ⚠️ Could not delete {filename}: {e}")
-    if deleted > 0:
-        print(f"[Image Compression] 🧹 Cleaned {deleted} temp file(s).")
-    else:
-        print(f"[Image Compression] ℹ️ No temp files to clean.")
+                metrics.log("temp_image_delete_failed", level="warning", file=filename, error=str(e))
+    metrics.log("temp_images_cleaned", directory=directory, deleted=deleted)
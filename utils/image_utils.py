@@ -1,57 +1,78 @@
-from PIL import Image, ImageFile, ExifTags
+from PIL import Image, ImageFile, ImageOps
+from concurrent.futures import ThreadPoolExecutor
 import os
-import time
+import uuid
+
+from . import metrics
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+# ---------- CONFIG ----------
+MAX_DIMENSION = 1920
+JPEG_QUALITY = 85
+# Pillow releases the GIL while decoding, resizing and encoding, so threads scale
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+
 def correct_image_orientation(image_path):
     try:
         with Image.open(image_path) as img:
-            exif = img._getexif()
-            orientation = None
-            for key, value in ExifTags.TAGS.items():
-                if value == 'Orientation':
-                    orientation = key
-                    break
-
-            if exif and orientation in exif:
-                orientation_value = exif.get(orientation)
-                if orientation_value == 3:
-                    img = img.rotate(180, expand=True)
-                elif orientation_value == 6:
-                    img = img.rotate(270, expand=True)
-                elif orientation_value == 8:
-                    img = img.rotate(90, expand=True)
-            return img.copy()
+            return ImageOps.exif_transpose(img)
     except Exception as e:
-        print(f"⚠️ EXIF rotation failed for {image_path}: {e}")
+        metrics.log("exif_rotation_failed", level="warning", file=image_path, error=str(e))
         return None
 
-def preprocess_images(image_paths):
-    processed_images = []
+def preprocess_image(path, output_path=None, max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY):
+    """
+    Decode, apply EXIF orientation, shrink to `max_dimension` (None keeps the full
+    size) and encode one photo. Writes `{name}_safe.jpg` next to the source unless
+    `output_path` is given (which may be the source itself to rewrite it in place).
+    """
+    with metrics.stage("image_preprocess"), Image.open(path) as img:
+        if max_dimension:
+            img.draft("RGB", (max_dimension, max_dimension))
+        source_format = img.format
+        img = ImageOps.exif_transpose(img)
+        if max_dimension and max(img.size) > max_dimension:
+            img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
 
-    for path in image_paths:
-        print(f"\n📸 Processing: {path}")
-        try:
-            file_size = os.path.getsize(path)
-            print(f"📏 Size: {file_size / 1024:.2f} KB")
+        if output_path is None:
+            output_path = path.rsplit(".", 1)[0] + "_safe.jpg"
+        out_format = "JPEG"
+        if output_path == path and source_format and source_format != "JPEG":
+            out_format = source_format  # in place: keep the file's own format
 
-            img = correct_image_orientation(path)
-            if img is None:
-                print("⚠️ Fallback: Open without EXIF rotation")
-                img = Image.open(path)
+        save_kwargs = {"quality": quality, "optimize": True} if out_format == "JPEG" else {}
+        if out_format == "JPEG":
+            img = img.convert("RGB")
 
-            img_format = img.format or 'Unknown'
-            print(f"📂 Format: {img_format}")
+        # Write to a temp name first so readers never see a half-written photo
+        tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        img.save(tmp_path, format=out_format, **save_kwargs)
+    os.replace(tmp_path, output_path)
+    metrics.count("photos", stage="image_preprocess")
+    return output_path
 
-            safe_path = path.rsplit(".", 1)[0] + "_safe.png"
-            img.save(safe_path, format="PNG")
-            processed_images.append(safe_path)
-            print(f"✅ Converted to: {safe_path}")
+def preprocess_images(image_paths, in_place=False, max_workers=PREPROCESS_WORKERS,
+                      max_dimension=None, quality=JPEG_QUALITY):
+    """
+    Preprocess photos concurrently in a bounded thread pool.
+    Copies are shrunk to MAX_DIMENSION unless `max_dimension` says otherwise;
+    originals rewritten `in_place` keep their size (orientation is still fixed).
+    Returns one dict per input, in input order: `source`, `path` (the processed
+    file, or None) and `error` (None on success).
+    """
+    if max_dimension is None and not in_place:
+        max_dimension = MAX_DIMENSION
 
+    def run(path):
+        try:
+            output = preprocess_image(path, path if in_place else None, max_dimension, quality)
+            return {"source": path, "path": output, "error": None}
         except Exception as e:
-            print(f"❌ Image processing failed for {path}: {e}")
-
-        time.sleep(1)
+            metrics.log("image_preprocess_failed", level="error", file=path, error=str(e))
+            return {"source": path, "path": None, "error": str(e)}
 
-    return processed_images
+    if not image_paths:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(image_paths)))) as pool:
+        return list(pool.map(metrics.propagate(run), image_paths))
@@ -0,0 +1,307 @@
+# utils/metrics.py
+# Stage timings, counters and structured logs for the daily log pipeline.
+#
+#   with metrics.stage("pdf_build"):          # latency histogram per stage
+#       ...
+#   @metrics.timed("image_classify")
+#   def classify_images(...): ...
+#   metrics.count("upload_bytes", size, kind="photo")
+#   metrics.log("image_compressed", file=name, bytes=size)   # JSON line with the request id
+#
+# Metrics are recorded per process in plain dicts. flush() moves them into one Redis
+# hash (HINCRBYFLOAT per series slot) shared by every gunicorn and rq worker: jobs
+# flush when they finish, web processes at most every FLUSH_INTERVAL_SECONDS. render()
+# flushes, reads the hash and writes the Prometheus text format (served at /metrics),
+# so any web process reports the totals of all of them. With METRICS_ENABLED=0, stage() returns a
+# shared no-op context manager, timed() returns the function unchanged and count()
+# returns at once, so instrumented code pays one function call.
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+from bisect import bisect_left
+
+# ---------- CONFIG ----------
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_PREFIX = "nailsnotes"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_KEY = f"{METRICS_PREFIX}:metrics"  # Redis hash holding the totals of all processes
+FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_counters = {}    # (name, labels) -> value
+_help = {}
+_last_flush = [0.0]
+
+
+# ---------- RECORDING ----------
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    """Add one observation (seconds) to the histogram `name`."""
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    slot = bisect_left(BUCKETS, value)
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        series[slot] += 1
+        series[-1] += value
+
+
+def count(name, value=1, **labels):
+    """Add `value` to the counter `name` (bytes, photos, cache hits, ...)."""
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Stage:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels, stage=self.name)
+        if exc_type is not None:
+            labels["outcome"] = "error"
+        observe("stage_seconds", time.perf_counter() - self.start, **labels)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name, **labels):
+    """Context manager timing one pipeline stage into stage_seconds{stage=name}."""
+    if not METRICS_ENABLED:
+        return _NO_STAGE
+    return _Stage(name, labels)
+
+
+def timed(name, **labels):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+# ---------- SHARING ----------
+def _field(kind, name, labels, slot=None):
+    return json.dumps([kind, name, [list(pair) for pair in labels], slot])
+
+
+def _merge(histograms, counters, into_histograms, into_counters):
+    for key, series in histograms.items():
+        target = into_histograms.get(key)
+        if target is None:
+            into_histograms[key] = list(series)
+        else:
+            for slot, value in enumerate(series):
+                target[slot] += value
+    for key, value in counters.items():
+        into_counters[key] = into_counters.get(key, 0) + value
+
+
+def flush(conn):
+    """Move the numbers recorded in this process into the shared hash on `conn`."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        histograms, counters = dict(_histograms), dict(_counters)
+        _histograms.clear()
+        _counters.clear()
+        _last_flush[0] = time.monotonic()
+    if not histograms and not counters:
+        return
+    pipe = conn.pipeline(transaction=True)  # all or nothing, so a retry cannot count twice
+    for (name, labels), series in histograms.items():
+        for slot, value in enumerate(series):
+            if value:
+                pipe.hincrbyfloat(METRICS_KEY, _field("h", name, labels, slot), value)
+    for (name, labels), value in counters.items():
+        pipe.hincrbyfloat(METRICS_KEY, _field("c", name, labels), value)
+    try:
+        pipe.execute()
+    except Exception as e:
+        # Keep them for the next flush
+        with _lock:
+            _merge(histograms, counters, _histograms, _counters)
+        log("metrics_flush_failed", level="warning", error=str(e))
+
+
+def maybe_flush(conn):
+    """flush() at most once per FLUSH_INTERVAL_SECONDS (after each web request)."""
+    if METRICS_ENABLED and time.monotonic() - _last_flush[0] >= FLUSH_INTERVAL_SECONDS:
+        flush(conn)
+
+
+def _read_shared(conn):
+    histograms, counters = {}, {}
+    for field, value in conn.hgetall(METRICS_KEY).items():
+        kind, name, labels, slot = json.loads(field)
+        key = name, tuple(tuple(pair) for pair in labels)
+        if kind == "h":
+            series = histograms.get(key)
+            if series is None:
+                series = histograms[key] = [0] * (len(BUCKETS) + 2)
+            series[slot] = float(value)
+        else:
+            counters[key] = float(value)
+    return histograms, counters
+
+
+# ---------- EXPOSITION ----------
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+def render(conn=None):
+    """
+    Metrics in the Prometheus text exposition format (0.0.4): those of every process
+    sharing `conn`, or only this process's without one.
+    """
+    histograms, counters = {}, {}
+    if conn is not None:
+        flush(conn)
+        try:
+            histograms, counters = _read_shared(conn)
+        except Exception as e:
+            log("metrics_read_failed", level="warning", error=str(e))
+    with _lock:
+        _merge(_histograms, _counters, histograms, counters)
+
+    lines = []
+    for name in sorted({name for name, _ in histograms}):
+        full = f"{METRICS_PREFIX}_{name}"
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} histogram")
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, hits in zip(BUCKETS + ("+Inf",), series[:-1]):
+                cumulative += hits
+                lines.append(f"{full}_bucket{_labels_text(labels, [('le', bound)])} {_number(cumulative)}")
+            lines.append(f"{full}_sum{_labels_text(labels)} {series[-1]:.6f}")
+            lines.append(f"{full}_count{_labels_text(labels)} {_number(cumulative)}")
+    for name in sorted({name for name, _ in counters}):
+        full = f"{METRICS_PREFIX}_{name}_total"
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} counter")
+        for (series_name, labels), value in sorted(counters.items()):
+            if series_name == name:
+                lines.append(f"{full}{_labels_text(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- STRUCTURED LOGS ----------
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger("nailsnotes")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(_JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log(event, level="info", **fields):
+    """One JSON log line: event name, the current request id and `fields`."""
+    level_no = logging.getLevelName(level.upper())
+    if not logger.isEnabledFor(level_no):
+        return
+    rid = request_id.get()
+    if rid is not None:
+        fields = {"request_id": rid, **fields}
+    logger.log(level_no, event, extra={"fields": fields})
+
+
+def propagate(fn):
+    """Wrap `fn` so pool threads log with the request id of the submitting thread."""
+    rid = request_id.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = request_id.set(rid)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            request_id.reset(token)
+    return wrapper
+
+
+describe("stage_seconds", "Time spent per daily log pipeline stage.")
+describe("http_request_seconds", "Flask request latency by route.")
+describe("upload_bytes", "Bytes received in uploads.")
+describe("photos", "Photos handled per stage.")
+describe("image_bytes", "Encoded image bytes written per stage.")
+describe("pdf_bytes", "Bytes of rendered daily log PDFs.")
+describe("scope_documents", "Scope documents requested, by parse cache outcome.")
+describe("pdf_renders", "Daily log submissions by outcome: rendered, cached PDF or joined a job in flight.")
+describe("classify_cache", "Photos looked up in the classification cache, by outcome.")
+describe("classify_saved_seconds", "Model time saved by classification cache hits.")
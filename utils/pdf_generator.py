@@ -3,12 +3,77 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.units import inch
-from PyPDF2 import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
 from io import BytesIO
 import os
 
+from .pdf_images import prepare_photos, PDF_PHOTO_DPI
+
+FOOTER_TEXT = "Confidential – Do Not Duplicate without written consent from BAINS Dev Comm"
+PHOTO_WIDTH, PHOTO_HEIGHT = 3.2 * inch, 2.4 * inch
+SAFETY_SHEET_WIDTH, SAFETY_SHEET_HEIGHT = 6 * inch, 8 * inch
+
+
+class NumberedCanvas(canvas.Canvas):
+    """
+    Holds each finished page until the document is complete, then draws the footer
+    with "Page X of Y" on every page in the same build pass.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_page_states = []
+
+    def showPage(self):
+        self._saved_page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        total = len(self._saved_page_states)
+        for state in self._saved_page_states:
+            self.__dict__.update(state)
+            self.draw_footer(total)
+            super().showPage()
+        super().save()
+
+    def draw_footer(self, total):
+        draw_footer(self, total)
+
+
+def draw_footer(canv, total=None):
+    """The confidentiality footer with "Page X of Y", or "Page X" when the total is not known."""
+    page = f"Page {canv.getPageNumber()}" + (f" of {total}" if total is not None else "")
+    canv.saveState()
+    canv.setFont("Helvetica", 8)
+    canv.drawString(40, 20, f"{FOOTER_TEXT} | {page}")
+    canv.restoreState()
+
+
+def _detail_suffix(fields):
+    """" (03-300, 42 CY)" for a spreadsheet scope item, "" for a plain line."""
+    if not fields:
+        return ""
+    parts = [str(fields["cost_code"])] if fields.get("cost_code") else []
+    quantity = fields.get("quantity")
+    if quantity is not None:
+        quantity = f"{quantity:g}" if isinstance(quantity, float) else str(quantity)
+        parts.append(f"{quantity} {fields.get('unit', '')}".strip())
+    elif fields.get("unit"):
+        parts.append(str(fields["unit"]))
+    return f" ({', '.join(parts)})" if parts else ""
+
+
+def render_daily_log_pdf(data, image_paths, logo_path, ai_analysis, progress_report=None, **kwargs):
+    """Build the daily log in memory and return the PDF bytes."""
+    buffer = BytesIO()
+    create_daily_log_pdf(data, image_paths, logo_path, ai_analysis, progress_report, buffer, **kwargs)
+    return buffer.getvalue()
+
+
 def create_daily_log_pdf(data, image_paths, logo_path, ai_analysis, progress_report, save_path,
-                         weather_icon_path=None, safety_sheet_path=None):
+                         weather_icon_path=None, safety_sheet_path=None, photo_dpi=PDF_PHOTO_DPI):
+    # save_path may be a file path or a writable binary buffer
+    # Photos are resampled to photo_dpi at their placed size (cached, see utils/pdf_images.py)
 
     doc = SimpleDocTemplate(save_path, pagesize=A4)
     elements = []
@@ -62,15 +127,16 @@ def create_daily_log_pdf(data, image_paths, logo_path, ai_analysis, progress_rep
     # Page 2: Job Site Photos
     if image_paths:
         elements.append(Paragraph("Job Site Photos", title_style))
-        for path in image_paths:
-            if os.path.exists(path) and path.lower().endswith(('.jpg', '.jpeg', '.png')):
-                try:
-                    img = Image(path, width=3.2 * inch, height=2.4 * inch)
-                    img.hAlign = 'CENTER'
-                    elements.append(img)
-                    elements.append(Spacer(1, 6))
-                except Exception as e:
-                    print(f"Failed to load image: {path}, error: {e}")
+        photos = [path for path in image_paths
+                  if os.path.exists(path) and path.lower().endswith(('.jpg', '.jpeg', '.png'))]
+        for path in prepare_photos(photos, PHOTO_WIDTH, PHOTO_HEIGHT, dpi=photo_dpi):
+            try:
+                img = Image(path, width=PHOTO_WIDTH, height=PHOTO_HEIGHT)
+                img.hAlign = 'CENTER'
+                elements.append(img)
+                elements.append(Spacer(1, 6))
+            except Exception as e:
+                print(f"Failed to load image: {path}, error: {e}")
         elements.append(PageBreak())
 
     # Page 3: AI Scope Analysis
@@ -83,11 +149,13 @@ def create_daily_log_pdf(data, image_paths, logo_path, ai_analysis, progress_rep
         progress_bar = f"[{'█' * (completion // 10)}{'░' * (10 - (completion // 10))}]"
         elements.append(Paragraph(f"Completion: <b>{completion}%</b> {progress_bar}", normal))
 
+        details = ai_analysis.get('item_details') or {}
+
         def render_list(title, items):
             if items:
                 elements.append(Paragraph(title, header_style))
                 for item in items:
-                    elements.append(Paragraph(f"- {item}", normal))
+                    elements.append(Paragraph(f"- {item}{_detail_suffix(details.get(item))}", normal))
 
         render_list("Matched Items", ai_analysis.get('matched', []))
         render_list("Unmatched Items", ai_analysis.get('unmatched', []))
@@ -104,22 +172,14 @@ def create_daily_log_pdf(data, image_paths, logo_path, ai_analysis, progress_rep
         if safety_sheet_path.lower().endswith(('.png', '.jpg', '.jpeg')):
             elements.append(Paragraph("Safety Sheet", title_style))
             try:
-                elements.append(Image(safety_sheet_path, width=6 * inch, height=8 * inch))
+                sheet_path = prepare_photos([safety_sheet_path], SAFETY_SHEET_WIDTH, SAFETY_SHEET_HEIGHT,
+                                            dpi=photo_dpi)[0]
+                elements.append(Image(sheet_path, width=SAFETY_SHEET_WIDTH, height=SAFETY_SHEET_HEIGHT))
             except Exception as e:
                 print(f"Error loading safety sheet: {e}")
         elif safety_sheet_path.lower().endswith('.pdf'):
             print("PDF safety sheets not yet supported. Skipping render.")
         elements.append(PageBreak())
 
-    # Build PDF
-    doc.build(elements)
-
-    # Add footer with page numbers
-    with open(save_path, 'rb') as f:
-        reader = PdfReader(f)
-        writer = PdfWriter()
-        for i, page in enumerate(reader.pages):
-            page.merge_text(40, 20, f"Confidential – Do Not Duplicate without written consent from BAINS Dev Comm | Page {i+1}", size=8)
-            writer.add_page(page)
-        with open(save_path, 'wb') as f_out:
-            writer.write(f_out)
+    # Build PDF; footers and page numbers are drawn by NumberedCanvas in the same pass
+    doc.build(elements, canvasmaker=NumberedCanvas)
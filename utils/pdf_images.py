@@ -0,0 +1,182 @@
+# utils/pdf_images.py
+# Resample photos to the resolution they are actually printed at before embedding.
+#
+# Prepared copies are cached by source content hash in PDF_PHOTO_CACHE. Roll-ups
+# fall back to them once the uploads are evicted, so they are kept longer than the
+# uploads: evicted after PDF_PHOTO_CACHE_TTL_SECONDS, then least recently used
+# first over PDF_PHOTO_CACHE_MAX_BYTES.
+
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageFile, ImageOps
+
+from . import metrics
+from .hashing import sha256_file
+
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+# ---------- CONFIG ----------
+PDF_PHOTO_DPI = int(os.getenv("PDF_PHOTO_DPI", "150"))
+PDF_PHOTO_QUALITY = int(os.getenv("PDF_PHOTO_QUALITY", "80"))
+PDF_PHOTO_CACHE = os.getenv("PDF_PHOTO_CACHE", "static/cache/pdf_photos")
+PDF_PHOTO_WORKERS = int(os.getenv("PDF_PHOTO_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PHOTO_CACHE_TTL_SECONDS = int(os.getenv("PDF_PHOTO_CACHE_TTL_SECONDS", str(90 * 24 * 3600)))
+PDF_PHOTO_CACHE_MAX_BYTES = int(os.getenv("PDF_PHOTO_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+EVICT_INTERVAL_SECONDS = 600
+TMP_MAX_AGE_SECONDS = 3600  # temp renders older than this were abandoned by a crashed worker
+
+POINTS_PER_INCH = 72
+
+
+def target_pixels(width_pt, height_pt, dpi=PDF_PHOTO_DPI):
+    return (max(1, round(width_pt / POINTS_PER_INCH * dpi)),
+            max(1, round(height_pt / POINTS_PER_INCH * dpi)))
+
+
+def _cache_path(digest, size, quality, cache_dir):
+    return os.path.join(cache_dir, f"{digest}_{size[0]}x{size[1]}_q{quality}.jpg")
+
+
+def _touch(path):
+    """True if `path` exists; a hit bumps its LRU clock."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def cached_photo(digest, width_pt, height_pt, dpi=PDF_PHOTO_DPI, quality=PDF_PHOTO_QUALITY, cache_dir=None):
+    """The prepared copy of the photo with content hash `digest`, or None if it was never prepared."""
+    path = _cache_path(digest, target_pixels(width_pt, height_pt, dpi), quality, cache_dir or PDF_PHOTO_CACHE)
+    return path if _touch(path) else None
+
+
+def _render(path, size, quality, out_path):
+    """Decode, fix EXIF orientation, shrink to cover `size` and write a JPEG."""
+    with Image.open(path) as img:
+        # Let the JPEG decoder skip detail we are about to throw away
+        img.draft("RGB", (max(size), max(size)))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        scale = max(size[0] / img.width, size[1] / img.height)
+        if scale < 1:
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                             Image.LANCZOS)
+        tmp_path = f"{out_path}.{uuid.uuid4().hex}.tmp"
+        img.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _try_render(path, size, quality, out_path):
+    try:
+        return _render(path, size, quality, out_path)
+    except Exception as e:
+        metrics.log("pdf_photo_render_failed", level="warning", file=path, error=str(e))
+        return None
+
+
+@metrics.timed("photo_prepare")
+def prepare_photos(image_paths, width_pt, height_pt, dpi=PDF_PHOTO_DPI, quality=PDF_PHOTO_QUALITY,
+                   cache_dir=None, max_workers=PDF_PHOTO_WORKERS):
+    """
+    Return paths to JPEGs sized for a `width_pt` x `height_pt` placement at `dpi`,
+    in input order. Results are cached by source content hash, so regenerating a
+    log reuses them; misses are rendered in a process pool. A photo that cannot
+    be prepared falls back to its original path. A falsy `dpi` disables resampling.
+    """
+    if not dpi:
+        return list(image_paths)
+    cache_dir = cache_dir or PDF_PHOTO_CACHE
+    os.makedirs(cache_dir, exist_ok=True)
+    size = target_pixels(width_pt, height_pt, dpi)
+    prepared = list(image_paths)
+    misses = []
+    for i, path in enumerate(image_paths):
+        try:
+            out_path = _cache_path(sha256_file(path), size, quality, cache_dir)
+        except OSError as e:
+            metrics.log("pdf_photo_unreadable", level="warning", file=path, error=str(e))
+            continue
+        if _touch(out_path):
+            prepared[i] = out_path
+        else:
+            misses.append((i, path, out_path))
+
+    if len(misses) > 1 and max_workers > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(misses))) as pool:
+            futures = [pool.submit(_try_render, path, size, quality, out_path)
+                       for _, path, out_path in misses]
+            results = [future.result() for future in futures]
+    else:
+        results = [_try_render(path, size, quality, out_path) for _, path, out_path in misses]
+
+    for (i, path, _), result in zip(misses, results):
+        prepared[i] = result or path
+    metrics.count("photos", len(image_paths) - len(misses), stage="photo_prepare", cache="hit")
+    metrics.count("photos", len(misses), stage="photo_prepare", cache="miss")
+    return prepared
+
+
+def evict(cache_dir=None, ttl=None, max_bytes=None):
+    """
+    Delete prepared photos older than `ttl`, then the least recently used ones
+    until the cache fits in `max_bytes`. Returns the count removed.
+    """
+    cache_dir = cache_dir or PDF_PHOTO_CACHE
+    ttl = PDF_PHOTO_CACHE_TTL_SECONDS if ttl is None else ttl
+    max_bytes = PDF_PHOTO_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time()
+
+    removed = 0
+    entries, total = [], 0
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > TMP_MAX_AGE_SECONDS:
+                    os.remove(path)
+                    removed += 1
+                continue
+        except FileNotFoundError:
+            continue
+        if not name.endswith(".jpg"):
+            continue
+        total += stat.st_size
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= ttl and total <= max_bytes:
+            break
+        try:
+            if os.path.getmtime(path) != mtime:
+                continue  # used since the scan started
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def maybe_evict(cache_dir=None):
+    """Run evict() at most once per EVICT_INTERVAL_SECONDS across all processes."""
+    cache_dir = cache_dir or PDF_PHOTO_CACHE
+    stamp = os.path.join(cache_dir, ".last_evict")
+    try:
+        if time.time() - os.path.getmtime(stamp) < EVICT_INTERVAL_SECONDS:
+            return 0
+    except FileNotFoundError:
+        pass
+    os.makedirs(cache_dir, exist_ok=True)
+    open(stamp, "a").close()
+    os.utime(stamp)
+    return evict(cache_dir)
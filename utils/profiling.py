@@ -0,0 +1,225 @@
+# utils/profiling.py
+# Opt-in profiling of single requests and PDF jobs in production.
+#
+# A request is profiled when any of these holds:
+#   - it carries a valid X-Profile-Signature header (see sign())
+#   - an admin armed profiling (arm(): a sample rate with an expiry, shared by all
+#     processes through a small file in PROFILE_DIR)
+#   - random sampling at PROFILE_SAMPLE_RATE picks it
+# /generate_form hands the decision to its queued job. Each profile is saved to
+# PROFILE_DIR as <id>.prof (cProfile, for pstats/snakeviz), <id>.txt (top
+# functions plus the tracemalloc top allocations) and <id>.json (summary).
+#
+# cProfile and tracemalloc are process-wide, so one profile runs per process at a
+# time: a request or job picked while another is being profiled runs unprofiled.
+
+import os
+import io
+import hmac
+import json
+import time
+import uuid
+import random
+import pstats
+import hashlib
+import cProfile
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+
+from . import metrics
+
+# ---------- CONFIG ----------
+PROFILE_DIR = os.getenv("PROFILE_DIR", "static/debug_output")
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")            # HMAC key for X-Profile-Signature
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of requests profiled
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))           # newest profiles kept on disk
+SIGNATURE_MAX_AGE = 300                                          # seconds a signed header stays valid
+TRACEMALLOC_FRAMES = 10
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TOGGLE_FILE = ".armed.json"
+
+_active = contextvars.ContextVar("profile_session", default=None)
+_running = threading.Lock()  # held by the one Session of this process
+
+
+# ---------- DECISION ----------
+def sign(path, timestamp=None, secret=None):
+    """Value for the X-Profile-Signature header that profiles one request to `path`."""
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    key = (secret or PROFILE_SECRET).encode("utf-8")
+    digest = hmac.new(key, f"{timestamp}:{path}".encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{timestamp}:{digest}"
+
+
+def signature_valid(header, path):
+    if not PROFILE_SECRET or not header:
+        return False
+    try:
+        timestamp = int(header.split(":", 1)[0])
+    except ValueError:
+        return False
+    if abs(time.time() - timestamp) > SIGNATURE_MAX_AGE:
+        return False
+    return hmac.compare_digest(header, sign(path, timestamp))
+
+
+def arm(sample_rate=1.0, minutes=10):
+    """Profile `sample_rate` of all requests and jobs, in every process, for `minutes`."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    state = {"sample_rate": sample_rate, "until": time.time() + minutes * 60}
+    tmp_path = os.path.join(PROFILE_DIR, f"{TOGGLE_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(PROFILE_DIR, TOGGLE_FILE))
+    return state
+
+
+def disarm():
+    try:
+        os.remove(os.path.join(PROFILE_DIR, TOGGLE_FILE))
+    except FileNotFoundError:
+        pass
+
+
+_armed = {"mtime": None, "state": None}
+
+def armed_state():
+    """The admin toggle, re-read only when its file changes (one stat per call)."""
+    path = os.path.join(PROFILE_DIR, TOGGLE_FILE)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if mtime != _armed["mtime"]:
+        try:
+            with open(path, "r") as f:
+                _armed["state"] = json.load(f)
+        except (OSError, ValueError):
+            _armed["state"] = None
+        _armed["mtime"] = mtime
+    state = _armed["state"]
+    if not state or time.time() > state.get("until", 0):
+        return None
+    return state
+
+
+def should_profile(signature=None, path=None):
+    """Decide whether this request or job runs under the profiler."""
+    if signature and signature_valid(signature, path):
+        return True
+    state = armed_state()
+    rate = max(PROFILE_SAMPLE_RATE, state["sample_rate"] if state else 0.0)
+    return rate > 0 and random.random() < rate
+
+
+# ---------- CAPTURE ----------
+class Session:
+    """One running profile; stop() writes it to PROFILE_DIR and returns its summary."""
+
+    def __init__(self, kind, label):
+        self.kind = kind
+        self.label = label
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}_{kind}_{uuid.uuid4().hex[:8]}"
+        self.request_id = metrics.request_id.get()
+        self.token = _active.set(self)
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        self.profiler = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self, **extra):
+        try:
+            self.profiler.disable()
+            seconds = time.perf_counter() - self.start
+            _active.reset(self.token)
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if self.owns_tracemalloc:
+                tracemalloc.stop()
+        finally:
+            _running.release()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, self.id)
+        self.profiler.dump_stats(f"{base}.prof")
+
+        report = io.StringIO()
+        report.write(f"{self.kind} {self.label} | {seconds * 1000:.1f} ms | peak traced {peak / 1e6:.1f} MB\n\n")
+        pstats.Stats(self.profiler, stream=report).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        report.write("\nTop allocations (tracemalloc, by line)\n")
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            report.write(f"{stat}\n")
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+
+        summary = {"id": self.id, "kind": self.kind, "label": self.label, "request_id": self.request_id,
+                   "created": time.time(), "seconds": round(seconds, 4), "peak_traced_bytes": peak, **extra}
+        with open(f"{base}.json", "w") as f:
+            json.dump(summary, f)
+        metrics.log("profile_saved", profile=self.id, seconds=summary["seconds"], kind=self.kind)
+        prune()
+        return summary
+
+
+def start(kind, label):
+    """Start profiling this thread, or return None if a profile is already running in this process."""
+    if _active.get() is not None:
+        return None  # e.g. an inline job inside a profiled request: the outer profile covers it
+    if not _running.acquire(blocking=False):
+        # Another thread's session owns cProfile and tracemalloc
+        metrics.log("profile_skipped", kind=kind, label=label, reason="busy")
+        return None
+    try:
+        return Session(kind, label)
+    except Exception:
+        _running.release()
+        raise
+
+
+@contextmanager
+def profiled(kind, label, enabled=True):
+    """Run the block under the profiler when `enabled`."""
+    session = start(kind, label) if enabled else None
+    if session is None:
+        yield None
+        return
+    try:
+        yield session
+    finally:
+        session.stop()
+
+
+# ---------- LISTING ----------
+def list_profiles(limit=100):
+    """Saved profile summaries, newest first."""
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if name.endswith(".json") and name != TOGGLE_FILE]
+    except FileNotFoundError:
+        return []
+    summaries = []
+    for name in sorted(names, reverse=True)[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), "r") as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def prune(keep=None):
+    """Delete all but the newest `keep` profiles."""
+    keep = PROFILE_KEEP if keep is None else keep
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json") and name != TOGGLE_FILE)
+    for profile_id in ids[:max(0, len(ids) - keep)]:
+        for ext in (".json", ".prof", ".txt"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + ext))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,200 @@
+# utils/render_cache.py
+# Rendered PDFs named by what they were rendered from.
+#
+#   daily log: key = sha256(form fields, log date, scope version (and its spreadsheet
+#                           items), done-item ledger
+#                           state, photo and logo content hashes, render settings
+#                           (photo DPI, scope matching, classifier), RENDER_VERSION)
+#   roll-up:   key = sha256(project, date range, count and last update of its logs)
+#   {GENERATED_FOLDER}/<kind>_<key[:32]>.pdf
+#
+# Submitting the same log again (a retried upload, a double tap) yields the same
+# key, so /generate_form can hand back the PDF that is already on disk instead of
+# rendering it again. Files are written to a temp name and moved into place, so a
+# reader never sees half a PDF even when two identical jobs race. Old PDFs are
+# evicted by TTL, then least-recently-served first over GENERATED_MAX_BYTES.
+
+import os
+import json
+import time
+import uuid
+import hashlib
+
+from .hashing import sha256_file
+from .upload_store import digest_of
+from .scope_store import items_path_for
+
+# ---------- CONFIG ----------
+GENERATED_FOLDER = "static/generated"
+GENERATED_TTL_SECONDS = int(os.getenv("GENERATED_TTL_SECONDS", str(30 * 24 * 3600)))
+GENERATED_MAX_BYTES = int(os.getenv("GENERATED_MAX_BYTES", str(5 * 1024 ** 3)))
+EVICT_INTERVAL_SECONDS = 600
+TMP_MAX_AGE_SECONDS = 3600  # temp renders older than this were abandoned by a crashed job
+RENDER_VERSION = "1"  # bump when the PDF layout changes so old renders are not served
+KEY_LENGTH = 32
+KINDS = ("daily_log", "rollup")
+
+
+def _normalize(value):
+    # Line endings and trailing spaces differ between browsers and mobile keyboards
+    return "\n".join(line.rstrip() for line in str(value).replace("\r\n", "\n").split("\n")).strip()
+
+
+def _upload_digest(path):
+    # Upload store objects are named <sha256><ext>; anything else is hashed
+    return digest_of(path) or sha256_file(path)
+
+
+def render_settings():
+    """Deployment settings that change what a daily log PDF shows."""
+    from .pdf_images import PDF_PHOTO_DPI, PDF_PHOTO_QUALITY
+    from .compare_scope_vs_log import SCOPE_MATCHING
+    from .classification_cache import model_version_in_use
+
+    settings = {"photo_dpi": PDF_PHOTO_DPI, "photo_quality": PDF_PHOTO_QUALITY,
+                "scope_matching": SCOPE_MATCHING, "classifier": model_version_in_use()}
+    if SCOPE_MATCHING == "semantic":
+        from . import scope_embeddings
+
+        settings["semantic"] = [scope_embeddings.EMBEDDING_MODEL, scope_embeddings.MATCH_THRESHOLD,
+                                scope_embeddings.IN_PROGRESS_THRESHOLD, scope_embeddings.OUT_OF_SCOPE_THRESHOLD]
+    return settings
+
+
+def render_key(form_data, log_date, scope_path, image_paths, logo_path, done_items=None):
+    """Hex key of everything the daily log PDF depends on."""
+    try:
+        scope_version = sha256_file(scope_path)
+    except OSError:
+        scope_version = None
+    try:
+        # Quantities and cost codes of spreadsheet items are printed beside them
+        items_version = sha256_file(items_path_for(scope_path))
+    except OSError:
+        items_version = None
+    parts = {
+        "version": RENDER_VERSION,
+        "form": {k: _normalize(v) for k, v in form_data.items()},
+        "log_date": log_date,
+        "scope": scope_version,
+        "scope_items": items_version,
+        "done": sorted(done_items) if done_items is not None else None,
+        "photos": [_upload_digest(path) for path in image_paths],
+        "logo": _upload_digest(logo_path) if logo_path else None,
+        "settings": render_settings(),
+    }
+    return _digest(parts)
+
+
+def rollup_key(project_id, start, end, logs_version):
+    """Hex key of a roll-up report; `logs_version` is data_storage.daily_logs_version()."""
+    return _digest({"version": RENDER_VERSION, "project": project_id, "start": start, "end": end,
+                    "logs": list(logs_version)})
+
+
+def _digest(parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:KEY_LENGTH]
+
+
+def filename_for(key, kind="daily_log"):
+    return f"{kind}_{key}.pdf"
+
+
+def key_for(filename):
+    """The render key in a cached PDF's name, or None for other files."""
+    stem, ext = os.path.splitext(filename)
+    kind, _, key = stem.rpartition("_")
+    if ext != ".pdf" or kind not in KINDS or len(key) != KEY_LENGTH:
+        return None
+    return key
+
+
+def cached_pdf(filename, root=None):
+    """Path of a rendered PDF, or None. A hit bumps its LRU clock."""
+    path = os.path.join(root or GENERATED_FOLDER, filename)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        return None
+
+
+def find_cached(key, root=None):
+    """Filename of the PDF of any kind rendered for `key`, or None."""
+    for kind in KINDS:
+        if cached_pdf(filename_for(key, kind), root):
+            return filename_for(key, kind)
+    return None
+
+
+def tmp_path_for(path):
+    """Where to render `path` before it is moved into place with os.replace."""
+    tmp_dir = os.path.join(os.path.dirname(path), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    return os.path.join(tmp_dir, f"{uuid.uuid4().hex}.pdf")
+
+
+def evict(root=None, ttl=None, max_bytes=None):
+    """
+    Delete PDFs older than `ttl`, then the least recently served ones until the
+    folder fits in `max_bytes`. Returns the count removed.
+    """
+    root = root or GENERATED_FOLDER
+    ttl = GENERATED_TTL_SECONDS if ttl is None else ttl
+    max_bytes = GENERATED_MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time()
+
+    removed = 0
+    tmp_dir = os.path.join(root, "tmp")
+    for name in (os.listdir(tmp_dir) if os.path.isdir(tmp_dir) else []):
+        path = os.path.join(tmp_dir, name)
+        try:
+            if now - os.path.getmtime(path) > TMP_MAX_AGE_SECONDS:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+
+    entries, total = [], 0
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith(".pdf"):
+            continue
+        path = os.path.join(root, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        total += stat.st_size
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= ttl and total <= max_bytes:
+            break
+        try:
+            if os.path.getmtime(path) != mtime:
+                continue  # served since the scan started
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def maybe_evict(root=None):
+    """Run evict() at most once per EVICT_INTERVAL_SECONDS across all processes."""
+    root = root or GENERATED_FOLDER
+    stamp = os.path.join(root, ".last_evict")
+    try:
+        if time.time() - os.path.getmtime(stamp) < EVICT_INTERVAL_SECONDS:
+            return 0
+    except FileNotFoundError:
+        pass
+    os.makedirs(root, exist_ok=True)
+    open(stamp, "a").close()
+    os.utime(stamp)
+    return evict(root)
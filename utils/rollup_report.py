@@ -0,0 +1,222 @@
+# utils/rollup_report.py
+# Weekly and monthly roll-up PDFs built from a project's stored daily logs.
+#
+# Every distinct image is embedded once. Photos go through prepare_photos, whose
+# cache is named by content hash, and reportlab stores one image XObject per file
+# however many pages draw it. The logo is drawn once into a form XObject that
+# every page header references. Logs are read from SQLite one row at a time, and
+# each day's flowables are made, laid out and dropped before the next day is read;
+# pages carry "Page N" without a total, so no page is held back either. Flowables
+# only point at image files: pixels are read when a photo is first embedded, so
+# memory follows the distinct images, not days x photos.
+
+import os
+import datetime
+import itertools
+from xml.sax.saxutils import escape
+
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import (BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Image, PageBreak,
+                                Table, TableStyle)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.units import inch
+
+from . import metrics
+from .data_storage import iter_daily_logs, daily_logs_version, latest_logo
+from .pdf_generator import draw_footer, PHOTO_WIDTH, PHOTO_HEIGHT
+from .pdf_images import prepare_photos, cached_photo, PDF_PHOTO_DPI
+from .upload_store import digest_of
+
+# ---------- CONFIG ----------
+PERIODS = ("week", "month")
+ROLLUP_PHOTO_WIDTH, ROLLUP_PHOTO_HEIGHT = 3.0 * inch, 2.25 * inch  # two per row
+LOGO_WIDTH, LOGO_HEIGHT = 100, 40
+LOGO_FORM = "rollup_logo"
+TOP_MARGIN = 80  # room for the logo header
+DAY_FIELDS = ['location', 'supervisor', 'weather']
+DAY_SECTIONS = ['work_done', 'crew_notes', 'safety_notes', 'equipment_used']
+
+
+def period_range(period, day=None):
+    """(start, end) ISO dates of the week (Monday to Sunday) or month containing `day`."""
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    day = day or datetime.date.today()
+    if period == "week":
+        start = day - datetime.timedelta(days=day.weekday())
+        end = start + datetime.timedelta(days=6)
+    elif period == "month":
+        start = day.replace(day=1)
+        end = (start + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    else:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    return start.isoformat(), end.isoformat()
+
+
+def _day_photos(paths, photo_dpi):
+    """Prepared photo files of one day. Photos evicted from the upload store fall back
+    to the copy prepared when the daily log was rendered; others are skipped."""
+    present = [path for path in paths if os.path.exists(path)]
+    prepared = dict(zip(present, prepare_photos(present, PHOTO_WIDTH, PHOTO_HEIGHT, dpi=photo_dpi)))
+    photos = []
+    for path in paths:
+        if path in prepared:
+            photos.append(prepared[path])
+            continue
+        digest = digest_of(path)
+        cached = cached_photo(digest, PHOTO_WIDTH, PHOTO_HEIGHT, dpi=photo_dpi) if digest and photo_dpi else None
+        if cached:
+            photos.append(cached)
+        else:
+            metrics.log("rollup_photo_missing", level="warning", file=path)
+    return photos
+
+
+def _photo_grid(photos):
+    cells = [Image(path, width=ROLLUP_PHOTO_WIDTH, height=ROLLUP_PHOTO_HEIGHT) for path in photos]
+    rows = [cells[i:i + 2] + [""] * (2 - len(cells[i:i + 2])) for i in range(0, len(cells), 2)]
+    grid = Table(rows, colWidths=[ROLLUP_PHOTO_WIDTH + 6] * 2)
+    grid.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP"), ("BOTTOMPADDING", (0, 0), (-1, -1), 6)]))
+    return grid
+
+
+def _header(logo_path):
+    def draw(canv, doc):
+        if not logo_path:
+            return
+        if not canv.hasForm(LOGO_FORM):
+            # Drawn once into a form XObject; every later page only references it
+            canv.beginForm(LOGO_FORM)
+            canv.drawImage(logo_path, 0, 0, LOGO_WIDTH, LOGO_HEIGHT, preserveAspectRatio=True, mask="auto")
+            canv.endForm()
+        canv.saveState()
+        canv.translate(doc.leftMargin, A4[1] - TOP_MARGIN + 24)
+        canv.doForm(LOGO_FORM)
+        canv.restoreState()
+    return draw
+
+
+def _day_flowables(log, form, analysis, photos, styles):
+    day_style, header_style, normal = styles
+    day = datetime.date.fromisoformat(log["date"])
+    elements = [Paragraph(escape(day.strftime("%A, %d %B %Y")), day_style)]
+    for field in DAY_FIELDS:
+        if form.get(field):
+            elements.append(Paragraph(f"<b>{field.replace('_', ' ').title()}:</b> {escape(form[field])}", normal))
+    for section in DAY_SECTIONS:
+        if form.get(section):
+            elements.append(Paragraph(section.replace('_', ' ').title(), header_style))
+            elements.append(Paragraph(escape(form[section]).replace("\n", "<br/>"), normal))
+
+    if analysis:
+        elements.append(Paragraph("Scope", header_style))
+        elements.append(Paragraph(f"Completion: <b>{analysis.get('completion', 0)}%</b>", normal))
+        for title, key in (("Finished", "matched"), ("Out of Scope", "out_of_scope"),
+                           ("Suggested Change Orders", "change_order_suggestions")):
+            items = analysis.get(key) or []
+            if items:
+                elements.append(Paragraph(f"<i>{title}</i>", normal))
+                elements.extend(Paragraph(f"- {escape(item)}", normal) for item in items)
+
+    if photos:
+        elements.append(Paragraph("Photos", header_style))
+        elements.append(_photo_grid(photos))
+    elements.append(PageBreak())
+    return elements
+
+
+def _build(doc, chunks, on_page, canvasmaker=Canvas):
+    """
+    BaseDocTemplate.build over an iterable of flowable lists. Each list is laid
+    out and dropped before the next is made, so only one day's flowables exist at once.
+    """
+    doc._calc()
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+    doc.addPageTemplates([PageTemplate(id='Page', frames=frame, onPage=on_page, pagesize=doc.pagesize)])
+    doc._startBuild(canvasmaker=canvasmaker)
+    doc.canv._doctemplate = doc
+    try:
+        for flowables in chunks:
+            while flowables:
+                doc.clean_hanging()
+                doc.handle_flowable(flowables)
+    finally:
+        del doc.canv._doctemplate
+    doc._endBuild()
+
+
+def create_rollup_pdf(project_id, start, end, save_path, logo_path=None, photo_dpi=PDF_PHOTO_DPI, db_path=None):
+    """
+    Render the daily logs of `project_id` from `start` to `end` (ISO dates, inclusive)
+    into one PDF. save_path may be a file path or a writable binary buffer.
+    Without `logo_path`, the newest logo stored with the logs is used.
+    Returns counts: days, photos placed and distinct photos embedded.
+    """
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(name='Title', fontSize=18, alignment=TA_CENTER, spaceAfter=20)
+    day_styles = (ParagraphStyle(name='Day', fontSize=15, spaceAfter=8),
+                  ParagraphStyle(name='Header', fontSize=12, spaceBefore=8, spaceAfter=4),
+                  styles['Normal'])
+    header_style, normal = day_styles[1:]
+
+    summary_rows = [["Date", "Supervisor", "Completion", "Photos"]]
+    finished, seen = [], set()
+    counts = {"days": 0, "photos": 0}
+    distinct = set()
+    logs = iter_daily_logs(project_id, start, end, db_path)
+    first = next(logs, None)
+    project_name = (first["form_data"].get("project_name") if first else None) or project_id
+    # The logo is drawn from the first page on, before the logs are read
+    stored_logo = None if logo_path else latest_logo(project_id, start, end, db_path)
+
+    def chunks():
+        days = daily_logs_version(project_id, start, end, db_path)[0]
+        yield [Paragraph(f"{escape(project_name)}: Daily Logs {start} to {end}", title_style),
+               Paragraph(f"{days} daily log{'s' if days != 1 else ''}", normal),
+               Spacer(1, 12)]
+        for log in itertools.chain([first] if first else [], logs):
+            form = log["form_data"]
+            analysis = log["analysis"] or {}
+            photos = _day_photos(log.get("photos") or [], photo_dpi)
+            for item in analysis.get("matched") or []:
+                if item not in seen:
+                    seen.add(item)
+                    finished.append(item)
+            counts["days"] += 1
+            counts["photos"] += len(photos)
+            distinct.update(photos)
+            summary_rows.append([log["date"], form.get("supervisor", ""),
+                                 f"{analysis.get('completion', 0)}%" if analysis else "-", str(len(photos))])
+            yield _day_flowables(log, form, analysis, photos, day_styles)
+
+        # Summary last: the logs are read in one pass, so the totals are known only now
+        summary = [Paragraph("Summary", title_style)]
+        if counts["days"]:
+            summary.append(Paragraph(f"{counts['days']} daily log{'s' if counts['days'] != 1 else ''}, "
+                                     f"{counts['photos']} photos", normal))
+            summary.append(Spacer(1, 8))
+            table = Table(summary_rows, repeatRows=1)
+            table.setStyle(TableStyle([("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                                       ("LINEBELOW", (0, 0), (-1, 0), 0.5, "#444444")]))
+            summary.append(table)
+        else:
+            summary.append(Paragraph("No daily logs in this period.", normal))
+        if finished:
+            summary.append(Spacer(1, 12))
+            summary.append(Paragraph(f"Scope items finished this period ({len(finished)})", header_style))
+            summary.extend(Paragraph(f"- {escape(item)}", normal) for item in finished)
+        yield summary
+
+    header = _header(logo_path or stored_logo)
+
+    def on_page(canv, doc):
+        header(canv, doc)
+        # No "of Y": the total would mean holding every page until the end
+        draw_footer(canv)
+
+    doc = BaseDocTemplate(save_path, pagesize=A4, topMargin=TOP_MARGIN)
+    with metrics.stage("rollup_build"):
+        _build(doc, chunks(), on_page)
+    return {"days": counts["days"], "photos": counts["photos"], "distinct_photos": len(distinct)}
@@ -0,0 +1,193 @@
+# utils/scope_embeddings.py
+# Optional semantic scope matching (SCOPE_MATCHING=semantic) with a small local encoder.
+#
+# TF-IDF only matches shared words; an encoder matches meaning, so "poured the
+# slab" finds "Concrete pour: new slab". Scope items are embedded once per scope
+# version and model, saved as a float16 .npy beside the TF-IDF index and
+# memory-mapped by every worker. A log is embedded in one batch (one vector per
+# line) and scored with one dot product against the scope matrix; each line keeps
+# its top-k items.
+#
+# The encoder is only ever loaded from a local directory (SCOPE_EMBEDDING_MODEL,
+# e.g. a saved sentence-transformers/all-MiniLM-L6-v2); nothing is downloaded.
+
+import os
+import glob
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from . import metrics
+from .scope_index import scope_hash
+
+# ---------- CONFIG ----------
+EMBEDDING_MODEL = os.getenv("SCOPE_EMBEDDING_MODEL", "")
+EMBEDDING_VERSION = 1  # Bump when pooling, truncation or normalization change
+EMBEDDING_BATCH = int(os.getenv("SCOPE_EMBEDDING_BATCH", "64"))
+EMBEDDING_MAX_TOKENS = 64  # Scope items and log lines are short
+EMBEDDING_CACHE_SIZE = int(os.getenv("SCOPE_EMBEDDING_CACHE_SIZE", "32"))  # Scope matrices kept open
+SCORE_ROWS = 8192  # float16 scope rows widened to float32 per product
+TOP_K = int(os.getenv("SEMANTIC_TOP_K", "5"))  # Scope items each log line can match
+MATCH_THRESHOLD = float(os.getenv("SEMANTIC_MATCH_THRESHOLD", "0.6"))
+IN_PROGRESS_THRESHOLD = float(os.getenv("SEMANTIC_IN_PROGRESS_THRESHOLD", "0.45"))
+OUT_OF_SCOPE_THRESHOLD = float(os.getenv("SEMANTIC_OUT_OF_SCOPE_THRESHOLD", "0.4"))
+
+_encoders = {}  # model path -> Encoder, or None once loading failed
+_encoders_lock = threading.Lock()
+_matrices = OrderedDict()  # (scope hash, model fingerprint) -> (items x dim) float16
+_matrices_lock = threading.Lock()
+
+
+# ---------- ENCODER ----------
+def model_fingerprint(path: str) -> str:
+    """Identifies a saved model: its config plus the names and sizes of its files."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isfile(full):
+            digest.update(f"{name}:{os.path.getsize(full)}\n".encode("utf-8"))
+    with open(os.path.join(path, "config.json"), "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class Encoder:
+    """Mean-pooled, L2-normalized sentence embeddings from a local transformers model."""
+
+    def __init__(self, path: str):
+        from transformers import AutoModel, AutoTokenizer
+
+        self.path = path
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        self.model = AutoModel.from_pretrained(path, local_files_only=True).eval()
+        self.dim = self.model.config.hidden_size
+        self.fingerprint = model_fingerprint(path)
+
+    def encode(self, texts) -> np.ndarray:
+        """(len(texts) x dim) float32 unit vectors, in input order."""
+        import torch
+
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        # Batches of similar length waste less compute on padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        with torch.inference_mode():
+            for start in range(0, len(order), EMBEDDING_BATCH):
+                rows = order[start:start + EMBEDDING_BATCH]
+                batch = self.tokenizer([texts[i] for i in rows], padding=True, truncation=True,
+                                       max_length=EMBEDDING_MAX_TOKENS, return_tensors="pt")
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1)
+                out[rows] = torch.nn.functional.normalize(pooled, dim=1).numpy()
+        return out
+
+
+def load_encoder(path=None):
+    """The encoder saved at `path` (default SCOPE_EMBEDDING_MODEL), or None if it cannot be loaded."""
+    path = path or EMBEDDING_MODEL
+    with _encoders_lock:
+        if path in _encoders:
+            return _encoders[path]
+        try:
+            if not path:
+                raise ValueError("SCOPE_EMBEDDING_MODEL is not set")
+            encoder = Encoder(path)
+        except Exception as e:
+            # Logged once per process; callers fall back to TF-IDF
+            metrics.log("semantic_matching_unavailable", level="warning", model=path, error=str(e))
+            encoder = None
+        _encoders[path] = encoder
+        return encoder
+
+
+# ---------- SCOPE VECTORS ----------
+def embeddings_path(index_dir: str, content_hash: str, fingerprint: str) -> str:
+    key = hashlib.sha256(f"{content_hash}/{fingerprint}/{EMBEDDING_VERSION}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(index_dir, f"embeddings-{key}.npy")
+
+def _save(matrix, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, matrix)
+    os.replace(tmp_path, path)
+    # Vectors of earlier scope versions (or models) of this project are dead weight
+    for old in glob.glob(os.path.join(os.path.dirname(path), "embeddings-*.npy")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+def _load(path, n_items):
+    try:
+        matrix = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    return matrix if matrix.shape[0] == n_items else None
+
+def scope_matrix(scope_items, encoder, index_dir=None):
+    """
+    (items x dim) float16 embeddings of `scope_items`: from the in-process cache,
+    else memory-mapped from `index_dir`, else encoded (and saved there).
+    """
+    key = (scope_hash(scope_items), encoder.fingerprint)
+    with _matrices_lock:
+        matrix = _matrices.get(key)
+        if matrix is not None:
+            _matrices.move_to_end(key)
+            return matrix
+
+    path = embeddings_path(index_dir, *key) if index_dir else None
+    matrix = _load(path, len(scope_items)) if path else None
+    if matrix is None:
+        with metrics.stage("scope_embedding"):
+            matrix = encoder.encode(scope_items).astype(np.float16)
+        if path:
+            _save(matrix, path)
+            matrix = np.load(path, mmap_mode="r")
+
+    with _matrices_lock:
+        _matrices[key] = matrix
+        while len(_matrices) > EMBEDDING_CACHE_SIZE:
+            _matrices.popitem(last=False)
+    return matrix
+
+def clear_memory():
+    with _matrices_lock:
+        _matrices.clear()
+
+
+# ---------- MATCHING ----------
+def similarities(matrix, queries) -> np.ndarray:
+    """Cosine similarities (items x queries) of unit query vectors against the scope matrix."""
+    queries = np.asarray(queries, dtype=np.float32)
+    scores = np.empty((matrix.shape[0], len(queries)), dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCORE_ROWS):
+        block = np.asarray(matrix[start:start + SCORE_ROWS], dtype=np.float32)
+        np.dot(block, queries.T, out=scores[start:start + len(block)])
+    return scores
+
+def match(scope_items, lines, encoder, rows=None, index_dir=None, top_k=TOP_K):
+    """
+    Score log `lines` against the scope. Returns (item_scores, line_scores):
+    - item_scores: for each row in `rows` (default all), its best similarity to a
+      line that has it among its `top_k` nearest rows, else 0
+    - line_scores: each line's best similarity to any scope item, done or not
+    """
+    matrix = scope_matrix(scope_items, encoder, index_dir)
+    scores = similarities(matrix, encoder.encode(lines))
+    line_scores = scores.max(axis=0) if len(scope_items) else np.zeros(len(lines), dtype=np.float32)
+
+    candidates = scores if rows is None else scores[np.asarray(rows, dtype=np.int64)]
+    item_scores = np.zeros(candidates.shape[0], dtype=np.float32)
+    k = min(top_k, candidates.shape[0])
+    if k and len(lines):
+        top = np.argpartition(-candidates, k - 1, axis=0)[:k]  # (k x lines) row positions
+        best = candidates[top, np.arange(len(lines))]
+        np.maximum.at(item_scores, top.ravel(), best.ravel())
+    return item_scores, line_scores
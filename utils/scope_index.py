@@ -0,0 +1,352 @@
+# utils/scope_index.py
+# Compiled, per-project TF-IDF index over a Scope of Work.
+
+import os
+import re
+import json
+import math
+import uuid
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# ---------- CONFIG ----------
+INDEX_VERSION = 3
+INDEX_CACHE_SIZE = int(os.getenv("SCOPE_INDEX_CACHE_SIZE", "32"))  # Projects kept in memory
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")  # Same tokens as sklearn's TfidfVectorizer
+NGRAM_SIZE = 3
+NGRAM_BUCKETS = 1 << 16  # Hashed character n-gram postings lists
+CHAR_BINS = 128  # Character histogram bins for exact out-of-scope bounds
+
+_ARRAYS = ("idf", "data", "indices", "indptr", "ngram_indptr", "ngram_items", "ngram_counts", "lengths")
+
+
+# ---------- HELPERS ----------
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def scope_hash(scope_items: List[str]) -> str:
+    payload = json.dumps(scope_items, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+def ngram_buckets(text: str) -> np.ndarray:
+    """Unique hashed character n-grams of the lowercased, space-padded text."""
+    padded = f" {text.lower()} "
+    grams = {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+    buckets = {zlib.crc32(g.encode("utf-8")) % NGRAM_BUCKETS for g in grams}
+    return np.fromiter(buckets, dtype=np.int64, count=len(buckets))
+
+def _array_path(index_dir: str, name: str, build: Optional[str]) -> str:
+    # Arrays of version 2 indexes had no build id
+    return os.path.join(index_dir, f"{name}-{build}.npy" if build else f"{name}.npy")
+
+def _read_meta(index_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(index_dir, "meta.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def index_dir_for(scope_path: str) -> str:
+    """static/scope/{project_id}_scope.json -> static/scope/{project_id}_scope.index"""
+    return os.path.splitext(scope_path)[0] + ".index"
+
+
+# ---------- INDEX ----------
+class ScopeIndex:
+    """
+    Vocabulary, smoothed IDF weights and the L2-normalized TF-IDF matrix of a scope.
+    Scoring a log is one transform plus one sparse matrix-vector product.
+
+    Also holds character n-gram postings (bucket -> scope rows) used to shortlist
+    fuzzy-match candidates for a log line without touching every scope item.
+    """
+
+    def __init__(self, content_hash, n_docs, vocabulary, idf, data, indices, indptr,
+                 ngram_indptr, ngram_items, ngram_counts, lengths):
+        self.content_hash = content_hash
+        self.n_docs = n_docs
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.matrix = csr_matrix((data, indices, indptr), shape=(n_docs, len(vocabulary)), copy=False)
+        self.ngram_indptr = ngram_indptr
+        self.ngram_items = ngram_items
+        self.ngram_counts = ngram_counts
+        self.lengths = lengths
+        # IDF of a term no scope item contains; it still counts towards the log's norm
+        self.unseen_idf = math.log((1 + n_docs) / 1) + 1
+
+    @classmethod
+    def build(cls, scope_items: List[str]) -> "ScopeIndex":
+        vocabulary = {}
+        rows = []
+        for item in scope_items:
+            counts = {}
+            for token in tokenize(item):
+                col = vocabulary.setdefault(token, len(vocabulary))
+                counts[col] = counts.get(col, 0) + 1
+            rows.append(counts)
+
+        n_docs = len(scope_items)
+        df = np.zeros(len(vocabulary), dtype=np.float64)
+        for counts in rows:
+            df[list(counts)] += 1
+        idf = np.log((1 + n_docs) / (1 + df)) + 1
+
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        indices, data = [], []
+        for i, counts in enumerate(rows):
+            cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * idf[cols]
+            norm = np.linalg.norm(weights)
+            if norm:
+                weights /= norm
+            indices.append(cols)
+            data.append(weights)
+            indptr[i + 1] = indptr[i] + len(cols)
+
+        data = np.concatenate(data) if data else np.zeros(0, dtype=np.float64)
+        indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)
+        terms = sorted(vocabulary, key=vocabulary.get)
+
+        # Postings lists: for each n-gram bucket, the sorted scope rows containing it
+        item_buckets = [ngram_buckets(item) for item in scope_items]
+        ngram_counts = np.array([len(b) for b in item_buckets], dtype=np.int32)
+        lengths = np.array([len(item) for item in scope_items], dtype=np.int32)
+        if item_buckets:
+            buckets = np.concatenate(item_buckets)
+            owners = np.repeat(np.arange(n_docs, dtype=np.int32), ngram_counts)
+        else:
+            buckets = np.zeros(0, dtype=np.int64)
+            owners = np.zeros(0, dtype=np.int32)
+        order = np.argsort(buckets, kind="stable")
+        ngram_items = owners[order]
+        ngram_indptr = np.zeros(NGRAM_BUCKETS + 1, dtype=np.int64)
+        np.cumsum(np.bincount(buckets, minlength=NGRAM_BUCKETS), out=ngram_indptr[1:])
+
+        return cls(scope_hash(scope_items), n_docs, terms, idf, data, indices, indptr,
+                   ngram_indptr, ngram_items, ngram_counts, lengths)
+
+    def save(self, index_dir: str):
+        """
+        Write the arrays under a fresh build id, each to a temp file moved into place,
+        then publish meta.json naming that build. Files other processes have
+        memory-mapped are never rewritten, and a reader always gets the arrays that
+        belong to the meta.json it read.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        build = uuid.uuid4().hex
+        arrays = {
+            "idf": self.idf,
+            "data": self.matrix.data,
+            "indices": self.matrix.indices,
+            "indptr": self.matrix.indptr,
+            "ngram_indptr": self.ngram_indptr,
+            "ngram_items": self.ngram_items,
+            "ngram_counts": self.ngram_counts,
+            "lengths": self.lengths,
+        }
+        for name, array in arrays.items():
+            path = _array_path(index_dir, name, build)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+
+        previous = _read_meta(index_dir)
+        meta = {
+            "version": INDEX_VERSION,
+            "build": build,
+            "scope_hash": self.content_hash,
+            "n_docs": self.n_docs,
+            "vocabulary": self.vocabulary,
+        }
+        tmp_path = os.path.join(index_dir, f"meta.json.{build}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(index_dir, "meta.json"))
+
+        # Only the build this save replaced is removed: a concurrent rebuild's files
+        # stay until its own meta.json is replaced. Open memory maps survive the unlink.
+        if previous is not None and previous.get("build") != build:
+            for name in _ARRAYS:
+                try:
+                    os.remove(_array_path(index_dir, name, previous.get("build")))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, index_dir: str, expected_hash: Optional[str] = None) -> Optional["ScopeIndex"]:
+        """Memory-map a saved index. Returns None if missing, stale or from another version."""
+        meta = _read_meta(index_dir)
+        if meta is None or meta.get("version") != INDEX_VERSION:
+            return None
+        if expected_hash and meta.get("scope_hash") != expected_hash:
+            return None
+        try:
+            arrays = {name: np.load(_array_path(index_dir, name, meta["build"]), mmap_mode="r")
+                      for name in _ARRAYS}
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(meta["scope_hash"], meta["n_docs"], meta["vocabulary"], **arrays)
+
+    @property
+    def term_index(self) -> dict:
+        if not hasattr(self, "_term_index"):
+            self._term_index = {term: i for i, term in enumerate(self.vocabulary)}
+        return self._term_index
+
+    def transform(self, text: str):
+        """Return (columns, weights) of the L2-normalized TF-IDF vector of `text`."""
+        term_index = self.term_index
+        counts = {}
+        unseen = {}
+        for token in tokenize(text):
+            col = term_index.get(token)
+            if col is None:
+                unseen[token] = unseen.get(token, 0) + 1
+            else:
+                counts[col] = counts.get(col, 0) + 1
+
+        cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[cols]
+        unseen_sq = sum((c * self.unseen_idf) ** 2 for c in unseen.values())
+        norm = math.sqrt(float(weights @ weights) + unseen_sq)
+        if norm:
+            weights /= norm
+        return cols, weights
+
+    def score(self, text: str, rows: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Cosine similarity of `text` against every scope item, or only against
+        `rows` (in that order), which costs time proportional to those rows alone.
+        """
+        cols, weights = self.transform(text)
+        vec = np.zeros(len(self.vocabulary), dtype=np.float64)
+        vec[cols] = weights
+        if rows is None:
+            return self.matrix @ vec
+        rows = np.asarray(rows, dtype=np.int64)
+        if 3 * rows.size >= self.n_docs:
+            # Slicing a CSR matrix copies the rows; for most of the scope one full product is cheaper
+            return (self.matrix @ vec)[rows]
+        return self.matrix[rows] @ vec
+
+    def score_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Cosine similarities of several texts at once: an (items x texts) array from
+        one sparse product. Each column equals score() of that text.
+        """
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        indices, data = [], []
+        for i, text in enumerate(texts):
+            cols, weights = self.transform(text)
+            indices.append(cols)
+            data.append(weights)
+            indptr[i + 1] = indptr[i] + len(cols)
+        logs = csr_matrix(
+            (np.concatenate(data) if data else np.zeros(0), np.concatenate(indices) if indices else np.zeros(0, np.int32),
+             indptr),
+            shape=(len(texts), len(self.vocabulary)),
+        )
+        return (self.matrix @ logs.T).toarray()
+
+    def char_counts(self, scope_items: List[str]) -> np.ndarray:
+        """
+        (items x CHAR_BINS) counts of the lowercased characters of each scope item,
+        built on first use. Code points share bins modulo CHAR_BINS, which can only
+        raise the overlap, so bounds computed from it stay upper bounds.
+        """
+        if getattr(self, "_char_counts", None) is None:
+            counts = np.zeros((self.n_docs, CHAR_BINS), dtype=np.int32)
+            for row, item in enumerate(scope_items):
+                codes = np.frombuffer(item.lower().encode("utf-32-le"), dtype=np.uint32) % CHAR_BINS
+                counts[row] = np.bincount(codes, minlength=CHAR_BINS)
+            self._char_counts = counts
+        return self._char_counts
+
+    def ratio_bounds(self, text: str, scope_items: List[str], rows: np.ndarray) -> np.ndarray:
+        """Upper bounds of SequenceMatcher(text, item).quick_ratio() (and so of ratio()) for `rows`."""
+        codes = np.frombuffer(text.lower().encode("utf-32-le"), dtype=np.uint32) % CHAR_BINS
+        counts = np.bincount(codes, minlength=CHAR_BINS)
+        item_counts = self.char_counts(scope_items)[rows]
+        # Lengths of the lowercased strings, as SequenceMatcher sees them
+        overlap = np.minimum(item_counts, counts).sum(axis=1)
+        return 2.0 * overlap / np.maximum(1, codes.size + item_counts.sum(axis=1))
+
+    def candidates(self, text: str, top_k: int, min_ratio: float = 0.0) -> np.ndarray:
+        """
+        Scope rows most likely to fuzzy-match `text`, best first: ranked by the Dice
+        overlap of character n-grams, capped at `top_k`. Rows whose length alone rules
+        out a SequenceMatcher ratio above `min_ratio` are dropped.
+        """
+        if not self.n_docs:
+            return np.zeros(0, dtype=np.int64)
+        # SequenceMatcher.ratio() <= 2 * min(la, lb) / (la + lb)
+        la = len(text)
+        lb = self.lengths
+        feasible = 2.0 * np.minimum(la, lb) > min_ratio * (la + lb)
+
+        buckets = ngram_buckets(text)
+        starts = self.ngram_indptr[buckets]
+        stops = self.ngram_indptr[buckets + 1]
+        if buckets.size and stops.sum() > starts.sum():
+            hits = np.concatenate([self.ngram_items[a:b] for a, b in zip(starts, stops)])
+            overlap = np.bincount(hits, minlength=self.n_docs)
+            rank = 2.0 * overlap / (len(buckets) + self.ngram_counts)
+        else:
+            # No shared n-grams (very short lines): fall back to closeness in length
+            rank = -np.abs(lb - la).astype(np.float64)
+
+        rows = np.flatnonzero(feasible)
+        if rows.size > top_k:
+            rows = rows[np.argpartition(-rank[rows], top_k - 1)[:top_k]]
+        return rows[np.argsort(-rank[rows], kind="stable")]
+
+
+# ---------- CACHE ----------
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(content_hash):
+    with _cache_lock:
+        index = _cache.get(content_hash)
+        if index is not None:
+            _cache.move_to_end(content_hash)
+        return index
+
+def _cache_put(index):
+    with _cache_lock:
+        _cache[index.content_hash] = index
+        _cache.move_to_end(index.content_hash)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def build_scope_index(scope_items: List[str], index_dir: Optional[str] = None) -> ScopeIndex:
+    """Compile `scope_items`, save it to `index_dir` (if given) and cache it."""
+    index = ScopeIndex.build(scope_items)
+    if index_dir:
+        index.save(index_dir)
+    _cache_put(index)
+    return index
+
+def get_scope_index(scope_items: List[str], index_dir: Optional[str] = None) -> ScopeIndex:
+    """
+    Return the compiled index for `scope_items`: from the in-process LRU, else from
+    `index_dir`, else freshly built. A changed scope hash always triggers a rebuild.
+    """
+    content_hash = scope_hash(scope_items)
+    index = _cache_get(content_hash)
+    if index is not None:
+        return index
+    if index_dir:
+        index = ScopeIndex.load(index_dir, expected_hash=content_hash)
+        if index is not None:
+            _cache_put(index)
+            return index
+    return build_scope_index(scope_items, index_dir)
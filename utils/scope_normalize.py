@@ -0,0 +1,134 @@
+# utils/scope_normalize.py
+# Scope checklist normalization: generic items dropped, near-duplicates collapsed.
+#
+# Specs repeat the same work across sections ("Install safety railings", "Safety
+# railings to be installed post pour"); every copy costs a row in each later
+# similarity pass. Items are reduced to stemmed content words and MinHash-signed;
+# LSH buckets propose candidate pairs so an item is only checked against a few
+# earlier ones, and a candidate is a duplicate when the two have about as many
+# content words and those of one (nearly) all appear in the other. The first
+# item of each group is kept, with every source line it stands for.
+
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# ---------- CONFIG ----------
+IGNORE_PHRASES = [p.strip() for p in os.getenv(
+    "SCOPE_IGNORE_PHRASES", "project management,superintendent,contracts administration,cleanup"
+).split(",") if p.strip()]
+NUM_PERM = 64  # MinHash signature length
+LSH_BANDS = 16  # 16 bands x 4 rows: pairs with Jaccard ~0.5 and up become candidates
+MIN_JACCARD = float(os.getenv("SCOPE_DUPLICATE_JACCARD", "0.5"))
+MIN_CONTAINMENT = float(os.getenv("SCOPE_DUPLICATE_CONTAINMENT", "0.9"))  # of the shorter item's words
+# Shorter / longer item in content words: "Pour slab at garage" is not a copy of
+# "Pour slab at garage level 2", whose extra words name different work
+MIN_LENGTH_RATIO = float(os.getenv("SCOPE_DUPLICATE_LENGTH_RATIO", "0.75"))
+SIGNATURE_SLACK = 0.15  # Candidates estimated this far below either minimum are not checked
+STOP_WORDS = frozenset(
+    "a all an and any are as at be been by each for from in into is it of on or per post pre "
+    "shall the to will with".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+
+# ---------- HELPERS ----------
+def ignore_pattern(phrases: Sequence[str]) -> Optional["re.Pattern"]:
+    """One pattern matching any of `phrases` anywhere in a lowercased item."""
+    if not phrases:
+        return None
+    alternatives = sorted({re.escape(p.lower()) for p in phrases}, key=len, reverse=True)
+    # Searching lowercased text is several times faster than re.IGNORECASE
+    return re.compile("|".join(alternatives))
+
+_DEFAULT_IGNORE = ignore_pattern(IGNORE_PHRASES)
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def features(item: str) -> frozenset:
+    """Stemmed content words of an item."""
+    return frozenset(_stem(w) for w in TOKEN_PATTERN.findall(item.lower()) if w not in STOP_WORDS)
+
+def signature(words: frozenset) -> np.ndarray:
+    hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+def near_duplicate(a: frozenset, b: frozenset) -> bool:
+    shared = len(a & b)
+    shorter, longer = sorted((len(a), len(b)))
+    return (shorter >= MIN_LENGTH_RATIO * longer
+            and shared >= MIN_JACCARD * len(a | b)
+            and shared >= MIN_CONTAINMENT * shorter)
+
+
+# ---------- NORMALIZE ----------
+def collapse_duplicates(items: List[str]) -> Dict[str, List[str]]:
+    """{kept item: [source items it stands for, itself first]}, in first-seen order."""
+    rows_per_band = NUM_PERM // LSH_BANDS
+    buckets = [{} for _ in range(LSH_BANDS)]  # band -> signature slice -> kept item indices
+    signatures = np.zeros((len(items), NUM_PERM), dtype=np.uint64)
+    sizes = np.zeros(len(items), dtype=np.float64)
+    kept_words = {}
+    groups = {}
+    for i, item in enumerate(items):
+        words = features(item)
+        if not words:
+            groups.setdefault(item, []).append(item)
+            continue
+        sig = signatures[i] = signature(words)
+        sizes[i] = len(words)
+        keys = [sig[b * rows_per_band:(b + 1) * rows_per_band].tobytes() for b in range(LSH_BANDS)]
+        candidates = np.fromiter({j for band, key in zip(buckets, keys) for j in band.get(key, ())}, dtype=np.int64)
+        if candidates.size:
+            # Shared signature slots estimate Jaccard, and with the word counts containment;
+            # only plausible candidates get the exact check
+            jaccard = np.count_nonzero(signatures[candidates] == sig, axis=1) / NUM_PERM
+            shared = jaccard * (sizes[candidates] + len(words)) / (1 + jaccard)
+            containment = shared / np.minimum(sizes[candidates], len(words))
+            lengths = np.minimum(sizes[candidates], len(words)) / np.maximum(sizes[candidates], len(words))
+            plausible = ((jaccard >= MIN_JACCARD - SIGNATURE_SLACK) & (containment >= MIN_CONTAINMENT - SIGNATURE_SLACK)
+                         & (lengths >= MIN_LENGTH_RATIO))
+            candidates = np.sort(candidates[plausible])
+        owner = next((j for j in candidates.tolist() if near_duplicate(words, kept_words[j])), None)
+        if owner is not None:
+            groups[items[owner]].append(item)
+            continue
+        kept_words[i] = words
+        groups.setdefault(item, []).append(item)
+        for band, key in zip(buckets, keys):
+            band.setdefault(key, []).append(i)
+    return groups
+
+def normalize_scope(items: List[str], ignore_phrases: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Drop items containing an ignore phrase (default IGNORE_PHRASES) and collapse
+    near-duplicates. Returns the checklist, the source lines behind each kept item
+    (`sources`) and how much the scope shrank (`report`).
+    """
+    pattern = _DEFAULT_IGNORE if ignore_phrases is None else ignore_pattern(ignore_phrases)
+    kept = [item for item in items if not (pattern and pattern.search(item.lower()))]
+    groups = collapse_duplicates(kept)
+    checklist = list(groups)
+    return {
+        "checklist": checklist,
+        "sources": groups,
+        "report": {
+            "items": len(items),
+            "ignored": len(items) - len(kept),
+            "duplicates": len(kept) - len(checklist),
+            "kept": len(checklist),
+            "shrink_pct": round(100 * (1 - len(checklist) / len(items)), 1) if items else 0.0,
+        },
+    }
@@ -3,67 +3,56 @@
 
 import os
 import json
-import fitz  # PyMuPDF
-import docx
-import openpyxl
-from pptx import Presentation
-from typing import List
+from typing import Iterator, List, Optional
+
+from . import metrics, scope_store
+from .scope_normalize import normalize_scope
+from .scope_stream import extract_scope_stream
+from .scope_xlsx import scope_lines
 
 def clean_text(text: str) -> List[str]:
     lines = [line.strip("-• ") for line in text.split("\n") if len(line.strip()) > 5]
     return list(dict.fromkeys(lines))  # Remove duplicates, preserve order
 
 def extract_pdf_scope(path: str) -> List[str]:
-    text = ""
-    with fitz.open(path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return clean_text(text)
+    # Lines stream in page order while later pages are still being extracted
+    return list(dict.fromkeys(extract_scope_stream(path)))
 
 def extract_docx_scope(path: str) -> List[str]:
-    doc = docx.Document(path)
-    full_text = "\n".join(p.text for p in doc.paragraphs)
-    return clean_text(full_text)
+    return clean_text(scope_store.read_docx(path))
 
 def extract_xlsx_scope(path: str) -> List[str]:
-    wb = openpyxl.load_workbook(path)
-    text = ""
-    for sheet in wb.worksheets:
-        for row in sheet.iter_rows(values_only=True):
-            for cell in row:
-                if cell and isinstance(cell, str) and len(cell.strip()) > 3:
-                    text += str(cell) + "\n"
-    return clean_text(text)
+    # One line per row, from the streamed rows cached by scope_store
+    return clean_text(scope_store.extract_text(path))
+
+def extract_xlsx_items(path: str) -> Iterator[dict]:
+    # Rows with their columns (cost code, quantity, unit, ...) as fields
+    return scope_store.extract_items(path)
 
 def extract_pptx_scope(path: str) -> List[str]:
-    prs = Presentation(path)
-    text = ""
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text += shape.text + "\n"
-    return clean_text(text)
+    return clean_text(scope_store.read_pptx(path))
 
-def parse_scope_file(file_path: str, project_id: str) -> dict:
+def parse_scope_file(file_path: str, project_id: str, ignore_phrases: Optional[List[str]] = None) -> dict:
     ext = os.path.splitext(file_path)[1].lower()
-    if ext.endswith(".pdf"):
-        checklist = extract_pdf_scope(file_path)
-    elif ext.endswith(".docx"):
-        checklist = extract_docx_scope(file_path)
-    elif ext.endswith(".xlsx"):
-        checklist = extract_xlsx_scope(file_path)
-    elif ext.endswith(".pptx"):
-        checklist = extract_pptx_scope(file_path)
-    else:
+    if ext not in (".pdf", ".docx", ".xlsx", ".pptx"):
         raise ValueError("Unsupported scope file format")
+    # Parsed once per document content (see utils/scope_store.py)
+    if ext in scope_store.ITEM_FORMATS:
+        # Rows of a header-mapped sheet are items however short ("Rebar #4")
+        checklist = list(dict.fromkeys(
+            scope_lines(scope_store.extract_items(file_path), lambda line: len(line) > 5)))
+    else:
+        checklist = clean_text(scope_store.extract_text(file_path))
 
-    # Filter out generic items
-    ignore_phrases = ["project management", "superintendent", "contracts administration", "cleanup"]
-    checklist = [item for item in checklist if not any(x.lower() in item.lower() for x in ignore_phrases)]
+    # Generic items dropped, near-duplicates collapsed (see utils/scope_normalize.py)
+    normalized = normalize_scope(checklist, ignore_phrases)
+    metrics.log("scope_normalized", project_id=project_id, **normalized["report"])
 
     result = {
         "project_id": project_id,
-        "checklist": checklist
+        "checklist": normalized["checklist"],
+        "sources": normalized["sources"],
+        "report": normalized["report"],
     }
     os.makedirs("scope_data", exist_ok=True)
     with open(f"scope_data/{project_id}.json", "w") as f:
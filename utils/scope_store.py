@@ -0,0 +1,219 @@
+# utils/scope_store.py
+# One scope ingestion service: every extractor reads document text through here.
+#
+# Parsed text is keyed by the document's SHA-256 plus PARSER_VERSION, kept in an
+# in-process LRU and persisted once under SCOPE_STORE. Re-uploading the same file
+# costs one hash; a changed file hashes differently and is parsed afresh. Bump
+# PARSER_VERSION whenever extraction output changes so old entries are ignored.
+# Spreadsheets also keep their rows as structured items (<key>.items.jsonl).
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from . import metrics
+from .hashing import sha256_file, CHUNK_SIZE
+
+# ---------- CONFIG ----------
+PARSER_VERSION = 3
+SCOPE_STORE = os.getenv("SCOPE_STORE", "static/scope/parsed")
+SCOPE_CACHE_SIZE = int(os.getenv("SCOPE_CACHE_SIZE", "16"))  # documents kept in memory
+
+
+# ---------- READERS ----------
+def read_pdf(path):
+    # Pages are extracted in parallel, PyMuPDF first with PyPDF2 as fallback
+    from .scope_stream import iter_pages
+
+    return "\n".join(iter_pages(path))
+
+def read_docx(path):
+    import docx
+
+    return "\n".join(p.text for p in docx.Document(path).paragraphs)
+
+def read_xlsx(path):
+    # Streamed in read-only mode, one line per scope row (see utils/scope_xlsx.py)
+    from .scope_xlsx import iter_scope_items, item_line
+
+    return "\n".join(item_line(item) for item in iter_scope_items(path))
+
+def read_pptx(path):
+    from pptx import Presentation
+
+    texts = []
+    for slide in Presentation(path).slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                texts.append(shape.text)
+    return "\n".join(texts)
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+READERS = {
+    ".pdf": read_pdf,
+    ".docx": read_docx,
+    ".doc": read_docx,
+    ".xlsx": read_xlsx,
+    ".pptx": read_pptx,
+}
+ITEM_FORMATS = (".xlsx",)  # formats whose rows are kept as structured items
+
+
+# ---------- CACHE ----------
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def cache_key(digest):
+    return f"{digest}-v{PARSER_VERSION}"
+
+def _cache_path(key):
+    return os.path.join(SCOPE_STORE, f"{key}.json")
+
+def _remember(key, text):
+    with _cache_lock:
+        _cache[key] = text
+        _cache.move_to_end(key)
+        while len(_cache) > SCOPE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def lookup(digest):
+    """Cached text for a document hash, from memory or disk, or None."""
+    key = cache_key(digest)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    try:
+        with open(_cache_path(key), "r", encoding="utf-8") as f:
+            text = json.load(f)["text"]
+    except (OSError, ValueError, KeyError):
+        return None
+    _remember(key, text)
+    return text
+
+def _items_path(key):
+    return os.path.join(SCOPE_STORE, f"{key}.items.jsonl")
+
+def _store_items(items, path):
+    # Written row by row, so a large workbook is never held as a list
+    os.makedirs(SCOPE_STORE, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, default=str) + "\n")
+    os.replace(tmp_path, path)
+
+def _store(digest, text, source_name):
+    key = cache_key(digest)
+    os.makedirs(SCOPE_STORE, exist_ok=True)
+    tmp_path = f"{_cache_path(key)}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"sha256": digest, "parser_version": PARSER_VERSION,
+                   "source_name": source_name, "text": text}, f)
+    os.replace(tmp_path, _cache_path(key))
+    _remember(key, text)
+
+
+# ---------- PUBLIC API ----------
+def extract_text(path, digest=None):
+    """Full text of a scope document, parsed at most once per content hash."""
+    digest = digest or sha256_file(path)
+    text = lookup(digest)
+    metrics.count("scope_documents", cache="miss" if text is None else "hit")
+    if text is None:
+        ext = os.path.splitext(path)[1].lower()
+        with metrics.stage("scope_parse", format=ext.lstrip(".") or "text"):
+            if ext in ITEM_FORMATS:
+                # One pass over the workbook gives both the items and the text
+                from .scope_xlsx import item_line
+
+                text = "\n".join(item_line(item) for item in extract_items(path, digest))
+            else:
+                text = READERS.get(ext, read_text)(path)
+        _store(digest, text, os.path.basename(path))
+    return text
+
+def extract_items(path, digest=None):
+    """
+    Rows of a spreadsheet scope as dicts (sheet, row, description, cost_code,
+    quantity, unit, ...), parsed at most once per content hash and streamed back
+    from SCOPE_STORE afterwards.
+    """
+    from .scope_xlsx import iter_scope_items
+
+    digest = digest or sha256_file(path)
+    items_path = _items_path(cache_key(digest))
+    if not os.path.exists(items_path):
+        _store_items(iter_scope_items(path), items_path)
+    yield from read_items(items_path)
+
+def read_items(path):
+    """Rows of an items file (SCOPE_STORE or a published copy), one dict at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def items_path_for(scope_path):
+    """Published items of a project scope: static/scope/{project}_scope.json -> {project}_scope_items.jsonl."""
+    root, _ = os.path.splitext(scope_path)
+    return f"{root}_items.jsonl"
+
+def items_path(digest):
+    """Where extract_items() keeps the rows of the document with this hash (may not exist yet)."""
+    return _items_path(cache_key(digest))
+
+def publish_items(digest, dest):
+    """
+    Make `dest` the structured rows of the document with this hash (a hard link
+    when possible), or remove it if the document has none. Returns `dest` or None.
+    """
+    src = items_path(digest)
+    if not os.path.exists(src):
+        try:
+            os.remove(dest)
+        except FileNotFoundError:
+            pass
+        return None
+    try:
+        if os.path.samefile(src, dest):
+            return dest
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+    return dest
+
+def ingest_upload(file_storage, folder):
+    """
+    Hash an uploaded scope document and return (sha256, text). The upload is only
+    written to `folder` (as <sha256><ext>) and parsed when its hash is not cached yet.
+    """
+    stream = file_storage.stream
+    start = stream.tell()
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    text = lookup(digest)
+    if text is None:
+        from werkzeug.utils import secure_filename
+
+        ext = os.path.splitext(secure_filename(file_storage.filename or ""))[1].lower()
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{digest}{ext}")
+        stream.seek(start)
+        file_storage.save(path)
+        text = extract_text(path, digest)
+    return digest, text
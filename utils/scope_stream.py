@@ -0,0 +1,143 @@
+# utils/scope_stream.py
+# Page-level, parallel text extraction for large scope PDFs.
+#
+# Page ranges are spread across a process pool (PyMuPDF, or PyPDF2 when PyMuPDF is
+# not installed or cannot read the document, e.g. encrypted or malformed) and
+# results are yielded strictly in page order. Only
+# MAX_IN_FLIGHT ranges are outstanding at once, so memory stays bounded by a few
+# pages no matter how long the bid package is, and callers can filter or index
+# lines while later pages are still being read.
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from . import metrics
+
+# ---------- CONFIG ----------
+PAGES_PER_CHUNK = int(os.getenv("SCOPE_PAGES_PER_CHUNK", "8"))
+EXTRACT_WORKERS = int(os.getenv("SCOPE_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_IN_FLIGHT = 2  # page ranges queued per worker
+POOL_MIN_PAGES = 64  # shorter documents are read inline; pool start-up would dominate
+
+
+def _backend():
+    try:
+        import fitz  # PyMuPDF
+
+        return "pymupdf"
+    except ImportError:
+        return "pypdf2"
+
+
+def _open_fitz(path: str):
+    import fitz
+
+    doc = fitz.open(path)
+    if doc.needs_pass:
+        doc.close()
+        raise ValueError("document is encrypted")
+    return doc
+
+
+def _fallback(path: str, error: Exception):
+    metrics.log("scope_pdf_fallback", level="warning", file=path, backend="pypdf2", error=str(error))
+    return "pypdf2"
+
+
+def document_backend(path: str) -> str:
+    """The backend that reads `path`: PyMuPDF when installed and able to open it, else PyPDF2."""
+    if _backend() != "pymupdf":
+        return "pypdf2"
+    try:
+        with _open_fitz(path):
+            return "pymupdf"
+    except Exception as e:
+        return _fallback(path, e)
+
+
+def page_count(path: str, backend: Optional[str] = None) -> int:
+    if (backend or document_backend(path)) == "pymupdf":
+        with _open_fitz(path) as doc:
+            return doc.page_count
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def extract_page_range(path: str, start: int, stop: int, backend: Optional[str] = None) -> List[str]:
+    """Text of pages [start, stop); a page without text yields ""."""
+    if (backend or document_backend(path)) == "pymupdf":
+        try:
+            with _open_fitz(path) as doc:
+                return [doc[i].get_text() or "" for i in range(start, min(stop, doc.page_count))]
+        except Exception as e:
+            _fallback(path, e)
+    from PyPDF2 import PdfReader
+
+    pages = PdfReader(path).pages
+    return [pages[i].extract_text() or "" for i in range(start, min(stop, len(pages)))]
+
+
+def _iter_pages_serial(path: str, backend: str) -> Iterator[str]:
+    done = 0
+    if backend == "pymupdf":
+        try:
+            with _open_fitz(path) as doc:
+                for page in doc:
+                    text = page.get_text() or ""
+                    done += 1
+                    yield text
+            return
+        except Exception as e:
+            # Carry on from the page PyMuPDF failed on
+            _fallback(path, e)
+    from PyPDF2 import PdfReader
+
+    for page in PdfReader(path).pages[done:]:
+        yield page.extract_text() or ""
+
+
+def iter_pages(path: str, pages_per_chunk: int = PAGES_PER_CHUNK,
+               max_workers: int = EXTRACT_WORKERS) -> Iterator[str]:
+    """Yield the text of every page in order, extracting ranges in parallel."""
+    backend = document_backend(path)
+    total = page_count(path, backend)
+    ranges = [(start, min(start + pages_per_chunk, total)) for start in range(0, total, pages_per_chunk)]
+
+    if total < POOL_MIN_PAGES or len(ranges) <= 1 or max_workers <= 1:
+        # No pool to feed: open the document once and walk it page by page
+        yield from _iter_pages_serial(path, backend)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges))) as pool:
+        pending = deque()
+        todo = iter(ranges)
+        for start, stop in todo:
+            pending.append(pool.submit(extract_page_range, path, start, stop, backend))
+            if len(pending) >= max_workers * MAX_IN_FLIGHT:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(pool.submit(extract_page_range, path, *nxt, backend))
+            yield from pages
+
+
+def clean_line(line: str) -> Optional[str]:
+    """Scope line cleanup shared with scope_parser.clean_text; None for noise."""
+    if len(line.strip()) <= 5:
+        return None
+    return line.strip("-• ")
+
+
+def extract_scope_stream(path: str, pages_per_chunk: int = PAGES_PER_CHUNK,
+                         max_workers: int = EXTRACT_WORKERS) -> Iterator[str]:
+    """Yield cleaned scope lines of a PDF in page order as pages are extracted."""
+    for page_text in iter_pages(path, pages_per_chunk, max_workers):
+        for line in page_text.splitlines():
+            cleaned = clean_line(line)
+            if cleaned:
+                yield cleaned
@@ -2,8 +2,8 @@ import os
 import re
 import json
 from difflib import SequenceMatcher
-from docx import Document
-from PyPDF2 import PdfReader
+
+from .scope_store import extract_text
 
 # --- Extract text from uploaded Scope of Work ---
 def extract_scope_text(scope_path):
@@ -11,20 +11,8 @@ def extract_scope_text(scope_path):
     if not os.path.exists(scope_path):
         return text
 
-    ext = os.path.splitext(scope_path)[1].lower()
-
     try:
-        if ext == ".pdf":
-            reader = PdfReader(scope_path)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        elif ext in [".doc", ".docx"]:
-            doc = Document(scope_path)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        else:
-            with open(scope_path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
+        text = extract_text(scope_path)
     except Exception as e:
         text = f"Error extracting scope: {e}"
 
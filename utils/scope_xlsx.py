@@ -0,0 +1,164 @@
+# utils/scope_xlsx.py
+# Streaming XLSX scope reader: one scope item per row, columns kept as fields.
+#
+# openpyxl's read-only mode parses each sheet's XML as it is iterated and keeps no
+# cell objects or styles, so memory stays flat however many rows an estimate has
+# (the workbook's shared strings table is the one part loaded whole). A header
+# row is looked for in the first HEADER_SCAN_ROWS rows of each sheet; known
+# headers map to canonical fields, other headers keep their own (snake_case)
+# name, and sheets without one use column letters. Rows under a header are
+# marked "mapped": they are line items by construction, however short.
+#
+#   {"sheet": "Sitework", "row": 14, "description": "Pour slab at garage",
+#    "cost_code": "03-300", "quantity": 42.0, "unit": "CY", "amount": 8400.0, "mapped": true}
+
+import re
+import datetime
+
+# ---------- CONFIG ----------
+HEADER_SCAN_ROWS = 20
+MIN_DESCRIPTION_CHARS = 4
+FIELD_ALIASES = {
+    "description": ("description", "item_description", "scope", "scope_item", "scope_of_work", "task",
+                    "work_item", "work_description", "item"),
+    "cost_code": ("cost_code", "code", "csi", "csi_code", "phase_code", "item_no", "item_number"),
+    "quantity": ("qty", "quantity", "quan"),
+    "unit": ("unit", "units", "uom", "unit_of_measure"),
+    "unit_cost": ("unit_cost", "unit_price", "rate"),
+    "amount": ("amount", "total", "total_cost", "extended", "extension", "cost", "price"),
+}
+NUMERIC_FIELDS = ("quantity", "unit_cost", "amount")
+DETAIL_FIELDS = ("cost_code", "quantity", "unit")  # shown beside an item in the daily log PDF
+
+_ALIAS_TO_FIELD = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+
+def _snake(value):
+    return re.sub(r"[^a-z0-9]+", "_", str(value).strip().lower()).strip("_")
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").replace("$", "").strip())
+    except ValueError:
+        return None
+
+
+def header_fields(values):
+    """Field name per column if `values` looks like a header row, else None."""
+    names = [_snake(v) if isinstance(v, str) else "" for v in values]
+    known = [_ALIAS_TO_FIELD[name] for name in names if name in _ALIAS_TO_FIELD]
+    if len(set(known)) < 2:
+        return None
+    fields, used = [], set()
+    for name in names:
+        field = _ALIAS_TO_FIELD.get(name, name)
+        if field in used:
+            field = ""  # a second "Total" column and the like: keep the first
+        used.add(field)
+        fields.append(field)
+    return fields
+
+
+def iter_rows(path):
+    """(sheet title, row number, cell values) for every row, streamed in read-only mode."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for number, values in enumerate(sheet.iter_rows(values_only=True), 1):
+                yield sheet.title, number, values
+    finally:
+        workbook.close()  # read-only workbooks keep the archive open until closed
+
+
+def _item(sheet, number, values, fields):
+    from openpyxl.utils import get_column_letter
+
+    item = {"sheet": sheet, "row": number}
+    for column, value in enumerate(values):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        field = fields[column] if fields and column < len(fields) else get_column_letter(column + 1)
+        if not field:
+            continue
+        if isinstance(value, (datetime.date, datetime.time)):
+            value = value.isoformat()
+        elif isinstance(value, str):
+            value = value.strip()
+        if field in NUMERIC_FIELDS:
+            number_value = _number(value)
+            value = number_value if number_value is not None else value
+        item[field] = value
+
+    if not fields or "description" not in fields:
+        # No description column: the row's text cells, in column order
+        item["description"] = " ".join(str(v).strip() for v in values if isinstance(v, str) and v.strip())
+    description = item.get("description")
+    if not isinstance(description, str) or len(description) < MIN_DESCRIPTION_CHARS:
+        return None
+    if fields:
+        item["mapped"] = True
+    return item
+
+
+def iter_scope_items(path):
+    """One dict per scope row of every sheet: sheet, row, description and the other columns."""
+    sheet, fields, pending = None, None, []
+    for title, number, values in iter_rows(path):
+        if title != sheet:
+            yield from _flush(sheet, pending, fields)
+            sheet, fields, pending = title, None, []
+        if fields is None and number <= HEADER_SCAN_ROWS:
+            header = header_fields(values)
+            if header:
+                fields, pending = header, []  # rows above the header are titles and notes
+                continue
+            pending.append((number, values))
+            if number == HEADER_SCAN_ROWS:
+                yield from _flush(sheet, pending, None)
+                pending = []
+            continue
+        item = _item(sheet, number, values, fields)
+        if item:
+            yield item
+    yield from _flush(sheet, pending, fields)
+
+
+def _flush(sheet, pending, fields):
+    for number, values in pending:
+        item = _item(sheet, number, values, fields)
+        if item:
+            yield item
+
+
+def item_line(item):
+    """The text of a scope item as the line-based matching sees it."""
+    return " ".join(item["description"].split())
+
+
+def scope_lines(items, keep):
+    """
+    Checklist lines of `items`: every row of a header-mapped sheet ("Rebar #4",
+    "Formwork"), and the other rows whose line passes `keep` (the filter used
+    for plain text).
+    """
+    for item in items:
+        line = item_line(item)
+        if item.get("mapped") or keep(line):
+            yield line
+
+
+def item_details(items, lines):
+    """{line: {cost_code, quantity, unit}} of the first item behind each of `lines` that has any."""
+    wanted, details = set(lines), {}
+    for item in items:
+        line = item_line(item)
+        if line in wanted and line not in details:
+            fields = {field: item[field] for field in DETAIL_FIELDS if item.get(field) not in (None, "")}
+            if fields:
+                details[line] = fields
+    return details
@@ -0,0 +1,223 @@
+# utils/upload_store.py
+# Content-addressed store for uploaded photos and logos.
+#
+#   {root}/objects/ab/<sha256><ext>   one copy per distinct file, shared by every job
+#   {root}/refs/<sha256>/<job_id>     marker: this job still needs the object
+#   {root}/jobs/<job_id>              manifest: the objects a job holds
+#
+# Objects are never overwritten or deleted while referenced, so concurrent
+# requests and queued jobs do not interfere. Unreferenced objects are evicted
+# by TTL, then least-recently-used first when the store is over its size budget.
+
+import os
+import time
+import uuid
+import hashlib
+
+from werkzeug.utils import secure_filename
+
+from .hashing import CHUNK_SIZE
+
+# ---------- CONFIG ----------
+UPLOAD_STORE = os.getenv("UPLOAD_STORE", "static/uploads")
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", str(7 * 24 * 3600)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(2 * 1024 ** 3)))
+REF_TTL_SECONDS = int(os.getenv("UPLOAD_REF_TTL_SECONDS", str(24 * 3600)))  # refs of crashed jobs expire
+EVICT_INTERVAL_SECONDS = 600
+
+
+def _dirs(root):
+    return (os.path.join(root, "objects"), os.path.join(root, "refs"),
+            os.path.join(root, "jobs"), os.path.join(root, "tmp"))
+
+
+def _object_path(root, digest, ext):
+    return os.path.join(root, "objects", digest[:2], f"{digest}{ext}")
+
+
+def digest_of(path):
+    """The SHA-256 in a store object's name, or None if `path` is not a store object."""
+    name = os.path.splitext(os.path.basename(path or ""))[0]
+    if len(name) == 64 and all(c in "0123456789abcdef" for c in name):
+        return name
+    return None
+
+
+def _extension(filename):
+    return os.path.splitext(secure_filename(filename or ""))[1].lower()
+
+
+def _hash_stream(stream):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_upload(file_storage, job_id, root=None):
+    """
+    Save a werkzeug FileStorage into the store and reference it from `job_id`.
+    Returns the object's path. A file already in the store is not written again.
+    """
+    root = root or UPLOAD_STORE
+    tmp_dir = _dirs(root)[3]
+    ext = _extension(file_storage.filename)
+    stream = file_storage.stream
+
+    if stream.seekable():
+        # Werkzeug spools uploads to memory or a temp file: hash first, write only if new
+        start = stream.tell()
+        digest = _hash_stream(stream)
+        path = _object_path(root, digest, ext)
+        _add_ref(root, digest, job_id)
+        if not _touch(path):
+            stream.seek(start)
+            _write_atomic(stream, path, tmp_dir)
+    else:
+        # Hash while streaming to a temp file, then move it into place
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        hasher = hashlib.sha256()
+        with open(tmp_path, "wb") as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                f.write(chunk)
+        digest = hasher.hexdigest()
+        path = _object_path(root, digest, ext)
+        _add_ref(root, digest, job_id)
+        if _touch(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    return path
+
+
+def _add_ref(root, digest, job_id):
+    # The reference is recorded before the object is touched so evict() never races us
+    _, refs_dir, jobs_dir, _ = _dirs(root)
+    for _ in range(3):
+        os.makedirs(os.path.join(refs_dir, digest), exist_ok=True)
+        try:
+            open(os.path.join(refs_dir, digest, job_id), "a").close()
+            break
+        except FileNotFoundError:
+            continue  # release_job() removed the empty refs dir in between; retry
+    os.makedirs(jobs_dir, exist_ok=True)
+    with open(os.path.join(jobs_dir, job_id), "a") as f:
+        f.write(digest + "\n")
+
+
+def _touch(path):
+    """Bump an existing object's LRU clock. Returns False if it is not in the store."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _write_atomic(stream, path, tmp_dir):
+    os.makedirs(tmp_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    with open(tmp_path, "wb") as f:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def release_job(job_id, root=None):
+    """Drop every reference held by `job_id`; the objects become evictable."""
+    root = root or UPLOAD_STORE
+    _, refs_dir, jobs_dir, _ = _dirs(root)
+    manifest = os.path.join(jobs_dir, job_id)
+    try:
+        with open(manifest, "r") as f:
+            digests = set(f.read().split())
+    except FileNotFoundError:
+        return
+    for digest in digests:
+        try:
+            os.remove(os.path.join(refs_dir, digest, job_id))
+        except FileNotFoundError:
+            pass
+        try:
+            os.rmdir(os.path.join(refs_dir, digest))
+        except OSError:
+            pass  # still referenced by another job
+    os.remove(manifest)
+
+
+def _is_referenced(refs_dir, digest, now):
+    ref_dir = os.path.join(refs_dir, digest)
+    try:
+        markers = os.listdir(ref_dir)
+    except FileNotFoundError:
+        return False
+    live = False
+    for job_id in markers:
+        marker = os.path.join(ref_dir, job_id)
+        try:
+            if now - os.path.getmtime(marker) < REF_TTL_SECONDS:
+                live = True
+            else:
+                os.remove(marker)
+        except FileNotFoundError:
+            pass
+    return live
+
+
+def evict(root=None, ttl=None, max_bytes=None):
+    """
+    Delete unreferenced objects older than `ttl`, then the least recently used
+    unreferenced objects until the store fits in `max_bytes`. Returns the count removed.
+    """
+    root = root or UPLOAD_STORE
+    ttl = UPLOAD_TTL_SECONDS if ttl is None else ttl
+    max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    objects_dir, refs_dir, _, _ = _dirs(root)
+    now = time.time()
+
+    entries, total = [], 0
+    for dirpath, _, filenames in os.walk(objects_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, path, os.path.splitext(name)[0]))
+
+    removed = 0
+    for mtime, size, path, digest in sorted(entries):
+        expired = now - mtime > ttl
+        if not expired and total <= max_bytes:
+            break
+        if _is_referenced(refs_dir, digest, now):
+            continue
+        try:
+            if os.path.getmtime(path) != mtime:
+                continue  # re-uploaded since the scan started
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def maybe_evict(root=None):
+    """Run evict() at most once per EVICT_INTERVAL_SECONDS across all processes."""
+    root = root or UPLOAD_STORE
+    stamp = os.path.join(root, ".last_evict")
+    try:
+        if time.time() - os.path.getmtime(stamp) < EVICT_INTERVAL_SECONDS:
+            return 0
+    except FileNotFoundError:
+        pass
+    os.makedirs(root, exist_ok=True)
+    open(stamp, "a").close()
+    os.utime(stamp)
+    return evict(root)
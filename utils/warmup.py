@@ -0,0 +1,55 @@
+# utils/warmup.py
+# Optional warm-up of heavy dependencies, off by default.
+#
+# WARMUP_ON_START=imports  -> import reportlab, PyPDF2, numpy/scipy and the scope index
+# WARMUP_ON_START=model    -> the above, plus torch and the MobileNet weights
+#
+# With gunicorn's preload_app the warm-up runs once in the master and forked
+# workers share it; otherwise every worker warms itself before serving.
+
+import os
+import time
+import importlib
+
+from . import metrics
+
+# ---------- CONFIG ----------
+WARMUP_MODULES = [
+    "utils.pdf_generator",
+    "utils.compare_scope_vs_log",
+    "PyPDF2",
+]
+MODEL_MODULES = ["utils.image_analyzer"]
+
+
+def warm_up(load_model=False):
+    """Import the heavy modules (and optionally load the photo model) up front."""
+    timings = {}
+    for name in WARMUP_MODULES + (MODEL_MODULES if load_model else []):
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            metrics.log("warmup_import_failed", level="warning", module=name, error=str(e))
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+
+    if load_model and "utils.image_analyzer" in timings:
+        from utils.image_analyzer import preload_model
+
+        start = time.perf_counter()
+        try:
+            preload_model()
+            timings["mobilenet_v2"] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            metrics.log("warmup_model_failed", level="warning", error=str(e))
+
+    metrics.log("warmup_finished", seconds=timings)
+    return timings
+
+
+def warm_up_from_env():
+    mode = os.getenv("WARMUP_ON_START", "").strip().lower()
+    if mode in ("", "0", "false", "off"):
+        return None
+    return warm_up(load_model=(mode == "model"))
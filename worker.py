@@ -1,10 +1,12 @@
 import os
 from rq import Worker, Queue, Connection
 from task_queue import conn  # ✅ use your own Redis connection, not Python’s queue module
+from utils.warmup import warm_up_from_env
 
 listen = ['default']
 
 if __name__ == '__main__':
+    warm_up_from_env()
     with Connection(conn):
         worker = Worker(list(map(Queue, listen)))
         worker.work()